@@ -1,7 +1,7 @@
 import typing
 import numpy as np
 import pandas as pd
-from pycanon import anonymity
+from anonymity.tools.utils_k_anon.equivalence_class import EquivalenceClassIndex
 
 # Global variables for metrics
 LEVEL_GEN = {}
@@ -182,15 +182,9 @@ def discernibility(
     :rtype: float
     """
 
-    t = len(og_table)
-    k = anonymity.k_anonymity(new_table, qi)
-    eq = anonymity.utils.aux_anonymity.get_equiv_class(new_table, qi)
-    a = 0
-
-    for i in eq:
-        if len(i) >= k:
-            a = a + pow(len(i), 2)
-    return a
+    index = EquivalenceClassIndex(new_table, qi)
+    k = index.k()
+    return int(np.sum(index.sizes[index.sizes >= k] ** 2))
 
 
 def avr_equiv_class_size(
@@ -216,6 +210,5 @@ def avr_equiv_class_size(
     """
 
     t = len(og_table)
-    k = anonymity.k_anonymity(new_table, qi)
-    eq = anonymity.utils.aux_anonymity.get_equiv_class(new_table, qi)
-    return t / (len(eq) * k)
+    index = EquivalenceClassIndex(new_table, qi)
+    return t / (index.n_groups * index.k())
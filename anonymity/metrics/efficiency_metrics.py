@@ -6,6 +6,8 @@ START_TIME = None
 END_TIME = None
 NUM_DATAFLY = 0
 NUM_INCOGNITO = 0
+NUM_FLASH = 0
+NUM_SAMARATI = 0
 NUM_MONDRIAN = 0
 
 
@@ -51,6 +53,12 @@ def monitor_cost(type_of: str):
     if type_of.lower() == "incognito":
         global NUM_INCOGNITO
         print(NUM_INCOGNITO)
+    if type_of.lower() == "flash":
+        global NUM_FLASH
+        print(NUM_FLASH)
+    if type_of.lower() == "samarati":
+        global NUM_SAMARATI
+        print(NUM_SAMARATI)
     if type_of.lower() == "mondrian":
         global NUM_MONDRIAN
         print(NUM_MONDRIAN)
@@ -70,6 +78,12 @@ def monitor_cost_init(type_of: str):
     if type_of.lower() == "incognito":
         global NUM_INCOGNITO
         NUM_INCOGNITO = 0
+    if type_of.lower() == "flash":
+        global NUM_FLASH
+        NUM_FLASH = 0
+    if type_of.lower() == "samarati":
+        global NUM_SAMARATI
+        NUM_SAMARATI = 0
     if type_of.lower() == "mondrian":
         global NUM_MONDRIAN
         NUM_MONDRIAN = 0
@@ -88,6 +102,12 @@ def monitor_cost_add(type_of: str):
     if type_of.lower() == "incognito":
         global NUM_INCOGNITO
         NUM_INCOGNITO = NUM_INCOGNITO + 1
+    if type_of.lower() == "flash":
+        global NUM_FLASH
+        NUM_FLASH = NUM_FLASH + 1
+    if type_of.lower() == "samarati":
+        global NUM_SAMARATI
+        NUM_SAMARATI = NUM_SAMARATI + 1
     if type_of.lower() == "mondrian":
         global NUM_MONDRIAN
         NUM_MONDRIAN = NUM_MONDRIAN + 1
@@ -14,9 +14,20 @@
 # License for the specific language governing permissions and limitations
 # under the License.
 
-from ._k_anonymity import data_fly, incognito, k_anonymity
+from ._anonymizer import Anonymizer
+from ._k_anonymity import (
+    data_fly,
+    flash,
+    incognito,
+    k_anonymity,
+    mondrian,
+    samarati,
+)
 from ._l_diversity import l_diversity
+from ._partitioned import k_anonymity_chunked, k_anonymity_partitioned
 from ._t_closeness import t_closeness, t_closeness_supp
+from .utils_k_anon.hierarchy import Hierarchy
+from .utils_k_anon.shared_dataset import SharedDataset
 
 __all__ = [
     "k_anonymity",
@@ -25,4 +36,12 @@ __all__ = [
     "t_closeness_supp",
     "data_fly",
     "incognito",
+    "flash",
+    "samarati",
+    "mondrian",
+    "k_anonymity_partitioned",
+    "k_anonymity_chunked",
+    "Anonymizer",
+    "Hierarchy",
+    "SharedDataset",
 ]
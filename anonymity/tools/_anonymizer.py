@@ -0,0 +1,257 @@
+import json
+import typing
+import numpy as np
+import pandas as pd
+from anonymity.tools._partitioned import choose_generalization
+from anonymity.tools.utils_k_anon import encoding as enc
+from anonymity.tools.utils_k_anon import frequency_set as fs
+from anonymity.tools.utils_k_anon import hierarchy as hie
+from anonymity.tools.utils_k_anon import utils_k_anonymity as ut
+
+
+def _json_value(value):
+    """Converts the numpy scalars of a plan to python values."""
+    if isinstance(value, np.generic):
+        return value.item()
+    raise TypeError(f"Object of type {type(value).__name__} is not serializable")
+
+
+class Anonymizer:
+    """k-anonymity split in two steps. :meth:`fit` searches the generalization of a
+    table with incognito or datafly and keeps it as a plan: the level of each
+    quasi-identifier and whether the records of the equivalence classes smaller
+    than k are suppressed. :meth:`transform` applies the plan to a table, or to
+    its chunks, without searching again. The plan can be saved to a JSON file and
+    loaded to anonymize other tables with the same columns. The records with values
+    that the hierarchies do not cover are suppressed, since they cannot be
+    generalized. The number of records suppressed by the last transform is kept in
+    ``n_suppressed`` and a message is printed when it exceeds ``supp_threshold``,
+    as the table no longer follows the distribution of the fitted one.
+
+    :param ident: list with the name of the columns of the dataframe.
+        that are identifiers.
+    :type ident: list of strings
+
+    :param qi: list with the name of the columns of the dataframe.
+        that are quasi-identifiers.
+    :type qi: list of strings
+
+    :param k: desired level of k-anonymity.
+    :type k: int
+
+    :param supp_threshold: maximum number of records that can be suppressed.
+    :type supp_threshold: int
+
+    :param hierarchies: hierarchies for generalization of columns.
+    :type hierarchies: dictionary
+
+    :param method: name of the anonymization method: "incognito" or "datafly".
+    :type method: string
+    """
+
+    def __init__(
+        self,
+        ident: typing.Union[typing.List, np.ndarray],
+        qi: typing.Union[typing.List, np.ndarray],
+        k: int,
+        supp_threshold: int,
+        hierarchies: dict,
+        method: str = "incognito",
+    ):
+        method = method.lower()
+        if method not in ("incognito", "datafly", "data fly", "data_fly"):
+            raise ValueError("Unimplemented method for the anonymizer.")
+        self.ident = list(ident)
+        self.qi = list(qi)
+        self.k = k
+        self.supp_threshold = supp_threshold
+        self.hierarchies = hie.compile_hierarchies(hierarchies)
+        self.method = method
+        self.levels = None
+        self.suppress = False
+        self.classes = None
+        self._classes_index = None
+        self.n_suppressed = 0
+
+    @property
+    def fitted(self) -> bool:
+        """Whether the anonymizer has a plan."""
+        return self.levels is not None
+
+    def fit(self, table: pd.DataFrame) -> "Anonymizer":
+        """Searches the generalization of a table.
+
+        :param table: dataframe with the data under study.
+        :type table: pandas dataframe
+
+        :return: the anonymizer, with the plan.
+        :rtype: Anonymizer
+        """
+        table = ut.clear_white_spaces(table, copy=False)
+        encoded = enc.EncodedTable(table, self.qi)
+        base = fs.get_frequency_set(encoded, self.qi)
+        levels, generalization, suppressed = choose_generalization(
+            base,
+            {name: encoded.labels[name] for name in self.qi},
+            self.qi,
+            self.k,
+            self.supp_threshold,
+            self.hierarchies,
+            self.method,
+        )
+        self.levels = {name: int(levels[name]) for name in self.qi}
+        self.suppress = suppressed is not None
+        self.classes = None
+        self._classes_index = None
+        if self.suppress:
+            # Generalized values of the classes that are kept
+            kept = suppressed.counts >= self.k
+            self.classes = {}
+            for j, name in enumerate(self.qi):
+                labels = generalization[name][2]
+                if labels is None:
+                    labels = generalization[name][0]
+                self.classes[name] = labels[suppressed.codes[kept, j]]
+        return self
+
+    def fit_transform(self, table: pd.DataFrame) -> pd.DataFrame:
+        """Searches the generalization of a table and applies it.
+
+        :param table: dataframe with the data under study.
+        :type table: pandas dataframe
+
+        :return: anonymized table.
+        :rtype: pandas dataframe
+        """
+        return self.fit(table).transform(table)
+
+    def transform(
+        self, table: typing.Union[pd.DataFrame, typing.Iterable[pd.DataFrame]]
+    ) -> typing.Union[pd.DataFrame, typing.Iterator[pd.DataFrame]]:
+        """Applies the plan to a table or to each chunk of a table. When the plan
+        suppresses records, both lose the records whose class was smaller than k in
+        the fitted table, so the chunks give the same records as the whole table.
+
+        :param table: dataframe with the data under study, or iterable of chunks
+            of it, such as the reader of ``pandas.read_csv`` with a chunksize.
+        :type table: pandas dataframe or iterable of pandas dataframes
+
+        :return: anonymized table, or iterator of anonymized chunks.
+        :rtype: pandas dataframe or iterator of pandas dataframes
+        """
+        if not self.fitted:
+            raise ValueError("The anonymizer must be fitted before transforming.")
+        self.n_suppressed = 0
+        if isinstance(table, pd.DataFrame):
+            return self._transform(table)
+        return (self._transform(chunk) for chunk in table)
+
+    def _transform(self, table: pd.DataFrame) -> pd.DataFrame:
+        table = ut.clear_white_spaces(table, copy=False)
+        columns = {}
+        covered = np.ones(len(table), dtype=bool)
+        for name in self.qi:
+            level = self.levels[name]
+            if level > 0:
+                column_codes, labels = enc.encode_column(table[name])
+                maps, level_labels = enc.level_maps(labels, self.hierarchies, name)
+                column_codes = np.take(maps[level], column_codes)
+                columns[name] = level_labels[level][column_codes]
+                # The values out of the hierarchy keep their own value
+                hierarchy = self.hierarchies[name]
+                known = hierarchy.codes(level_labels[level], level) >= 0
+                covered &= known[column_codes]
+
+        keep = None
+        if self.suppress:
+            if self._classes_index is None:
+                self._classes_index = pd.MultiIndex.from_arrays(
+                    [self.classes[name] for name in self.qi]
+                )
+            values = pd.MultiIndex.from_arrays(
+                [columns.get(name, table[name].values) for name in self.qi]
+            )
+            keep = self._classes_index.get_indexer(values) >= 0
+        if not covered.all():
+            keep = covered if keep is None else keep & covered
+
+        n_suppressed = ut.count_suppressed(keep)
+        if self.n_suppressed <= self.supp_threshold < self.n_suppressed + n_suppressed:
+            print(
+                f"{self.n_suppressed + n_suppressed} records suppressed, more than "
+                f"the {self.supp_threshold} allowed, the plan should be fitted again."
+            )
+        self.n_suppressed += n_suppressed
+        return ut.anonymized_table(table, self.ident, columns, keep)
+
+    def to_dict(self) -> dict:
+        """Plan of the anonymizer as a dictionary of python values.
+
+        :return: parameters, hierarchies and plan of the anonymizer.
+        :rtype: dictionary
+        """
+        classes = None
+        if self.classes is not None:
+            classes = {name: list(values) for name, values in self.classes.items()}
+        return {
+            "ident": self.ident,
+            "qi": self.qi,
+            "k": self.k,
+            "supp_threshold": self.supp_threshold,
+            "method": self.method,
+            "hierarchies": {
+                name: hierarchy.rows for name, hierarchy in self.hierarchies.items()
+            },
+            "levels": self.levels,
+            "suppress": self.suppress,
+            "classes": classes,
+        }
+
+    @classmethod
+    def from_dict(cls, plan: dict) -> "Anonymizer":
+        """Builds an anonymizer from its plan.
+
+        :param plan: parameters, hierarchies and plan, see :meth:`to_dict`.
+        :type plan: dictionary
+
+        :return: the anonymizer.
+        :rtype: Anonymizer
+        """
+        anonymizer = cls(
+            plan["ident"],
+            plan["qi"],
+            plan["k"],
+            plan["supp_threshold"],
+            plan["hierarchies"],
+            plan["method"],
+        )
+        anonymizer.levels = plan["levels"]
+        anonymizer.suppress = plan["suppress"]
+        if plan["classes"] is not None:
+            anonymizer.classes = {
+                name: np.asarray(values, dtype=object)
+                for name, values in plan["classes"].items()
+            }
+        return anonymizer
+
+    def save(self, path: str):
+        """Writes the plan to a JSON file.
+
+        :param path: path of the file.
+        :type path: string
+        """
+        with open(path, "w") as f:
+            json.dump(self.to_dict(), f, default=_json_value)
+
+    @classmethod
+    def load(cls, path: str) -> "Anonymizer":
+        """Reads an anonymizer from a JSON file written by :meth:`save`.
+
+        :param path: path of the file.
+        :type path: string
+
+        :return: the anonymizer.
+        :rtype: Anonymizer
+        """
+        with open(path) as f:
+            return cls.from_dict(json.load(f))
@@ -1,13 +1,19 @@
+import collections
+import contextlib
 import copy
+import heapq
 import typing
-import warnings
 import numpy as np
 import pandas as pd
-import pycanon.anonymity
-from pycanon import anonymity
-from pycanon.anonymity import utils
 import anonymity.metrics.efficiency_metrics as em
 import anonymity.metrics.data_utility_metrics as dat_ut
+from anonymity.tools.utils_k_anon import encoding as enc
+from anonymity.tools.utils_k_anon import equivalence_class as ec
+from anonymity.tools.utils_k_anon import frequency_set as fs
+from anonymity.tools.utils_k_anon import generalization_cache as gc
+from anonymity.tools.utils_k_anon import hierarchy as hie
+from anonymity.tools.utils_k_anon import lattice as lat
+from anonymity.tools.utils_k_anon import parallel as par
 from anonymity.tools.utils_k_anon import utils_k_anonymity as ut
 
 
@@ -18,8 +24,11 @@ def data_fly(
     k: int,
     supp_threshold: int,
     hierarchies: dict = {},
-) -> pd.DataFrame:
-    """Data-fly generalization algorithm for k-anonymity.
+    diversity: typing.Optional[fs.Diversity] = None,
+    return_suppressed: bool = False,
+) -> typing.Union[pd.DataFrame, typing.Tuple[pd.DataFrame, int]]:
+    """Data-fly generalization algorithm for k-anonymity, and l-diversity if
+    required.
 
     :param table: dataframe with the data under study.
     :type table: pandas dataframe
@@ -35,14 +44,23 @@ def data_fly(
     :param k: desired level of k-anonymity.
     :type k: int
 
-    :param supp_threshold: level of suppression allowed.
+    :param supp_threshold: maximum number of records that can be suppressed.
     :type supp_threshold: int
 
     :param hierarchies: hierarchies for generalization of columns.
     :type hierarchies: dictionary
 
-    :return: anonymized table.
-    :rtype: pandas dataframe
+    :param diversity: l-diversity that the anonymized table must also satisfy,
+        with the sensitive attributes to consider.
+    :type diversity: Diversity
+
+    :param return_suppressed: if True, the number of records suppressed is also
+        returned.
+    :type return_suppressed: bool
+
+    :return: anonymized table, and number of records suppressed if
+        return_suppressed is True.
+    :rtype: pandas dataframe or tuple
     """
 
     em.start_monitor_time()
@@ -50,141 +68,281 @@ def data_fly(
     em.monitor_memory_consumption_start()
     dat_ut.start_level()
 
-    table = ut.clear_white_spaces(table)
-    table = ut.suppress_identifiers(table, ident)
+    # The table is only read, the anonymized table is built at the end
+    table = ut.clear_white_spaces(table, copy=False)
+    hierarchies = hie.compile_hierarchies(hierarchies)
+
+    # The quasi-identifiers are generalized on their codes and only decoded at
+    # the end. The sensitive attributes are only needed for l-diversity
+    sa = [] if diversity is None else list(diversity.sa)
+    encoded = enc.EncodedTable(table, list(qi) + sa)
+    maps, labels = {}, {}
+    for name in qi:
+        maps[name], labels[name] = enc.level_maps(
+            encoded.labels[name], hierarchies, name
+        )
+
+    freq_set = fs.get_frequency_set(encoded, qi, sa)
+    current_gen_level, suppress = data_fly_search(
+        freq_set, qi, maps, k, supp_threshold, diversity
+    )
+
+    em.end_monitor_time()
+    em.monitor_cost("datafly")
+    em.monitor_memory_consumption_stop()
+
+    # The columns decoded are reused to find the records to suppress
+    cache = gc.GeneralizationCache()
+    columns = decode_columns(encoded, qi, maps, labels, current_gen_level, cache)
+    keep = None
+    if suppress:
+        # The records of the classes smaller than k fit in the budget
+        codes = generalized_codes(encoded, qi, maps, current_gen_level, cache)
+        keep = ~suppression_mask(table, codes, k, diversity)
+    new_table = ut.anonymized_table(table, ident, columns, keep)
+    if return_suppressed:
+        return new_table, ut.count_suppressed(keep)
+    return new_table
+
+
+def data_fly_search(base, qi, maps, k, supp_threshold, diversity=None):
+    """Chooses the levels of generalization of data-fly from the frequency set of
+    a table. The attribute with more distinct values is generalized until the
+    table satisfies k-anonymity, and l-diversity if required, or the records of
+    the classes that do not satisfy them can be suppressed.
+
+    :param base: frequency set of the table without generalization.
+    :type base: FrequencySet
+
+    :param qi: list with the name of the columns of the dataframe.
+        that are quasi-identifiers.
+    :type qi: list of strings
+
+    :param maps: arrays of codes of each level of each quasi-identifier.
+    :type maps: dictionary
+
+    :param k: desired level of k-anonymity.
+    :type k: int
+
+    :param supp_threshold: maximum number of records that can be suppressed.
+    :type supp_threshold: int
+
+    :param diversity: l-diversity required, the frequency set then includes the
+        histograms of the sensitive attributes.
+    :type diversity: Diversity
 
+    :return: level of generalization of each quasi-identifier, and True if the
+        records of the equivalence classes smaller than k have to be suppressed.
+    :rtype: tuple
+    """
     current_gen_level = {}
     for i in qi:
         current_gen_level[i] = 0
         dat_ut.get_level_generalization(i, current_gen_level[i])
 
-    k_real = anonymity.k_anonymity(table, qi)
+    # Only the frequency set is updated when an attribute is generalized, along
+    # with the number of distinct values of that attribute
+    freq_set = base
+    distinct = {
+        name: len(np.unique(base.codes[:, j])) for j, name in enumerate(base.names)
+    }
     qi_aux = copy.deepcopy(qi)
-    # og_table = copy.deepcopy(table)
-
-    if k_real >= k:
-        print(f"The data verifies k-anonymity with k={k_real}")
-        return table
-
-    while k_real < k:
-        if k_real <= supp_threshold:
-            equiv_class = anonymity.utils.aux_anonymity.get_equiv_class(table, qi)
-            len_ec = [len(ec) for ec in equiv_class]
-            if k > max(len_ec):
-                print(
-                    f"The anonymization cannot be carried out for "
-                    f"the given value k={k} only by suppression"
-                )
-            else:
-                data_ec = pd.DataFrame({"equiv_class": equiv_class, "k": len_ec})
-                data_ec_k = data_ec[data_ec.k < k]
-                ec_elim = np.concatenate(
-                    [
-                        anonymity.utils.aux_functions.convert(ec)
-                        for ec in data_ec_k.equiv_class.values
-                    ]
-                )
-                table_new = table.drop(ec_elim).reset_index()
-                assert anonymity.k_anonymity(table_new, qi) >= k
 
-                em.end_monitor_time()
-                em.monitor_cost("data_fly")
-                em.monitor_memory_consumption_stop()
+    if fs.suppressed_records(freq_set, k, diversity) == 0:
+        sizes = fs.kept_classes(freq_set, k, diversity)[0]
+        if len(sizes) > 0:
+            print(f"The data verifies k-anonymity with k={sizes.min()}")
+        return current_gen_level, False
 
-                return table_new
+    while fs.suppressed_records(freq_set, k, diversity) > 0:
+        if supp_threshold > 0 and fs.is_k_anonymous(
+            freq_set, k, supp_threshold, diversity
+        ):
+            return current_gen_level, True
 
         # Calculate the attribute with more unique values
         if len(qi_aux) == 0:
             print(
                 f"The anonymization cannot be carried out for " f"the given value k={k}"
             )
-            return table
-        occurrences_qi = [len(np.unique(table[i])) for i in qi_aux]
+            return current_gen_level, False
+        occurrences_qi = [distinct[i] for i in qi_aux]
         name = qi_aux[np.argmax(occurrences_qi)]
 
         em.monitor_cost_add("datafly")
-        new_ind = ut.generalization(
-            table[name].values.tolist(), hierarchies, current_gen_level[name] + 1, name
-        )
-
-        if new_ind is None:
+        if current_gen_level[name] + 1 >= len(maps[name]):
             if name in qi_aux:
                 qi_aux.remove(name)
         else:
-            table[name] = new_ind
             current_gen_level[name] = current_gen_level[name] + 1
+            mapping = enc.map_levels(
+                maps[name], current_gen_level[name], current_gen_level[name] - 1
+            )
+            if mapping is None:
+                # The levels are not nested, so the base has to be generalized
+                codes = np.column_stack(
+                    [
+                        (
+                            np.take(maps[n][current_gen_level[n]], base.codes[:, j])
+                            if n in current_gen_level
+                            else base.codes[:, j]
+                        )
+                        for j, n in enumerate(base.names)
+                    ]
+                )
+                freq_set = fs.aggregate(base.names, codes, base.counts, base.histograms)
+            else:
+                freq_set = fs.roll_up(freq_set, name, mapping)
+            column = freq_set.codes[:, freq_set.names.index(name)]
+            distinct[name] = len(np.unique(column))
 
-        k_real = anonymity.k_anonymity(table, qi)
-        # print(k_real)
         dat_ut.get_level_generalization(name, current_gen_level[name])
-        # print(table)
 
-    em.end_monitor_time()
-    em.monitor_cost("datafly")
-    em.monitor_memory_consumption_stop()
+    return current_gen_level, False
+
 
-    return table
+def suppression_mask(table, codes, k, diversity=None):
+    """Records of the equivalence classes smaller than k or, if l-diversity is
+    required, of the classes that do not satisfy it.
 
+    :param table: table under study, with the sensitive attributes.
+    :type table: pandas dataframe
 
-def new_level(current_lv, interval, lattice, limits):
-    """Takes care of calculating the next level of the lattice.
+    :param codes: matrix with the generalized codes of the quasi-identifiers.
+    :type codes: numpy array
 
-    :param current_lv: current level of the lattice.
-    :type current_lv: int
+    :param k: desired level of k-anonymity.
+    :type k: int
 
-    :param interval: corresponding to the level of the lattice
-    :type ident: interval
+    :param diversity: l-diversity required, if any.
+    :type diversity: Diversity
 
-    :param lattice: full lattice for incognito
-    :type lattice: pandas dataframe
+    :return: True for the records to suppress.
+    :rtype: numpy array
+    """
+    index = ec.EquivalenceClassIndex.from_codes(codes)
+    if diversity is None:
+        return index.suppression_mask(k)
+    for name in diversity.sa:
+        index.add_sensitive_attribute(name, table[name])
+    return index.suppression_mask(k, diversity.l, diversity.variant, diversity.c)
 
-    :param limits: numerical limits for each of the parameters that conform the lattice nodes
-    :type lattice: list of ints
 
-    :return: lattice with a new level added
-    :rtype: pandas dataframe
+def generalized_column(encoded, name, level, maps, cache=None):
+    """Generalizes the codes of a quasi-identifier of a table to a level. If a
+    cache of generalized columns is given, the generalized codes are kept in it,
+    so each column is generalized to each level only once while it lives.
+
+    :param encoded: quasi-identifiers of the table encoded.
+    :type encoded: EncodedTable
+
+    :param name: Name of the quasi-identifier.
+    :type name: string
+
+    :param level: level of generalization.
+    :type level: int
+
+    :param maps: arrays of codes of each level of each quasi-identifier.
+    :type maps: dictionary
+
+    :param cache: cache of generalized columns of the search.
+    :type cache: GeneralizationCache
+
+    :return: generalized code of each record.
+    :rtype: numpy array
     """
-    for i, value in enumerate(interval):
-        if value < limits[i]:
-            new_interval = copy.deepcopy(interval)
-            new_interval[i] += 1
-            if new_interval not in lattice[current_lv]:
-                lattice[current_lv].append(new_interval)
-    return lattice
+    if level == 0:
+        return encoded.codes[name]
+    mapping = maps[name][level]
+    if cache is None:
+        return np.take(mapping, encoded.codes[name])
+    key = (name, level, gc.fingerprint(encoded.fingerprint(name), mapping))
+    return cache.get_or_compute(key, lambda: np.take(mapping, encoded.codes[name]))
 
 
-def generate_lattice(hierarchies):
-    """Generates a lattice for a given hierarchy to apply incognito.
+def generalized_codes(encoded, qi, maps, gen_level, cache=None):
+    """Generalizes the codes of the quasi-identifiers of a table.
 
-    :param hierarchies: hierarchy for a given dataset
-    :type hierarchies: pandas dataframe
+    :param encoded: quasi-identifiers of the table encoded.
+    :type encoded: EncodedTable
 
-    :return: full lattice ready to apply incognito
-    :rtype: pandas dataframe
+    :param qi: list with the name of the columns of the dataframe.
+        that are quasi-identifiers.
+    :type qi: list of strings
+
+    :param maps: arrays of codes of each level of each quasi-identifier.
+    :type maps: dictionary
+
+    :param gen_level: level of generalization of each quasi-identifier.
+    :type gen_level: dictionary
+
+    :param cache: cache of generalized columns of the search.
+    :type cache: GeneralizationCache
+
+    :return: matrix with the generalized codes of one quasi-identifier in each
+        column.
+    :rtype: numpy array
+    """
+    return np.column_stack(
+        [generalized_column(encoded, name, gen_level[name], maps, cache) for name in qi]
+    )
+
+
+def decode_columns(encoded, qi, maps, labels, gen_level, cache=None):
+    """Obtains the generalized values of the quasi-identifiers of a table.
+
+    :param encoded: quasi-identifiers of the table encoded.
+    :type encoded: EncodedTable
+
+    :param qi: list with the name of the columns of the dataframe.
+        that are quasi-identifiers.
+    :type qi: list of strings
+
+    :param maps: arrays of codes of each level of each quasi-identifier.
+    :type maps: dictionary
+
+    :param labels: values of the codes of each level of each quasi-identifier.
+    :type labels: dictionary
+
+    :param gen_level: level of generalization of each quasi-identifier.
+    :type gen_level: dictionary
+
+    :param cache: cache of generalized columns of the search.
+    :type cache: GeneralizationCache
+
+    :return: generalized values of the quasi-identifiers that are not at the
+        level 0.
+    :rtype: dictionary
     """
-    ranges_aux = []
-    # print(hierarchies)
-    keys = hierarchies.keys()
-    limits = []
+    columns = {}
+    for name in qi:
+        level = gen_level[name]
+        if level != 0:
+            codes = generalized_column(encoded, name, level, maps, cache)
+            columns[name] = labels[name][level][codes]
+    return columns
 
-    for i in keys:
-        ranges_aux.append(range(len(hierarchies[i][0])))
-        limits.append(len(hierarchies[i][0]) - 1)
 
-    current_lv = 0
-    lattice = {0: [[0] * len(keys)]}
+def generate_lattice(hierarchies):
+    """Generates a lattice for a given hierarchy to apply incognito.
 
-    while limits not in lattice[current_lv]:
-        current_lv += 1
-        lattice[current_lv] = []
-        for i in lattice[current_lv - 1]:
-            lattice = new_level(current_lv, i, lattice, limits)
+    :param hierarchies: hierarchy for a given dataset
+    :type hierarchies: pandas dataframe
 
-    return lattice
+    :return: nodes of each height of the lattice, in lexicographic order.
+    :rtype: dictionary
+    """
+    lattice = lat.Lattice([len(hierarchies[name][0]) - 1 for name in hierarchies])
+    heights = lattice.node_heights
+    return {
+        height: lattice.levels[heights == height].tolist()
+        for height in range(int(lattice.heights.sum()) + 1)
+    }
 
 
-def generalize(table, node, hierarchies):
-    """Generalices a table for a given node of the lattice.
+def generalize(table, node, hierarchies, fingerprints=None, cache=None):
+    """Generalices a table for a given node of the lattice. The input table is not
+    modified.
 
     :param table: table that will be anonymized
     :type table: pandas dataframe
@@ -195,15 +353,386 @@ def generalize(table, node, hierarchies):
     :param hierarchies: hierarchies for generalization of columns.
     :type hierarchies: dictionary
 
+    :param fingerprints: fingerprints of the columns of the table, filled the first
+        time each column is generalized. A search that generalizes the same table
+        to several nodes passes the same dictionary to hash each column once.
+    :type fingerprints: dictionary
+
+    :param cache: cache of generalized columns of the search, each column is
+        generalized to each level only once while it lives.
+    :type cache: GeneralizationCache
+
     :return: anonymized table.
     :rtype: pandas dataframe
     """
+    hierarchies = hie.compile_hierarchies(hierarchies)
+    fingerprints = {} if fingerprints is None else fingerprints
+    names = list(hierarchies.keys())
+    columns = {}
     for i in range(len(node)):
         if node[i] != 0:
-            name = list(hierarchies.keys())[i]
-            table[name] = ut.generalization(table[name], hierarchies, node[i], name)
+            name = names[i]
+            column = table[name]
+
+            def compute():
+                return np.asarray(
+                    ut.generalization(column.copy(), hierarchies, node[i], name)
+                )
+
+            if cache is None:
+                columns[name] = compute()
+                continue
+            if name not in fingerprints:
+                fingerprints[name] = gc.fingerprint(
+                    column.values, hierarchies[name].fingerprint
+                )
+            cached = cache.get_or_compute((name, node[i], fingerprints[name]), compute)
+            # The cached arrays are read-only and shared with later calls
+            columns[name] = cached.copy()
+
+    return table.assign(**columns)
+
+
+def roll_up_node(freq_set, from_node, to_node, names, maps):
+    """Rolls up the frequency set of a node of the lattice to one of its
+    generalizations.
+
+    :param freq_set: frequency set of the node from_node.
+    :type freq_set: FrequencySet
+
+    :param from_node: levels of generalization of the frequency set.
+    :type from_node: tuple of ints
+
+    :param to_node: levels of generalization to reach, greater or equal than the
+        ones of from_node.
+    :type to_node: tuple of ints
+
+    :param names: quasi-identifiers that correspond to each level of the nodes.
+    :type names: list of strings
+
+    :param maps: arrays of codes between the levels of each quasi-identifier.
+    :type maps: dictionary
+
+    :return: frequency set of the node to_node, or None if some level of from_node
+        is not nested in the one of to_node.
+    :rtype: FrequencySet
+    """
+    for name, from_level, to_level in zip(names, from_node, to_node):
+        if to_level != from_level:
+            mapping = enc.map_levels(maps[name], to_level, from_level)
+            if mapping is None:
+                return None
+            freq_set = fs.roll_up(freq_set, name, mapping)
+    return freq_set
+
+
+def roll_up_closest(freq_sets, node, names, maps):
+    """Rolls up the frequency set of the most generalized node already evaluated
+    that is a specialization of the given one.
+
+    :param freq_sets: frequency sets of the nodes evaluated, including the node
+        without generalization.
+    :type freq_sets: dictionary
+
+    :param node: levels of generalization to reach.
+    :type node: tuple of ints
+
+    :param names: quasi-identifiers that correspond to each level of the nodes.
+    :type names: list of strings
+
+    :param maps: arrays of codes between the levels of each quasi-identifier.
+    :type maps: dictionary
+
+    :return: frequency set of the node.
+    :rtype: FrequencySet
+    """
+    parents = [n for n in freq_sets if all(a <= b for a, b in zip(n, node))]
+    for parent in sorted(parents, key=sum, reverse=True):
+        freq_set = roll_up_node(freq_sets[parent], parent, node, names, maps)
+        if freq_set is not None:
+            return freq_set
+
+
+def apply_node(
+    table,
+    ident,
+    encoded,
+    qi,
+    k,
+    supp_threshold,
+    node,
+    names,
+    maps,
+    labels,
+    diversity=None,
+    return_suppressed=False,
+):
+    """Generalizes a table to the given node of the lattice and suppresses the
+    records of the equivalence classes smaller than k, or that do not satisfy
+    l-diversity if required. Only the quasi-identifiers are generalized, on their
+    codes, and the anonymized table is built once.
+
+    :param table: table that will be anonymized.
+    :type table: pandas dataframe
+
+    :param ident: list with the name of the columns of the dataframe.
+        that are identifiers.
+    :type ident: list of strings
+
+    :param encoded: quasi-identifiers of the table encoded.
+    :type encoded: EncodedTable
+
+    :param qi: list with the name of the columns of the dataframe.
+        that are quasi-identifiers.
+    :type qi: list of strings
+
+    :param k: desired level of k-anonymity.
+    :type k: int
+
+    :param supp_threshold: maximum number of records that can be suppressed.
+    :type supp_threshold: int
+
+    :param node: level of generalization of each quasi-identifier in names.
+    :type node: tuple of ints
+
+    :param names: quasi-identifiers that correspond to each level of the node.
+    :type names: list of strings
+
+    :param maps: arrays of codes between the levels of each quasi-identifier.
+    :type maps: dictionary
+
+    :param labels: values of the codes of each level of each quasi-identifier.
+    :type labels: dictionary
+
+    :param diversity: l-diversity that the anonymized table must also satisfy,
+        with the sensitive attributes to consider.
+    :type diversity: Diversity
+
+    :param return_suppressed: if True, the number of records suppressed is also
+        returned.
+    :type return_suppressed: bool
+
+    :return: anonymized table, and number of records suppressed if
+        return_suppressed is True.
+    :rtype: pandas dataframe or tuple
+    """
+    codes = dict(encoded.codes)
+    columns = {}
+    for i, name in enumerate(names):
+        if node[i] != 0:
+            codes[name] = generalized_column(encoded, name, node[i], maps)
+            columns[name] = labels[name][node[i]][codes[name]]
+
+    keep = None
+    if supp_threshold > 0:
+        suppressed = suppression_mask(
+            table, np.column_stack([codes[name] for name in qi]), k, diversity
+        )
+        if suppressed.any():
+            keep = ~suppressed
+
+    new_table = ut.anonymized_table(table, ident, columns, keep)
+    if return_suppressed:
+        return new_table, ut.count_suppressed(keep)
+    return new_table
+
+
+def graph_generation(nodes):
+    """Generates the candidate nodes for the subsets of quasi-identifiers of the next
+    size, joining the nodes that satisfy k-anonymity for the current size. A candidate
+    is discarded when any of its projections does not satisfy k-anonymity.
+
+    :param nodes: nodes that satisfy k-anonymity, as tuples with the indexes of the
+        quasi-identifiers of the subset and their levels of generalization.
+    :type nodes: list of tuples
+
+    :return: candidate nodes for the next subset size.
+    :rtype: list of tuples
+    """
+    nodes = set(nodes)
+    prefixes = {}
+    for subset, levels in sorted(nodes):
+        key = (subset[:-1], levels[:-1])
+        prefixes.setdefault(key, []).append((subset[-1], levels[-1]))
+
+    candidates = []
+    for (subset, levels), last in prefixes.items():
+        for attr_a, level_a in last:
+            for attr_b, level_b in last:
+                if attr_a >= attr_b:
+                    continue
+                new_subset = subset + (attr_a, attr_b)
+                new_levels = levels + (level_a, level_b)
+                projections = [
+                    (
+                        new_subset[:i] + new_subset[i + 1 :],
+                        new_levels[:i] + new_levels[i + 1 :],
+                    )
+                    for i in range(len(new_subset))
+                ]
+                if all(projection in nodes for projection in projections):
+                    candidates.append((new_subset, new_levels))
+
+    return candidates
+
+
+class SubsetSearch(typing.NamedTuple):
+    """State of the search over the lattice of a subset of quasi-identifiers."""
+
+    subset: tuple
+    columns: typing.List[str]
+    lattice: lat.Lattice
+    nodes: np.ndarray
+    candidate: np.ndarray
+    marked: np.ndarray
+    queue: list
+    freq_sets: dict
+
+
+def subset_search(
+    candidates,
+    base,
+    qi,
+    names,
+    maps,
+    k,
+    supp_threshold,
+    evaluate=None,
+    diversity=None,
+):
+    """Breadth-first search over the candidate nodes of each subset of
+    quasi-identifiers. When a node satisfies k-anonymity, and l-diversity if
+    required, all its generalizations are marked as satisfying it without being
+    evaluated.
+
+    :param candidates: candidate nodes, as tuples with the indexes of the
+        quasi-identifiers of the subset and their levels of generalization.
+    :type candidates: list of tuples
+
+    :param base: frequency set of the table without generalization.
+    :type base: FrequencySet
+
+    :param qi: list with the name of the columns of the dataframe.
+        that are quasi-identifiers.
+    :type qi: list of strings
+
+    :param names: quasi-identifiers that can be generalized.
+    :type names: list of strings
+
+    :param maps: arrays of codes between the levels of each quasi-identifier.
+    :type maps: dictionary
+
+    :param k: desired level of k-anonymity.
+    :type k: int
+
+    :param supp_threshold: maximum number of records that can be suppressed.
+    :type supp_threshold: int
 
-    return table
+    :param evaluate: function that evaluates a list of nodes in parallel, given as
+        the quasi-identifiers of the subset and their levels, and returns whether
+        each one satisfies k-anonymity and its discernibility.
+    :type evaluate: callable
+
+    :param diversity: l-diversity required, the frequency set then includes the
+        histograms of the sensitive attributes.
+    :type diversity: Diversity
+
+    :return: nodes that satisfy k-anonymity, with their discernibility if they
+        were evaluated or None if they were marked.
+    :rtype: dictionary
+    """
+    fixed = [name for name in qi if name not in names]
+    subsets = {}
+    for subset, levels in candidates:
+        subsets.setdefault(subset, set()).add(levels)
+
+    searches = []
+    for subset, nodes in subsets.items():
+        columns = [names[i] for i in subset]
+        lattice = lat.Lattice([len(maps[name]) - 1 for name in columns])
+        nodes = lattice.encode(sorted(nodes))
+        candidate = np.zeros(len(lattice), dtype=bool)
+        candidate[nodes] = True
+
+        # The search starts from the candidates without candidate predecessors
+        queue = [
+            (lattice.height(node), int(node))
+            for node in nodes
+            if not candidate[lattice.predecessors(node)].any()
+        ]
+        heapq.heapify(queue)
+        lattice.visit([node for _, node in queue])
+        marked = np.zeros(len(lattice), dtype=bool)
+        searches.append(
+            SubsetSearch(subset, columns, lattice, nodes, candidate, marked, queue, {})
+        )
+
+    def roll_up(search, node):
+        columns, lattice = search.columns, search.lattice
+        levels = lattice.node(node)
+        for parent in lattice.predecessors(node):
+            if parent in search.freq_sets:
+                freq_set = roll_up_node(
+                    search.freq_sets[parent],
+                    lattice.node(parent),
+                    levels,
+                    columns,
+                    maps,
+                )
+                if freq_set is not None:
+                    return freq_set
+        return roll_up_node(
+            fs.project(base, columns + fixed), (0,) * len(levels), levels, columns, maps
+        )
+
+    # The nodes of the same height do not depend on each other, so they are
+    # evaluated together, in parallel if there is an evaluator
+    result = {}
+    while any(search.queue for search in searches):
+        height = min(search.queue[0][0] for search in searches if search.queue)
+        batch = []
+        for search in searches:
+            while search.queue and search.queue[0][0] == height:
+                node = heapq.heappop(search.queue)[1]
+                if not search.marked[node]:
+                    batch.append((search, node))
+
+        if evaluate is None:
+            evaluated = []
+            for search, node in batch:
+                freq_set = roll_up(search, node)
+                if fs.is_k_anonymous(freq_set, k, supp_threshold, diversity):
+                    metric = fs.discernibility(freq_set, k, diversity)
+                    evaluated.append((True, metric))
+                else:
+                    search.freq_sets[node] = freq_set
+                    evaluated.append((False, None))
+        else:
+            evaluated = evaluate(
+                [(search.columns, search.lattice.node(node)) for search, node in batch]
+            )
+
+        for (search, node), (anonymous, metric) in zip(batch, evaluated):
+            lattice, marked = search.lattice, search.marked
+            em.monitor_cost_add("incognito")
+            if anonymous:
+                result[(search.subset, lattice.node(node))] = metric
+                marked[lattice.generalizations(node, search.nodes)] = True
+                marked[node] = False
+            else:
+                children = lattice.successors(node)
+                children = children[
+                    search.candidate[children] & ~lattice.visited(children)
+                ]
+                lattice.visit(children)
+                for child in children:
+                    heapq.heappush(search.queue, (height + 1, int(child)))
+
+    for search in searches:
+        for node in np.flatnonzero(search.marked):
+            result.setdefault((search.subset, search.lattice.node(node)), None)
+
+    return result
 
 
 def incognito(
@@ -213,8 +742,17 @@ def incognito(
     k: int,
     supp_threshold: int,
     hierarchies: dict,
-) -> pd.DataFrame:
-    """Incognito generalization algorithm for k-anonymity.
+    n_jobs: int = 1,
+    diversity: typing.Optional[fs.Diversity] = None,
+    return_suppressed: bool = False,
+) -> typing.Union[pd.DataFrame, typing.Tuple[pd.DataFrame, int]]:
+    """Incognito generalization algorithm for k-anonymity, and l-diversity if
+    required. The lattices of the subsets
+    of one quasi-identifier are searched first, then the ones of two quasi-identifiers
+    and so on, discarding the nodes whose projections do not satisfy k-anonymity.
+    Among the minimal k-anonymous nodes, the one with the lowest discernibility is
+    applied. The nodes of the same height can be evaluated by several processes,
+    which share the frequency set of the table.
 
     :param table: dataframe with the data under study.
     :type table: pandas dataframe
@@ -230,103 +768,621 @@ def incognito(
     :param k: desired level of k-anonymity.
     :type k: int
 
-    :param supp_threshold: level of suppression allowed.
+    :param supp_threshold: maximum number of records that can be suppressed.
     :type supp_threshold: int
 
     :param hierarchies: hierarchies for generalization of columns.
     :type hierarchies: dictionary
 
-    :return: anonymized table.
-    :rtype: pandas dataframe
+    :param n_jobs: number of processes used to evaluate the nodes of the lattice.
+    :type n_jobs: int
+
+    :param diversity: l-diversity that the anonymized table must also satisfy,
+        with the sensitive attributes to consider.
+    :type diversity: Diversity
+
+    :param return_suppressed: if True, the number of records suppressed is also
+        returned.
+    :type return_suppressed: bool
+
+    :return: anonymized table, and number of records suppressed if
+        return_suppressed is True.
+    :rtype: pandas dataframe or tuple
     """
-    warnings.simplefilter("ignore", pd.errors.SettingWithCopyWarning)
+    em.monitor_cost_init("incognito")
+
+    # The table is only read, the anonymized table is built at the end
+    table = ut.clear_white_spaces(table, copy=False)
+    hierarchies = hie.compile_hierarchies(hierarchies)
+
+    # Only the quasi-identifiers with a hierarchy can be generalized
+    names = [name for name in hierarchies if name in qi]
+    sa = [] if diversity is None else list(diversity.sa)
+    encoded = enc.EncodedTable(table, list(qi) + sa)
+    maps, labels = {}, {}
+    for name in names:
+        maps[name], labels[name] = enc.level_maps(
+            encoded.labels[name], hierarchies, name
+        )
+    base = fs.get_frequency_set(encoded, qi, sa)
 
-    lattice = generate_lattice(hierarchies)
-    current_lv = 0  # To check if we have traversed all the lvs
-    iter_in_lv = 0  # To check if we have traversed the current lv fully
-    max_lv = len(lattice.keys())
-    max_iter_lv = len(lattice[current_lv])
+    node = incognito_search(base, qi, names, maps, k, supp_threshold, n_jobs, diversity)
+    if node is None:
+        print(f"Unnable to achieve k={k}")
+        new_table = ut.anonymized_table(table, ident)
+        return (new_table, 0) if return_suppressed else new_table
+
+    return apply_node(
+        table,
+        ident,
+        encoded,
+        qi,
+        k,
+        supp_threshold,
+        node,
+        names,
+        maps,
+        labels,
+        diversity,
+        return_suppressed,
+    )
+
+
+def incognito_search(
+    base, qi, names, maps, k, supp_threshold, n_jobs=1, diversity=None
+):
+    """Chooses the node of the lattice of incognito from the frequency set of a
+    table: among the minimal k-anonymous nodes, the one with the lowest
+    discernibility. If l-diversity is required, it is checked on each node along
+    with k-anonymity.
+
+    :param base: frequency set of the table without generalization.
+    :type base: FrequencySet
 
-    table = ut.clear_white_spaces(table)
-    table = ut.suppress_identifiers(table, ident)
+    :param qi: list with the name of the columns of the dataframe.
+        that are quasi-identifiers.
+    :type qi: list of strings
 
-    possible_nodes = {}
-    traversed_nodes = []
+    :param names: quasi-identifiers that can be generalized.
+    :type names: list of strings
 
-    while current_lv < max_lv:
-        current_node = lattice[current_lv][iter_in_lv]
+    :param maps: arrays of codes of each level of each quasi-identifier.
+    :type maps: dictionary
 
-        if current_node not in traversed_nodes:
-            new_table = generalize(copy.deepcopy(table), current_node, hierarchies)
+    :param k: desired level of k-anonymity.
+    :type k: int
 
-            if k == pycanon.anonymity.k_anonymity(new_table, qi):
-                possible_nodes[dat_ut.discernibility(table, new_table, qi)] = [
-                    current_node,
-                    False,
-                ]
+    :param supp_threshold: maximum number of records that can be suppressed.
+    :type supp_threshold: int
 
-            elif pycanon.anonymity.k_anonymity(new_table, qi) <= supp_threshold:
-                equiv_class = anonymity.utils.aux_anonymity.get_equiv_class(table, qi)
-                len_ec = [len(ec) for ec in equiv_class]
-                if k > max(len_ec):
-                    print(
-                        f"The anonymization cannot be carried out for "
-                        f"the given value k={k} only by suppression"
-                    )
-                else:
-                    data_ec = pd.DataFrame({"equiv_class": equiv_class, "k": len_ec})
-                    data_ec_k = data_ec[data_ec.k < k]
-                    ec_elim = np.concatenate(
-                        [
-                            anonymity.utils.aux_functions.convert(ec)
-                            for ec in data_ec_k.equiv_class.values
-                        ]
-                    )
-                    new_table = table.drop(ec_elim).reset_index()
-                    assert anonymity.k_anonymity(new_table, qi) >= k
+    :param n_jobs: number of processes used to evaluate the nodes of the lattice.
+    :type n_jobs: int
 
-                    possible_nodes[dat_ut.discernibility(table, new_table, qi)] = [
-                        current_node,
-                        True,
-                    ]
+    :param diversity: l-diversity required, the frequency set then includes the
+        histograms of the sensitive attributes.
+    :type diversity: Diversity
 
-        traversed_nodes.append(current_node)
-
-        # Reset trackers for the new level
-        iter_in_lv = iter_in_lv + 1
-        if iter_in_lv >= max_iter_lv:
-            iter_in_lv = 0
-            current_lv = current_lv + 1
-            if current_lv < max_lv:
-                max_iter_lv = len(lattice[current_lv])
-
-    metric = np.inf
-    node = {}
-    for i in possible_nodes.keys():
-        if i < metric:
-            metric = i
-            node = possible_nodes[i]
-
-    if len(node):
-        if node[1] is True:
-            equiv_class = anonymity.utils.aux_anonymity.get_equiv_class(
-                generalize(table, node[0], hierarchies), qi
+    :return: level of generalization of each quasi-identifier in names, or None if
+        no node satisfies k-anonymity.
+    :rtype: tuple of ints
+    """
+    if len(names) == 0:
+        em.monitor_cost_add("incognito")
+        anonymous = fs.is_k_anonymous(base, k, supp_threshold, diversity)
+        return () if anonymous else None
+
+    # Subsets of one quasi-identifier first, then pairs, and so on. Only the
+    # nodes whose projections satisfy k-anonymity are considered
+    candidates = [
+        ((i,), (level,))
+        for i, name in enumerate(names)
+        for level in range(len(maps[name]))
+    ]
+    with contextlib.ExitStack() as stack:
+        evaluate = None
+        if n_jobs > 1:
+            fixed = [name for name in qi if name not in names]
+            evaluate = stack.enter_context(
+                par.node_evaluator(
+                    base, fixed, maps, k, supp_threshold, n_jobs, diversity
+                )
             )
-            len_ec = [len(ec) for ec in equiv_class]
-            data_ec = pd.DataFrame({"equiv_class": equiv_class, "k": len_ec})
-            data_ec_k = data_ec[data_ec.k < k]
-            ec_elim = np.concatenate(
-                [
-                    anonymity.utils.aux_functions.convert(ec)
-                    for ec in data_ec_k.equiv_class.values
-                ]
+        for size in range(1, len(names) + 1):
+            satisfying = subset_search(
+                candidates,
+                base,
+                qi,
+                names,
+                maps,
+                k,
+                supp_threshold,
+                evaluate,
+                diversity,
             )
-            return table.drop(ec_elim).reset_index()
-    else:
+            if size < len(names):
+                candidates = graph_generation(satisfying.keys())
+
+    # The minimal k-anonymous nodes are always evaluated, the rest are more
+    # general than some of them
+    possible_nodes = [
+        (metric, sum(levels), levels)
+        for (_, levels), metric in satisfying.items()
+        if metric is not None
+    ]
+    if len(possible_nodes) == 0:
+        return None
+    return min(possible_nodes)[2]
+
+
+def flash(
+    table: pd.DataFrame,
+    ident: typing.Union[typing.List, np.ndarray],
+    qi: typing.Union[typing.List, np.ndarray],
+    k: int,
+    supp_threshold: int,
+    hierarchies: dict,
+    diversity: typing.Optional[fs.Diversity] = None,
+    return_suppressed: bool = False,
+) -> typing.Union[pd.DataFrame, typing.Tuple[pd.DataFrame, int]]:
+    """Flash generalization algorithm for k-anonymity, and l-diversity if
+    required. The lattice is traversed following greedy paths from the least
+    generalized nodes, checking each path with a binary search. When a node
+    satisfies k-anonymity all its generalizations are tagged as satisfying it, and
+    when it does not all its specializations are tagged as not satisfying it, so
+    those nodes are never evaluated. Among the k-anonymous nodes evaluated, which
+    include all the minimal ones, the one with the lowest discernibility is
+    applied.
+
+    :param table: dataframe with the data under study.
+    :type table: pandas dataframe
+
+    :param ident: list with the name of the columns of the dataframe.
+        that are identifiers.
+    :type ident: list of strings
+
+    :param qi: list with the name of the columns of the dataframe.
+        that are quasi-identifiers.
+    :type qi: list of strings
+
+    :param k: desired level of k-anonymity.
+    :type k: int
+
+    :param supp_threshold: maximum number of records that can be suppressed.
+    :type supp_threshold: int
+
+    :param hierarchies: hierarchies for generalization of columns.
+    :type hierarchies: dictionary
+
+    :param diversity: l-diversity that the anonymized table must also satisfy,
+        with the sensitive attributes to consider.
+    :type diversity: Diversity
+
+    :param return_suppressed: if True, the number of records suppressed is also
+        returned.
+    :type return_suppressed: bool
+
+    :return: anonymized table, and number of records suppressed if
+        return_suppressed is True.
+    :rtype: pandas dataframe or tuple
+    """
+    em.monitor_cost_init("flash")
+
+    # The table is only read, the anonymized table is built at the end
+    table = ut.clear_white_spaces(table, copy=False)
+    hierarchies = hie.compile_hierarchies(hierarchies)
+
+    names = [name for name in hierarchies if name in qi]
+    sa = [] if diversity is None else list(diversity.sa)
+    encoded = enc.EncodedTable(table, list(qi) + sa)
+    maps, labels = {}, {}
+    for name in names:
+        maps[name], labels[name] = enc.level_maps(
+            encoded.labels[name], hierarchies, name
+        )
+    lattice = lat.Lattice([len(maps[name]) - 1 for name in names])
+    relative_heights = (lattice.levels / np.maximum(lattice.heights, 1)).sum(axis=1)
+    base = fs.get_frequency_set(encoded, qi, sa)
+
+    def successors(node):
+        nodes = lattice.successors(node)
+        return nodes[np.lexsort((nodes, relative_heights[nodes]))]
+
+    # The nodes visited are tagged, True if the node satisfies k-anonymity
+    anonymous = np.zeros(len(lattice), dtype=bool)
+    freq_sets = {lattice.node(lattice.bottom): base}
+    possible_nodes = []
+
+    def tag(node, value, neighbours):
+        pending = [node]
+        while pending:
+            others = neighbours(pending.pop())
+            others = others[~lattice.visited(others)]
+            lattice.visit(others)
+            anonymous[others] = value
+            pending.extend(others)
+
+    def check(node):
+        levels = lattice.node(node)
+        freq_set = roll_up_closest(freq_sets, levels, names, maps)
+        em.monitor_cost_add("flash")
+
+        lattice.visit(node)
+        anonymous[node] = fs.is_k_anonymous(freq_set, k, supp_threshold, diversity)
+        if anonymous[node]:
+            discernibility = fs.discernibility(freq_set, k, diversity)
+            possible_nodes.append((discernibility, sum(levels), levels))
+            tag(node, True, successors)
+        else:
+            freq_sets[levels] = freq_set
+            tag(node, False, lattice.predecessors)
+        return anonymous[node]
+
+    def find_path(node):
+        path = [node]
+        while True:
+            following = successors(path[-1])
+            following = following[~lattice.visited(following)]
+            if len(following) == 0:
+                return path
+            path.append(int(following[0]))
+
+    def check_path(path, heap):
+        low, high = 0, len(path) - 1
+        while low <= high:
+            mid = (low + high) // 2
+            node = path[mid]
+            if lattice.visited(node):
+                satisfies = anonymous[node]
+            else:
+                satisfies = check(node)
+                if not satisfies:
+                    heapq.heappush(heap, (lattice.height(node), node))
+            if satisfies:
+                high = mid - 1
+            else:
+                low = mid + 1
+
+    # Nodes by height, and by relative height within the same height
+    order = np.lexsort((lattice.nodes(), relative_heights, lattice.node_heights))
+    for node in order:
+        if lattice.visited(node):
+            continue
+        heap = []
+        check_path(find_path(int(node)), heap)
+        while heap:
+            _, current = heapq.heappop(heap)
+            for up in successors(current):
+                if not lattice.visited(up):
+                    check_path(find_path(int(up)), heap)
+
+    if len(possible_nodes) == 0:
         print(f"Unnable to achieve k={k}")
-        return table
+        new_table = ut.anonymized_table(table, ident)
+        return (new_table, 0) if return_suppressed else new_table
+
+    node = min(possible_nodes)[2]
+    return apply_node(
+        table,
+        ident,
+        encoded,
+        qi,
+        k,
+        supp_threshold,
+        node,
+        names,
+        maps,
+        labels,
+        diversity,
+        return_suppressed,
+    )
+
+
+def samarati(
+    table: pd.DataFrame,
+    ident: typing.Union[typing.List, np.ndarray],
+    qi: typing.Union[typing.List, np.ndarray],
+    k: int,
+    supp_threshold: int,
+    hierarchies: dict,
+    diversity: typing.Optional[fs.Diversity] = None,
+    return_suppressed: bool = False,
+) -> typing.Union[pd.DataFrame, typing.Tuple[pd.DataFrame, int]]:
+    """Samarati generalization algorithm for k-anonymity, and l-diversity if
+    required. Binary search over the heights of the lattice to find the lowest
+    height with some node that satisfies k-anonymity, evaluating only the nodes of
+    the heights probed. Among the k-anonymous nodes of that height, the one with
+    the lowest discernibility is applied.
+
+    :param table: dataframe with the data under study.
+    :type table: pandas dataframe
+
+    :param ident: list with the name of the columns of the dataframe.
+        that are identifiers.
+    :type ident: list of strings
 
-    return generalize(table, node[0], hierarchies)
+    :param qi: list with the name of the columns of the dataframe.
+        that are quasi-identifiers.
+    :type qi: list of strings
+
+    :param k: desired level of k-anonymity.
+    :type k: int
+
+    :param supp_threshold: maximum number of records that can be suppressed.
+    :type supp_threshold: int
+
+    :param hierarchies: hierarchies for generalization of columns.
+    :type hierarchies: dictionary
+
+    :param diversity: l-diversity that the anonymized table must also satisfy,
+        with the sensitive attributes to consider.
+    :type diversity: Diversity
+
+    :param return_suppressed: if True, the number of records suppressed is also
+        returned.
+    :type return_suppressed: bool
+
+    :return: anonymized table, and number of records suppressed if
+        return_suppressed is True.
+    :rtype: pandas dataframe or tuple
+    """
+    em.monitor_cost_init("samarati")
+
+    # The table is only read, the anonymized table is built at the end
+    table = ut.clear_white_spaces(table, copy=False)
+    hierarchies = hie.compile_hierarchies(hierarchies)
+
+    qi_hierarchies = {name: hierarchies[name] for name in hierarchies if name in qi}
+    names = list(qi_hierarchies.keys())
+    sa = [] if diversity is None else list(diversity.sa)
+    encoded = enc.EncodedTable(table, list(qi) + sa)
+    maps, labels = {}, {}
+    for name in names:
+        maps[name], labels[name] = enc.level_maps(
+            encoded.labels[name], hierarchies, name
+        )
+    lattice = lat.Lattice([len(maps[name]) - 1 for name in names])
+    bottom = lattice.node(lattice.bottom)
+
+    # Frequency sets of the last height where no node satisfies k-anonymity, the
+    # next heights probed are always higher, and of the bottom of the lattice
+    base = {bottom: fs.get_frequency_set(encoded, qi, sa)}
+    freq_sets = base
+    possible_nodes = []
+    low, high = 0, int(lattice.heights.sum())
+
+    while low <= high:
+        height = (low + high) // 2
+        satisfying = []
+        new_freq_sets = {}
+        for current_node in lattice.nodes(height):
+            node = lattice.node(current_node)
+            freq_set = roll_up_closest(freq_sets, node, names, maps)
+            em.monitor_cost_add("samarati")
+
+            if fs.is_k_anonymous(freq_set, k, supp_threshold, diversity):
+                satisfying.append((fs.discernibility(freq_set, k, diversity), node))
+            else:
+                new_freq_sets[node] = freq_set
+
+        if len(satisfying) > 0:
+            possible_nodes = satisfying
+            high = height - 1
+        else:
+            freq_sets = {**base, **new_freq_sets}
+            low = height + 1
+
+    if len(possible_nodes) == 0:
+        print(f"Unnable to achieve k={k}")
+        new_table = ut.anonymized_table(table, ident)
+        return (new_table, 0) if return_suppressed else new_table
+
+    node = min(possible_nodes)[1]
+    return apply_node(
+        table,
+        ident,
+        encoded,
+        qi,
+        k,
+        supp_threshold,
+        node,
+        names,
+        maps,
+        labels,
+        diversity,
+        return_suppressed,
+    )
+
+
+def mondrian_encoding(column, hierarchies, name):
+    """Encodes a quasi-identifier as an ordered numeric array for Mondrian. Numeric
+    columns are used as they are. The values of the rest of the columns are
+    ordered following the hierarchy when there is one, so the values that share an
+    ancestor are contiguous, or alphabetically otherwise.
+
+    :param column: column from the table under study.
+    :type column: pandas series
+
+    :param hierarchies: hierarchies for generalization of columns.
+    :type hierarchies: dictionary
+
+    :param name: Name of the column.
+    :type name: string
+
+    :return: numeric value of each record.
+    :rtype: numpy array
+    """
+    if pd.api.types.is_numeric_dtype(column):
+        return column.values.astype(np.float64)
+
+    values = sorted(pd.unique(column.values.astype(str)))
+    if name in hierarchies:
+        leaves = [
+            str(row[0])
+            for row in sorted(
+                hierarchies[name], key=lambda x: [str(v) for v in x[::-1]]
+            )
+        ]
+        values = list(dict.fromkeys(leaves)) + [v for v in values if v not in leaves]
+    codes = pd.Categorical(column.values.astype(str), categories=values).codes
+    return codes.astype(np.float64)
+
+
+def mondrian_split(column, k):
+    """Splits a partition by the median of one of its quasi-identifiers.
+
+    :param column: numeric values of the quasi-identifier in the partition.
+    :type column: numpy array
+
+    :param k: desired level of k-anonymity.
+    :type k: int
+
+    :return: mask with the records of the left partition, or None if both
+        partitions cannot have at least k records.
+    :rtype: numpy array
+    """
+    middle = len(column) // 2
+    median = np.partition(column, middle)[middle]
+    for left in (column < median, column <= median):
+        n_left = np.count_nonzero(left)
+        if n_left >= k and len(column) - n_left >= k:
+            return left
+    return None
+
+
+def mondrian_summary(column, partition, hierarchies, name):
+    """Generalizes a quasi-identifier replacing the values of each partition by a
+    summary of them: the range of values for numeric columns, the lowest common
+    ancestor in the hierarchy when there is one, or the set of values otherwise.
+
+    :param column: column from the table under study.
+    :type column: pandas series
+
+    :param partition: partition of each record.
+    :type partition: numpy array
+
+    :param hierarchies: hierarchies for generalization of columns.
+    :type hierarchies: dictionary
+
+    :param name: Name of the column.
+    :type name: string
+
+    :return: generalized column.
+    :rtype: numpy array
+    """
+    groups = column.groupby(partition, sort=True)
+
+    if pd.api.types.is_numeric_dtype(column):
+        ranges = groups.agg(["min", "max"])
+        labels = [
+            str(low) if low == high else f"[{low}, {high}]"
+            for low, high in zip(ranges["min"].values, ranges["max"].values)
+        ]
+        return np.asarray(labels, dtype=object)[partition]
+
+    if name in hierarchies:
+        codes, values = enc.encode_column(column)
+        maps, level_labels = enc.level_maps(values, hierarchies, name)
+        labels = np.empty(groups.ngroups, dtype=object)
+        pending = np.ones(groups.ngroups, dtype=bool)
+        for level in range(len(maps)):
+            mapped = pd.Series(maps[level][codes], index=column.index)
+            grouped = mapped.groupby(partition, sort=True)
+            unique = (grouped.nunique(dropna=False) == 1).values & pending
+            labels[unique] = level_labels[level][grouped.first().values[unique]]
+            pending &= ~unique
+        if not pending.any():
+            return labels[partition]
+
+    pairs = pd.DataFrame({"partition": partition, "value": column.values.astype(str)})
+    pairs = pairs.drop_duplicates().sort_values(["partition", "value"])
+    part = pairs["partition"].values
+    values = pairs["value"].values.astype(object)
+    first = np.r_[True, part[1:] != part[:-1]]
+    values[~first] = "," + values[~first]
+    labels = np.add.reduceat(values, np.flatnonzero(first))
+    return labels[partition]
+
+
+def mondrian(
+    table: pd.DataFrame,
+    ident: typing.Union[typing.List, np.ndarray],
+    qi: typing.Union[typing.List, np.ndarray],
+    k: int,
+    hierarchies: dict = {},
+) -> pd.DataFrame:
+    """Mondrian multidimensional partitioning algorithm for k-anonymity. The table is
+    split recursively by the median of the quasi-identifier with the widest
+    normalized range, as long as both halves have at least k records, and the
+    values of each final partition are replaced by a summary of them. The partitions
+    are processed with a work queue.
+
+    :param table: dataframe with the data under study.
+    :type table: pandas dataframe
+
+    :param ident: list with the name of the columns of the dataframe.
+        that are identifiers.
+    :type ident: list of strings
+
+    :param qi: list with the name of the columns of the dataframe.
+        that are quasi-identifiers.
+    :type qi: list of strings
+
+    :param k: desired level of k-anonymity.
+    :type k: int
+
+    :param hierarchies: hierarchies for ordering and generalization of the string
+        columns.
+    :type hierarchies: dictionary
+
+    :return: anonymized table.
+    :rtype: pandas dataframe
+    """
+    em.monitor_cost_init("mondrian")
+
+    # The table is only read, the anonymized table is built at the end
+    table = ut.clear_white_spaces(table, copy=False)
+    hierarchies = hie.compile_hierarchies(hierarchies)
+
+    if len(table) < k:
+        print(f"Unnable to achieve k={k}")
+        return ut.anonymized_table(table, ident)
+
+    data = np.column_stack(
+        [mondrian_encoding(table[name], hierarchies, name) for name in qi]
+    )
+    spans = data.max(axis=0) - data.min(axis=0)
+    spans[spans == 0] = 1
+
+    partition = np.zeros(len(table), dtype=np.int64)
+    n_partitions = 0
+    queue = collections.deque([np.arange(len(table))])
+    while queue:
+        rows = queue.popleft()
+        em.monitor_cost_add("mondrian")
+        values = data[rows]
+        widths = (values.max(axis=0) - values.min(axis=0)) / spans
+
+        left = None
+        for dim in np.argsort(-widths, kind="stable"):
+            if len(rows) < 2 * k:
+                break
+            if widths[dim] == 0:
+                break
+            left = mondrian_split(values[:, dim], k)
+            if left is not None:
+                break
+
+        if left is None:
+            partition[rows] = n_partitions
+            n_partitions += 1
+        else:
+            queue.append(rows[left])
+            queue.append(rows[~left])
+
+    columns = {
+        name: mondrian_summary(table[name], partition, hierarchies, name) for name in qi
+    }
+    return ut.anonymized_table(table, ident, columns)
 
 
 def k_anonymity(
@@ -337,7 +1393,10 @@ def k_anonymity(
     supp_threshold: int,
     hierarchies: dict,
     method: str,
-) -> pd.DataFrame:
+    n_jobs: int = 1,
+    diversity: typing.Optional[fs.Diversity] = None,
+    return_suppressed: bool = False,
+) -> typing.Union[pd.DataFrame, typing.Tuple[pd.DataFrame, int]]:
     """Generalization algorithm for k-anonymity. Applies data-fly for default in case we don't specify correctly.
 
     :param table: dataframe with the data under study.
@@ -354,22 +1413,51 @@ def k_anonymity(
     :param k: desired level of k-anonymity.
     :type k: int
 
-    :param supp_threshold: level of suppression allowed.
+    :param supp_threshold: maximum number of records that can be suppressed.
     :type supp_threshold: int
 
     :param hierarchies: hierarchies for generalization of columns.
     :type hierarchies: dictionary
 
-    :param method: name of the anonymization method that we want to use.
+    :param method: name of the anonymization method that we want to use:
+        "datafly", "incognito", "flash", "samarati" or "mondrian".
     :type method: string
 
-    :return: anonymized table.
-    :rtype: pandas dataframe
+    :param n_jobs: number of processes used by incognito to evaluate the nodes of
+        the lattice.
+    :type n_jobs: int
+
+    :param diversity: l-diversity that the anonymized table must also satisfy,
+        with the sensitive attributes to consider. Not available for mondrian.
+    :type diversity: Diversity
+
+    :param return_suppressed: if True, the number of records suppressed is also
+        returned.
+    :type return_suppressed: bool
+
+    :return: anonymized table, and number of records suppressed if
+        return_suppressed is True.
+    :rtype: pandas dataframe or tuple
     """
 
+    args = (table, ident, qi, k, supp_threshold, hierarchies)
+    options = {"diversity": diversity, "return_suppressed": return_suppressed}
     if method.lower() == "incognito":
-        return incognito(table, ident, qi, k, supp_threshold, hierarchies)
+        return incognito(*args, n_jobs, **options)
+    elif method.lower() == "flash":
+        return flash(*args, **options)
+    elif method.lower() == "samarati":
+        return samarati(*args, **options)
+    elif method.lower() == "mondrian":
+        if supp_threshold != 0:
+            raise ValueError(
+                "Mondrian does not suppress records, use supp_threshold=0."
+            )
+        if diversity is not None:
+            raise ValueError("Mondrian does not check l-diversity.")
+        new_table = mondrian(table, ident, qi, k, hierarchies)
+        return (new_table, 0) if return_suppressed else new_table
     elif method.lower() == "datafly" or method.lower() == "data fly":
-        return data_fly(table, ident, qi, k, supp_threshold, hierarchies)
+        return data_fly(*args, **options)
     else:
         raise ValueError("Unimplemented k-anonymity method.")
@@ -2,18 +2,23 @@ import copy
 import typing
 import numpy as np
 import pandas as pd
-from pycanon import anonymity
 from anonymity.tools._k_anonymity import data_fly
 from anonymity.tools._k_anonymity import incognito
+from anonymity.tools.utils_k_anon import frequency_set as fs
+from anonymity.tools.utils_k_anon import hierarchy as hie
+from anonymity.tools.utils_k_anon.equivalence_class import EquivalenceClassIndex
 
 
 def get_diversities(
     table: pd.DataFrame,
     sa: typing.Union[typing.List, np.ndarray],
     qi: typing.Union[typing.List, np.ndarray],
-) -> typing.Union[typing.List, np.ndarray]:
-    """Return the l-diversity value as an integer. Calls the get_diversities and extract the
-    minimum l-diversity level.
+    equiv_sa: bool = False,
+    variant: str = "distinct",
+    c: float = 1.0,
+) -> typing.Union[np.ndarray, typing.Tuple[typing.List, np.ndarray]]:
+    """l-diversity of each equivalence class, computed for all the classes at
+    once from their histograms.
 
     :param table: dataframe with the data under study.
     :type table: pandas dataframe
@@ -22,28 +27,45 @@ def get_diversities(
         that are sensitive attributes.
     :type sa: list of strings
 
-    :param qi: list which contains a list of arrays which represent each equivalence
-    class and a list with the l-diversity value for each of those classes.
-    :type qi: list of arrays
-    """
-    equiv_class = anonymity.utils.aux_anonymity.get_equiv_class(table, qi)
+    :param qi: list with the name of the columns of the dataframe.
+        that are quasi-identifiers.
+    :type qi: list of strings
 
-    equiv_sa = []
-    for ec in equiv_class:
-        tmp = table.iloc[ec]
-        equiv_sa.append(tmp[sa].values)
+    :param equiv_sa: whether to also return the values of the sensitive
+        attributes of each equivalence class.
+    :type equiv_sa: boolean
 
-    result = [len(np.unique(ec_sa)) for ec_sa in equiv_sa]
-    return [equiv_sa, result]
+    :param variant: variant of l-diversity: "distinct", "entropy" or "recursive".
+    :type variant: string
+
+    :param c: constant of recursive (c,l)-diversity.
+    :type c: float
+
+    :return: l-diversity of each equivalence class, the minimum over the
+        sensitive attributes, preceded by the list with the array of values of the
+        sensitive attributes of each class if equiv_sa is True.
+    :rtype: numpy array or tuple
+    """
+    sa = [sa] if isinstance(sa, str) else list(sa)
+    index = EquivalenceClassIndex(table, qi, sa)
+    result = np.min([index.diversities(name, variant, c) for name in sa], axis=0)
+    if not equiv_sa:
+        return result
+
+    values = table[sa].values
+    return [values[ec] for ec in index.classes()], result
 
 
 def get_l(
     table: pd.DataFrame,
     sa: typing.Union[typing.List, np.ndarray],
     qi: typing.Union[typing.List, np.ndarray],
-) -> int:
-    """Return the l-diversity value as an integer.
-    Calls the get_diversities and extract the minimum l-diversity level.
+    variant: str = "distinct",
+    c: float = 1.0,
+) -> typing.Union[int, float]:
+    """Return the l-diversity value as an integer, or a float for entropy
+    l-diversity. Calls the get_diversities and extract the minimum l-diversity
+    level.
 
     :param table: dataframe with the data under study.
     :type table: pandas dataframe
@@ -56,11 +78,18 @@ def get_l(
         that are quasi-identifiers.
     :type qi: list of strings
 
+    :param variant: variant of l-diversity: "distinct", "entropy" or "recursive".
+    :type variant: string
+
+    :param c: constant of recursive (c,l)-diversity.
+    :type c: float
+
     :return: minimum l-diversity of a given list of l-diversity values.
-    :rtype: int
+    :rtype: int or float
     """
 
-    return min(get_diversities(table, qi, sa)[1])
+    l_min = get_diversities(table, qi, sa, variant=variant, c=c).min()
+    return float(l_min) if variant == "entropy" else int(l_min)
 
 
 def apply_l_diversity_supp(
@@ -69,90 +98,65 @@ def apply_l_diversity_supp(
     qi: typing.Union[typing.List, np.ndarray],
     l: int,
     supp_lim: float = 1,
-) -> pd.DataFrame:
-    total_percent = len(table)
-    supp_records = round(total_percent * (supp_lim / 100))
-    l_real = anonymity.l_diversity(table, qi, sa)
-    """Apply l-diversity to an anonymized dataset using suppression.
-
-        :param table: dataframe with the data under study.
-        :type table: pandas dataframe
-
-        :param sa: list with the name of the columns of the dataframe.
-            that are sensitive attributes.
-        :type sa: list of strings
+    variant: str = "distinct",
+    c: float = 1.0,
+) -> typing.Tuple[pd.DataFrame, int]:
+    """Apply l-diversity to an anonymized dataset using suppression. The
+    equivalence classes that do not satisfy l-diversity are suppressed with a
+    single boolean mask if all of them fit in the budget of records, otherwise
+    the table is returned as it is.
 
-        :param ident: list with the name of the columns of the dataframe.
-            that are identifiers.
-        :type ident: list of strings
+    :param table: dataframe with the data under study.
+    :type table: pandas dataframe
 
-        :param qi: list with the name of the columns of the dataframe.
-            that are quasi-identifiers.
-        :type qi: list of strings
+    :param sa: list with the name of the columns of the dataframe.
+        that are sensitive attributes.
+    :type sa: list of strings
 
-        :param k: desired level of k-anonymity.
-        :type k: int
+    :param qi: list with the name of the columns of the dataframe.
+        that are quasi-identifiers.
+    :type qi: list of strings
 
-        :param k_method: desired algorithm for anonymization.
-        :type k_method: string
+    :param l: desired level of l-diversity.
+    :type l: int
 
-        :param l: desired level of l-diversity.
-        :type l: int
+    :param supp_lim: maximum percentage of the records that can be suppressed.
+    :type supp_lim: float
 
-        :param supp_threshold: level of suppression allowed.
-        :type supp_threshold: int
+    :param variant: variant of l-diversity: "distinct", "entropy" or "recursive".
+    :type variant: string
 
-        :param hierarchies: hierarchies for generalization of columns.
-        :type hierarchies: dictionary
+    :param c: constant of recursive (c,l)-diversity.
+    :type c: float
 
-        :return: anonymized table that satisfies l-diversity.
-        :rtype: pandas dataframe
-        """
+    :return: table without the suppressed records and number of records
+        suppressed, which is 0 if l-diversity cannot be satisfied.
+    :rtype: tuple
+    """
+    sa = [sa] if isinstance(sa, str) else list(sa)
+    supp_records = round(len(table) * (supp_lim / 100))
+    index = EquivalenceClassIndex(table, qi, sa)
+    l_eq_c = np.min([index.diversities(name, variant, c) for name in sa], axis=0)
+
+    violating = np.flatnonzero(l_eq_c < l)
+    if len(violating) == 0:
+        print(f"l-diversity is satisfied with l={index.l_value(sa, variant, c)}")
+        return table, 0
+    if len(violating) == index.n_groups:
+        print("l-diversity cannot be satisfied only with row suppression")
+        return table, 0
 
-    if len(table[sa].value_counts()) < l:
+    if index.sizes[violating].sum() > supp_records:
         print(
-            "l-diversity cannot be satisfied only with row suppression, "
-            "due to l being bigger than the unique values of the SA column"
+            f"l-diversity cannot be satisfied by deleting less than "
+            f"{supp_lim}% of the records."
         )
-        return table
-
-    if l_real >= l:
-        print(f"l-diversity is satisfied with l={l_real}")
-        return table
+        return table, 0
 
-    equiv_class = anonymity.utils.aux_anonymity.get_equiv_class(table, qi)
-    l_eq_c = get_diversities(table, sa, qi)[1]
-
-    if l > max(l_eq_c):
-        print("l-diversity cannot be satisfied only with row suppression")
-        return table
-
-    else:
-        supp_rate = 0
-        print("supp_records ", supp_records)
-        while supp_rate <= supp_records:
-            data_ec = pd.DataFrame({"equiv_class": equiv_class, "l": l_eq_c})
-            data_ec_l = data_ec[data_ec.l > l]
-
-            ec_elim = np.concatenate(
-                [
-                    anonymity.utils.aux_functions.convert(ec)
-                    for ec in data_ec_l.equiv_class.values
-                ]
-            )
-            # print(ec_elim)
-            table_new = table.drop(ec_elim[0]).reset_index()
-            # print(table_new)
-            supp_rate = (len(table) - len(table_new)) / len(table)
-            if supp_rate > supp_records:
-                print(
-                    f"l-diversity cannot be satisfied by deleting less than "
-                    f"{supp_records}% of the records."
-                )
-                return table
-
-        assert anonymity.l_diversity(table_new, qi, sa) >= l
-        return table_new
+    suppressed_classes = np.zeros(index.n_groups, dtype=bool)
+    suppressed_classes[violating] = True
+    suppressed = suppressed_classes[index.group]
+    return table[~suppressed].reset_index(), int(suppressed.sum())
 
 
 # La idea es que usando las funciones auxiliares de arriba esto devolviera una nueva tabla anonimizada
@@ -167,8 +171,13 @@ def apply_l_diversity(
     supp_threshold: int,
     hierarchies: dict,
     k: int,
+    variant: str = "distinct",
+    c: float = 1.0,
 ) -> pd.DataFrame:
-    """Apply l-diversity to an anonymized dataset.
+    """Apply l-diversity to a dataset. The anonymization algorithm searches the
+    generalization that satisfies k-anonymity and l-diversity at once, and the
+    records of the classes that do not satisfy them are suppressed within the
+    allowed level of suppression.
 
     :param table: dataframe with the data under study.
     :type table: pandas dataframe
@@ -200,29 +209,34 @@ def apply_l_diversity(
     :param hierarchies: hierarchies for generalization of columns.
     :type hierarchies: dictionary
 
+    :param variant: variant of l-diversity: "distinct", "entropy" or "recursive".
+    :type variant: string
+
+    :param c: constant of recursive (c,l)-diversity.
+    :type c: float
+
     :return: anonymized table that satisfies l-diversity.
     :rtype: pandas dataframe
     """
-    count = 0
-    # print(l)
-    # print(get_l(table, qi, sa))
-    while get_l(table, qi, sa) < l and count < 50:
-        if k_method == "data_fly":
-            k = k + 1
-            table = data_fly(table, ident, qi, k, supp_threshold, hierarchies)
-
-        else:
-            k = k + 1
-            table = incognito(table, ident, qi, k, supp_threshold, hierarchies)
-        count += 1
+    # l-diversity is checked on each node of the search along with k-anonymity,
+    # so a single search gives a table that satisfies both
+    sa = [sa] if isinstance(sa, str) else list(sa)
+    diversity = fs.Diversity(sa, l, variant, c)
+    if k_method == "data_fly":
+        table = data_fly(table, ident, qi, k, supp_threshold, hierarchies, diversity)
+    else:
+        table = incognito(
+            table, ident, qi, k, supp_threshold, hierarchies, diversity=diversity
+        )
+    l_real = get_l(table, qi, sa, variant, c)
 
-    if count >= 50:
+    if l_real < l:
         print("l-diversity not satisfied")
-        return [get_l(table, qi, sa), table, False]
+        return [l_real, table, False]
 
     else:
         print("l-diversity satisfied")
-        return [get_l(table, qi, sa), table, True]
+        return [l_real, table, True]
 
 
 def apply_l_diversity_multiple_sa(
@@ -235,6 +249,8 @@ def apply_l_diversity_multiple_sa(
     supp_threshold: int,
     hierarchies: dict,
     k: int,
+    variant: str = "distinct",
+    c: float = 1.0,
 ) -> pd.DataFrame:
     """Apply l-diversity to an anonymized dataset with multiple SA.
 
@@ -268,6 +284,12 @@ def apply_l_diversity_multiple_sa(
     :param hierarchies: hierarchies for generalization of columns.
     :type hierarchies: dictionary
 
+    :param variant: variant of l-diversity: "distinct", "entropy" or "recursive".
+    :type variant: string
+
+    :param c: constant of recursive (c,l)-diversity.
+    :type c: float
+
     :return: returns a list containing the value of l-diversity of the new table and the
     anonymized table that satisfies l-diversity.
     :rtype: list
@@ -292,6 +314,8 @@ def apply_l_diversity_multiple_sa(
             supp_threshold,
             new_hierarchies,
             k,
+            variant,
+            c,
         )
 
         if not result[2]:
@@ -315,6 +339,9 @@ def l_diversity(
     supp_threshold: int,
     hierarchies: dict,
     k: int,
+    variant: str = "distinct",
+    c: float = 1.0,
+    joint_sa: bool = False,
 ) -> pd.DataFrame:
     """Apply l-diversity to an anonymized dataset.
 
@@ -348,15 +375,48 @@ def l_diversity(
     :param hierarchies: hierarchies for generalization of columns.
     :type hierarchies: dictionary
 
+    :param variant: variant of l-diversity: "distinct", "entropy" or "recursive".
+    :type variant: string
+
+    :param c: constant of recursive (c,l)-diversity.
+    :type c: float
+
+    :param joint_sa: with several sensitive attributes, whether to search a single
+        anonymization where every equivalence class is l-diverse for all of them,
+        instead of anonymizing for each one in turn with the others as
+        quasi-identifiers.
+    :type joint_sa: boolean
+
     :return: returns a list containing the value of l-diversity of the new table and the
     anonymized table that satisfies l-diversity.
     :rtype: list
     """
-    if len(sa) > 1:
+    hierarchies = hie.compile_hierarchies(hierarchies)
+    if len(sa) > 1 and not joint_sa:
         return apply_l_diversity_multiple_sa(
-            table, sa, qi, k_method, l, ident, supp_threshold, hierarchies, k
+            table,
+            sa,
+            qi,
+            k_method,
+            l,
+            ident,
+            supp_threshold,
+            hierarchies,
+            k,
+            variant,
+            c,
         )
     else:
         return apply_l_diversity(
-            table, sa, qi, k_method, l, ident, supp_threshold, hierarchies, k
+            table,
+            sa,
+            qi,
+            k_method,
+            l,
+            ident,
+            supp_threshold,
+            hierarchies,
+            k,
+            variant,
+            c,
         )
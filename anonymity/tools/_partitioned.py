@@ -0,0 +1,705 @@
+import concurrent.futures
+import contextlib
+import os
+import typing
+import numpy as np
+import pandas as pd
+from anonymity.tools._k_anonymity import data_fly_search, incognito_search
+from anonymity.tools.utils_k_anon import encoding as enc
+from anonymity.tools.utils_k_anon import frequency_set as fs
+from anonymity.tools.utils_k_anon import hierarchy as hie
+from anonymity.tools.utils_k_anon import utils_k_anonymity as ut
+
+
+def load_partition(partition) -> pd.DataFrame:
+    """Reads a partition of a table. Only the rows of the partition are read from
+    the files: the row groups that contain them for Parquet files and the lines
+    between them for CSV files.
+
+    :param partition: dataframe, path of a CSV or Parquet file, or tuple with one
+        of them and the first and last (excluded) rows of the partition.
+    :type partition: dataframe, string or tuple
+
+    :return: rows of the partition.
+    :rtype: pandas dataframe
+    """
+    start, stop = None, None
+    if isinstance(partition, tuple):
+        partition, start, stop = partition
+    if isinstance(partition, pd.DataFrame):
+        return partition.iloc[start:stop]
+
+    path = os.fspath(partition)
+    if path.endswith((".parquet", ".pq")):
+        if start is None and stop is None:
+            return pd.read_parquet(path)
+        return read_parquet_rows(path, start, stop)
+    if start is None and stop is None:
+        return pd.read_csv(path)
+    start = start or 0
+    nrows = None if stop is None else stop - start
+    return pd.read_csv(path, skiprows=range(1, start + 1), nrows=nrows)
+
+
+def read_parquet_rows(
+    path: str, start: typing.Optional[int], stop: typing.Optional[int]
+) -> pd.DataFrame:
+    """Reads a range of rows of a Parquet file, loading only the row groups that
+    contain them.
+
+    :param path: path of the file.
+    :type path: string
+
+    :param start: first row, the first of the file if None.
+    :type start: int
+
+    :param stop: last row (excluded), the end of the file if None.
+    :type stop: int
+
+    :return: rows of the file, numbered as in the whole file.
+    :rtype: pandas dataframe
+    """
+    import pyarrow.parquet as pq
+
+    parquet = pq.ParquetFile(path)
+    metadata = parquet.metadata
+    sizes = np.array(
+        [metadata.row_group(i).num_rows for i in range(metadata.num_row_groups)],
+        dtype=np.int64,
+    )
+    ends = np.cumsum(sizes)
+    begins = ends - sizes
+    start = 0 if start is None else start
+    stop = metadata.num_rows if stop is None else stop
+    groups = np.flatnonzero((begins < stop) & (ends > start))
+    offset = int(begins[groups[0]]) if len(groups) > 0 else start
+
+    table = parquet.read_row_groups(groups.tolist()).to_pandas()
+    if isinstance(table.index, pd.RangeIndex):
+        table.index = pd.RangeIndex(offset, offset + len(table))
+    return table.iloc[max(start - offset, 0) : max(stop - offset, 0)]
+
+
+def split_partition(partition):
+    """Slices a partition of a dataframe in memory, so that the task that
+    processes it receives only its rows and not the whole dataframe. The
+    partitions in files are kept as they are, each task reads its rows.
+
+    :param partition: partition of the table, see :func:`load_partition`.
+    :type partition: dataframe, string or tuple
+
+    :return: partition to send to the task.
+    :rtype: dataframe, string or tuple
+    """
+    if isinstance(partition, tuple) and isinstance(partition[0], pd.DataFrame):
+        table, start, stop = partition
+        return table.iloc[start:stop]
+    return partition
+
+
+def write_partition(table: pd.DataFrame, path: str) -> str:
+    """Writes an anonymized partition to a CSV or Parquet file.
+
+    :param table: anonymized partition.
+    :type table: pandas dataframe
+
+    :param path: path of the file.
+    :type path: string
+
+    :return: path of the file.
+    :rtype: string
+    """
+    if os.fspath(path).endswith((".parquet", ".pq")):
+        table.to_parquet(path, index=False)
+    else:
+        table.to_csv(path, index=False)
+    return path
+
+
+def partition_frequency_set(partition, qi: typing.List[str]) -> dict:
+    """Map task: frequency set of a partition, with the values of the
+    quasi-identifiers instead of their codes so it can be merged with the ones of
+    other partitions.
+
+    :param partition: partition of the table, see :func:`load_partition`.
+    :type partition: dataframe, string or tuple
+
+    :param qi: list with the name of the columns of the dataframe.
+        that are quasi-identifiers.
+    :type qi: list of strings
+
+    :return: values of each quasi-identifier in each distinct combination and
+        number of records of each combination.
+    :rtype: dictionary
+    """
+    table = ut.clear_white_spaces(load_partition(partition), copy=False)
+    encoded = enc.EncodedTable(table, qi)
+    return frequency_values(fs.get_frequency_set(encoded, qi), encoded.labels)
+
+
+def frequency_values(freq_set: fs.FrequencySet, labels: dict) -> dict:
+    """Replaces the codes of a frequency set by the values of the
+    quasi-identifiers.
+
+    :param freq_set: frequency set.
+    :type freq_set: FrequencySet
+
+    :param labels: values of the codes of each quasi-identifier.
+    :type labels: dictionary
+
+    :return: values of each quasi-identifier in each distinct combination and
+        number of records of each combination.
+    :rtype: dictionary
+    """
+    values = {
+        name: labels[name][freq_set.codes[:, j]]
+        for j, name in enumerate(freq_set.names)
+    }
+    return {"values": values, "counts": freq_set.counts}
+
+
+def merge_frequency_sets(
+    freq_sets: typing.List[dict], qi: typing.List[str]
+) -> typing.Tuple[fs.FrequencySet, dict]:
+    """Reduce step: adds up the frequency sets of the partitions.
+
+    :param freq_sets: frequency sets of the partitions, with the values of the
+        quasi-identifiers.
+    :type freq_sets: list of dictionaries
+
+    :param qi: list with the name of the columns of the dataframe.
+        that are quasi-identifiers.
+    :type qi: list of strings
+
+    :return: frequency set of the whole table and distinct values of each
+        quasi-identifier, which give the meaning of its codes.
+    :rtype: tuple
+    """
+    codes, labels = [], {}
+    for name in qi:
+        values = pd.Series(
+            np.concatenate(
+                [np.zeros(0, dtype=object)]
+                + [freq_set["values"][name] for freq_set in freq_sets]
+            ),
+            dtype=object,
+        )
+        column_codes, labels[name] = enc.encode_column(values)
+        codes.append(column_codes)
+    counts = np.concatenate(
+        [np.zeros(0, dtype=np.int64)] + [freq_set["counts"] for freq_set in freq_sets]
+    )
+    if len(qi) == 0:
+        matrix = np.zeros((len(counts), 0), dtype=np.int32)
+    else:
+        matrix = np.column_stack(codes)
+    return fs.aggregate(list(qi), matrix, counts), labels
+
+
+class ChunkedFrequencySet:
+    """Frequency set of a table built chunk by chunk. Every value of a
+    quasi-identifier keeps the code it gets in the first chunk where it appears,
+    so each chunk only adds its own combinations of codes to the frequency set,
+    without encoding again the ones of the previous chunks.
+
+    :param qi: list with the name of the columns of the dataframe.
+        that are quasi-identifiers.
+    :type qi: list of strings
+    """
+
+    def __init__(self, qi: typing.List[str]):
+        self.qi = list(qi)
+        self._labels = {name: pd.Index([], dtype=object) for name in self.qi}
+        self._freq_set = fs.FrequencySet(
+            self.qi,
+            np.zeros((0, len(self.qi)), dtype=np.int32),
+            np.zeros(0, dtype=np.int64),
+        )
+
+    def add(self, chunk: pd.DataFrame):
+        """Adds the records of a chunk to the frequency set.
+
+        :param chunk: rows of the table.
+        :type chunk: pandas dataframe
+        """
+        table = ut.clear_white_spaces(chunk, copy=False)
+        encoded = enc.EncodedTable(table, self.qi)
+        freq_set = fs.get_frequency_set(encoded, self.qi)
+        codes = np.zeros(freq_set.codes.shape, dtype=np.int32)
+        for j, name in enumerate(self.qi):
+            # Codes of the values already seen, new codes for the rest
+            labels = self._labels[name]
+            position = labels.get_indexer(encoded.labels[name])
+            new = position < 0
+            position[new] = len(labels) + np.arange(np.count_nonzero(new))
+            self._labels[name] = labels.append(
+                pd.Index(encoded.labels[name][new], dtype=object)
+            )
+            codes[:, j] = position[freq_set.codes[:, j]]
+
+        self._freq_set = fs.aggregate(
+            self.qi,
+            np.concatenate([self._freq_set.codes, codes]),
+            np.concatenate([self._freq_set.counts, freq_set.counts]),
+        )
+
+    def frequency_set(self) -> typing.Tuple[fs.FrequencySet, dict]:
+        """Frequency set of the chunks added so far.
+
+        :return: frequency set and distinct values of each quasi-identifier, which
+            give the meaning of its codes.
+        :rtype: tuple
+        """
+        labels = {
+            name: values.to_numpy(dtype=object) for name, values in self._labels.items()
+        }
+        return self._freq_set, labels
+
+
+class KeptClasses:
+    """Equivalence classes of the whole table generalized that are kept, built once
+    and sent to every partition, which only looks up the classes of its own
+    records. The codes of each class are packed in a single integer and looked up
+    with a binary search over the sorted integers, or with a hash index if the
+    combinations of codes do not fit in an integer.
+
+    :param codes: generalized codes of the classes that are kept, one column for
+        each quasi-identifier.
+    :type codes: numpy array
+
+    :param radices: number of generalized codes of each quasi-identifier.
+    :type radices: list of ints
+    """
+
+    def __init__(self, codes: np.ndarray, radices: typing.List[int]):
+        self.radices = [int(radix) for radix in radices]
+        keys = enc.pack_codes(codes, self.radices)
+        self.keys = None if keys is None else np.unique(keys)
+        self.index = None
+        if keys is None:
+            self.index = pd.MultiIndex.from_arrays(list(codes.T)).unique()
+
+    @classmethod
+    def from_frequency_set(
+        cls, freq_set: fs.FrequencySet, generalization: dict, k: int
+    ) -> "KeptClasses":
+        """Classes of a frequency set with at least k records.
+
+        :param freq_set: frequency set of the whole table generalized.
+        :type freq_set: FrequencySet
+
+        :param generalization: generalization of each quasi-identifier, see
+            :func:`anonymize_partition`.
+        :type generalization: dictionary
+
+        :param k: desired level of k-anonymity.
+        :type k: int
+
+        :return: classes that are kept.
+        :rtype: KeptClasses
+        """
+        radices = []
+        for name in freq_set.names:
+            values, _, labels = generalization[name]
+            radices.append(len(values) if labels is None else len(labels))
+        return cls(freq_set.codes[freq_set.counts >= k], radices)
+
+    def contains(self, codes: np.ndarray) -> np.ndarray:
+        """Whether the class of each record is kept.
+
+        :param codes: generalized codes of the records, one column for each
+            quasi-identifier.
+        :type codes: numpy array
+
+        :return: True for the records whose class is kept.
+        :rtype: numpy array
+        """
+        if self.keys is None:
+            return self.index.get_indexer(pd.MultiIndex.from_arrays(list(codes.T))) >= 0
+        keys = enc.pack_codes(codes, self.radices)
+        if len(self.keys) == 0:
+            return np.zeros(len(keys), dtype=bool)
+        position = np.minimum(np.searchsorted(self.keys, keys), len(self.keys) - 1)
+        return self.keys[position] == keys
+
+
+def anonymize_partition(
+    partition,
+    ident: typing.List[str],
+    qi: typing.List[str],
+    generalization: dict,
+    kept: typing.Optional[KeptClasses],
+    output: typing.Optional[str] = None,
+):
+    """Map task: applies the generalization chosen for the whole table to a
+    partition and suppresses the records of the equivalence classes smaller than
+    k. The values of the partition must be among the ones of the whole table.
+
+    :param partition: partition of the table, see :func:`load_partition`.
+    :type partition: dataframe, string or tuple
+
+    :param ident: list with the name of the columns of the dataframe.
+        that are identifiers.
+    :type ident: list of strings
+
+    :param qi: list with the name of the columns of the dataframe.
+        that are quasi-identifiers.
+    :type qi: list of strings
+
+    :param generalization: for each quasi-identifier, its distinct values in the
+        whole table, the generalized code of each of them and the generalized
+        values of the codes, None for the values without generalization.
+    :type generalization: dictionary
+
+    :param kept: classes of the whole table that are kept, if the records of the
+        classes smaller than k have to be suppressed.
+    :type kept: KeptClasses
+
+    :param output: path of the file where the anonymized partition is written.
+    :type output: string
+
+    :return: anonymized partition, or the path of the file if output is given.
+    :rtype: pandas dataframe or string
+    """
+    table = ut.clear_white_spaces(load_partition(partition), copy=False)
+    columns, codes = {}, []
+    for name in qi:
+        values, mapping, labels = generalization[name]
+        column_codes, column_labels = enc.encode_column(table[name])
+        position = pd.Index(values).get_indexer(column_labels)
+        if (position < 0).any():
+            raise ValueError(
+                f"The column {name} has values that were not in the table when "
+                f"the generalization was chosen."
+            )
+        column_codes = mapping[position[column_codes]]
+        codes.append(column_codes)
+        if labels is not None:
+            columns[name] = labels[column_codes]
+
+    keep = None
+    if kept is not None and len(qi) > 0:
+        keep = kept.contains(np.column_stack(codes))
+
+    table = ut.anonymized_table(table, ident, columns, keep)
+    return table if output is None else write_partition(table, output)
+
+
+def choose_generalization(
+    base: fs.FrequencySet,
+    values: dict,
+    qi: typing.List[str],
+    k: int,
+    supp_threshold: int,
+    hierarchies: dict,
+    method: str,
+) -> typing.Tuple[dict, typing.Optional[fs.FrequencySet]]:
+    """Reduce step: searches the generalization of the whole table on its frequency
+    set.
+
+    :param base: frequency set of the whole table.
+    :type base: FrequencySet
+
+    :param values: distinct values of each quasi-identifier, which give the
+        meaning of its codes.
+    :type values: dictionary
+
+    :param qi: list with the name of the columns of the dataframe.
+        that are quasi-identifiers.
+    :type qi: list of strings
+
+    :param k: desired level of k-anonymity.
+    :type k: int
+
+    :param supp_threshold: maximum number of records that can be suppressed.
+    :type supp_threshold: int
+
+    :param hierarchies: compiled hierarchies for generalization of columns.
+    :type hierarchies: dictionary
+
+    :param method: name of the anonymization method: "incognito" or "datafly".
+    :type method: string
+
+    :return: level of generalization of each quasi-identifier, its
+        generalization, see :func:`anonymize_partition`, and frequency set of the
+        generalized table if the records of the classes smaller than k have to be
+        suppressed.
+    :rtype: tuple
+    """
+    if method == "incognito":
+        names = [name for name in hierarchies if name in qi]
+    else:
+        names = qi
+    maps, labels = {}, {}
+    for name in names:
+        maps[name], labels[name] = enc.level_maps(values[name], hierarchies, name)
+
+    if method == "incognito":
+        node = incognito_search(base, qi, names, maps, k, supp_threshold)
+        if node is None:
+            print(f"Unnable to achieve k={k}")
+            levels, suppress = {}, False
+        else:
+            levels, suppress = dict(zip(names, node)), supp_threshold > 0
+    else:
+        levels, suppress = data_fly_search(base, qi, maps, k, supp_threshold)
+
+    generalization = {}
+    codes = []
+    for j, name in enumerate(qi):
+        level = levels.setdefault(name, 0)
+        if level == 0:
+            mapping = np.arange(len(values[name]), dtype=np.int32)
+            generalization[name] = (values[name], mapping, None)
+        else:
+            mapping = maps[name][level]
+            generalization[name] = (values[name], mapping, labels[name][level])
+        codes.append(np.take(mapping, base.codes[:, j]))
+
+    suppressed = None
+    if suppress and len(qi) > 0:
+        suppressed = fs.aggregate(qi, np.column_stack(codes), base.counts)
+        if method == "incognito" and (suppressed.counts >= k).all():
+            # Incognito keeps the index of the table if nothing is suppressed
+            suppressed = None
+
+    return levels, generalization, suppressed
+
+
+def k_anonymity_partitioned(
+    partitions: typing.List,
+    ident: typing.Union[typing.List, np.ndarray],
+    qi: typing.Union[typing.List, np.ndarray],
+    k: int,
+    supp_threshold: int,
+    hierarchies: dict,
+    method: str = "incognito",
+    outputs: typing.Optional[typing.List[str]] = None,
+    transport: typing.Optional[concurrent.futures.Executor] = None,
+    n_jobs: int = 1,
+) -> typing.List:
+    """k-anonymity of a table split in partitions, with a map-reduce scheme. Each
+    partition computes its frequency set, the frequency sets are added up and the
+    chosen algorithm searches the generalization on the frequency set of the whole
+    table, since every node is evaluated rolling it up. Finally, each partition
+    applies the generalization to its records.
+
+    The partitions are processed by a transport, any object with a ``map`` method
+    like the executors of ``concurrent.futures``, so they can be sent to other
+    machines. By default a local pool of n_jobs processes is used. The tasks
+    receive only the rows of their partition of a dataframe, and read only the
+    rows of their partition of a file.
+
+    :param partitions: partitions of the table, dataframes, paths of CSV or Parquet
+        files, or tuples with one of them and the first and last (excluded) rows of
+        the partition.
+    :type partitions: list
+
+    :param ident: list with the name of the columns of the dataframe.
+        that are identifiers.
+    :type ident: list of strings
+
+    :param qi: list with the name of the columns of the dataframe.
+        that are quasi-identifiers.
+    :type qi: list of strings
+
+    :param k: desired level of k-anonymity.
+    :type k: int
+
+    :param supp_threshold: maximum number of records that can be suppressed.
+    :type supp_threshold: int
+
+    :param hierarchies: hierarchies for generalization of columns.
+    :type hierarchies: dictionary
+
+    :param method: name of the anonymization method: "incognito" or "datafly".
+    :type method: string
+
+    :param outputs: paths of the files where each anonymized partition is written.
+    :type outputs: list of strings
+
+    :param transport: executor that runs the tasks of the partitions.
+    :type transport: concurrent.futures.Executor
+
+    :param n_jobs: number of processes of the local pool used by default.
+    :type n_jobs: int
+
+    :return: anonymized partitions, or the paths of the files if outputs are given.
+    :rtype: list
+    """
+    method = method.lower()
+    if method not in ("incognito", "datafly", "data fly", "data_fly"):
+        raise ValueError("Unimplemented partitioned k-anonymity method.")
+
+    qi = list(qi)
+    ident = list(ident)
+    hierarchies = hie.compile_hierarchies(hierarchies)
+    outputs = [None] * len(partitions) if outputs is None else list(outputs)
+    partitions = [split_partition(partition) for partition in partitions]
+
+    with contextlib.ExitStack() as stack:
+        if transport is None:
+            transport = stack.enter_context(
+                concurrent.futures.ProcessPoolExecutor(max_workers=n_jobs)
+            )
+
+        freq_sets = list(
+            transport.map(partition_frequency_set, partitions, [qi] * len(partitions))
+        )
+        base, values = merge_frequency_sets(freq_sets, qi)
+
+        _, generalization, suppressed = choose_generalization(
+            base, values, qi, k, supp_threshold, hierarchies, method
+        )
+        kept = None
+        if suppressed is not None:
+            kept = KeptClasses.from_frequency_set(suppressed, generalization, k)
+
+        n = len(partitions)
+        return list(
+            transport.map(
+                anonymize_partition,
+                partitions,
+                [ident] * n,
+                [qi] * n,
+                [generalization] * n,
+                [kept] * n,
+                outputs,
+            )
+        )
+
+
+def read_chunks(
+    path: str, chunksize: int, dtype: typing.Optional[dict] = None
+) -> typing.Iterator[pd.DataFrame]:
+    """Reads a CSV or Parquet file in chunks of rows. The records are numbered
+    across the chunks, as if the whole file was read.
+
+    :param path: path of the file.
+    :type path: string
+
+    :param chunksize: number of rows of each chunk.
+    :type chunksize: int
+
+    :param dtype: type of some columns, so that every chunk gives them the same
+        type.
+    :type dtype: dictionary
+
+    :return: chunks of the file.
+    :rtype: iterator of pandas dataframes
+    """
+    path = os.fspath(path)
+    if not path.endswith((".parquet", ".pq")):
+        yield from pd.read_csv(path, chunksize=chunksize, dtype=dtype)
+        return
+
+    import pyarrow.parquet as pq
+
+    start = 0
+    for batch in pq.ParquetFile(path).iter_batches(batch_size=chunksize):
+        chunk = batch.to_pandas()
+        chunk.index = pd.RangeIndex(start, start + len(chunk))
+        start += len(chunk)
+        yield chunk if dtype is None else chunk.astype(dtype)
+
+
+def k_anonymity_chunked(
+    input_path: str,
+    output_path: str,
+    ident: typing.Union[typing.List, np.ndarray],
+    qi: typing.Union[typing.List, np.ndarray],
+    k: int,
+    supp_threshold: int,
+    hierarchies: dict,
+    method: str = "incognito",
+    chunksize: int = 100000,
+    dtype: typing.Optional[dict] = None,
+) -> str:
+    """k-anonymity of a CSV or Parquet file that does not fit in memory. A first
+    pass over the chunks of the file adds up their frequency sets, on which the
+    chosen algorithm searches the generalization. A second pass applies the
+    generalization and the suppression to each chunk and appends it to the output
+    file. The memory used depends on the number of distinct combinations of the
+    quasi-identifiers and the size of the chunks, not on the number of records.
+
+    :param input_path: path of the CSV or Parquet file with the data under study.
+    :type input_path: string
+
+    :param output_path: path of the CSV or Parquet file where the anonymized table
+        is written.
+    :type output_path: string
+
+    :param ident: list with the name of the columns of the dataframe.
+        that are identifiers.
+    :type ident: list of strings
+
+    :param qi: list with the name of the columns of the dataframe.
+        that are quasi-identifiers.
+    :type qi: list of strings
+
+    :param k: desired level of k-anonymity.
+    :type k: int
+
+    :param supp_threshold: maximum number of records that can be suppressed.
+    :type supp_threshold: int
+
+    :param hierarchies: hierarchies for generalization of columns.
+    :type hierarchies: dictionary
+
+    :param method: name of the anonymization method: "incognito" or "datafly".
+    :type method: string
+
+    :param chunksize: number of rows read at once.
+    :type chunksize: int
+
+    :param dtype: type of some columns, e.g. str for codes made of digits that
+        the hierarchies give as strings.
+    :type dtype: dictionary
+
+    :return: path of the anonymized file.
+    :rtype: string
+    """
+    method = method.lower()
+    if method not in ("incognito", "datafly", "data fly", "data_fly"):
+        raise ValueError("Unimplemented partitioned k-anonymity method.")
+
+    qi = list(qi)
+    ident = list(ident)
+    hierarchies = hie.compile_hierarchies(hierarchies)
+
+    # First pass: frequency set of the whole file, built chunk by chunk
+    freq_set = ChunkedFrequencySet(qi)
+    for chunk in read_chunks(input_path, chunksize, dtype):
+        freq_set.add(chunk)
+    base, values = freq_set.frequency_set()
+
+    _, generalization, suppressed = choose_generalization(
+        base, values, qi, k, supp_threshold, hierarchies, method
+    )
+    kept = None
+    if suppressed is not None:
+        kept = KeptClasses.from_frequency_set(suppressed, generalization, k)
+
+    # Second pass: anonymization of each chunk
+    parquet = os.fspath(output_path).endswith((".parquet", ".pq"))
+    writer = None
+    try:
+        for i, chunk in enumerate(read_chunks(input_path, chunksize, dtype)):
+            table = anonymize_partition(chunk, ident, qi, generalization, kept)
+            if not parquet:
+                table.to_csv(
+                    output_path, mode="w" if i == 0 else "a", header=i == 0, index=False
+                )
+                continue
+
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+
+            batch = pa.Table.from_pandas(table, preserve_index=False)
+            if writer is None:
+                writer = pq.ParquetWriter(output_path, batch.schema)
+            writer.write_table(batch.cast(writer.schema))
+    finally:
+        if writer is not None:
+            writer.close()
+    return output_path
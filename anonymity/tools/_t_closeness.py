@@ -1,13 +1,10 @@
-import copy
-import re
 import typing
 import numpy as np
 import pandas as pd
-import pycanon.anonymity as pc
-from pycanon.anonymity.utils import aux_functions
-from pycanon.anonymity.utils.aux_anonymity import get_equiv_class
 from anonymity.tools._k_anonymity import data_fly
 from anonymity.tools._k_anonymity import incognito
+from anonymity.tools.utils_k_anon import hierarchy as hie
+from anonymity.tools.utils_k_anon.equivalence_class import EquivalenceClassIndex
 
 
 def aux_t_closeness_num(
@@ -25,24 +22,8 @@ def aux_t_closeness_num(
     :return: t for the introduced SA (numerical).
     :rtype: float.
     """
-    equiv_class = get_equiv_class(data, quasi_ident)
-    values = np.unique(data[sens_att_value].values)
-    m = len(values)
-    p = np.array([len(data[data[sens_att_value] == s]) / len(data) for s in values])
-    emd = []
-    for ec in equiv_class:
-        data_temp = data.iloc[aux_functions.convert(ec)]
-        qi = np.array(
-            [len(data_temp[data_temp[sens_att_value] == s]) / len(ec) for s in values]
-        )
-        r = qi - p
-        abs_r, emd_ec = 0.0, 0.0
-        for i in range(m):
-            abs_r += r[i]
-            emd_ec += np.abs(abs_r)
-        emd_ec = 1 / (m - 1) * emd_ec
-        emd.append(emd_ec)
-    return max(emd)
+    index = EquivalenceClassIndex(data, quasi_ident, [sens_att_value])
+    return index.distances(sens_att_value, numeric=True).max()
 
 
 def aux_t_closeness_str(
@@ -63,69 +44,41 @@ def aux_t_closeness_str(
     :return: t for the introduced SA (categorical).
     :rtype: float.
     """
-    equiv_class = get_equiv_class(data, quasi_ident)
-    values = np.unique(data[sens_att_value].values)
-    m = len(values)
-    p = np.array([len(data[data[sens_att_value] == s]) / len(data) for s in values])
-    emd = []
-    for ec in equiv_class:
-        data_temp = data.iloc[aux_functions.convert(ec)]
-        qi = np.array(
-            [len(data_temp[data_temp[sens_att_value] == s]) / len(ec) for s in values]
-        )
-        r = qi - p
-        emd_ec = 0.0
-        for i in range(m):
-            emd_ec += np.abs(r[i])
-        emd_ec = 0.5 * emd_ec
-        emd.append(emd_ec)
-    return max(emd)
-
-
-# TODO Añadir el if para elegir entre una de las 2 funciones de arriba segun el type_t
+    index = EquivalenceClassIndex(data, quasi_ident, [sens_att_value])
+    return index.distances(sens_att_value, numeric=False).max()
+
+
 def get_t(
     table: pd.DataFrame,
     sa: typing.Union[typing.List, np.ndarray],
     qi: typing.Union[typing.List, np.ndarray],
     type_t: str,
 ) -> typing.Union[typing.List, np.ndarray]:
-    equiv_class = pc.utils.aux_anonymity.get_equiv_class(table, qi)
-
-    global_freqs = {}
-    total_count = float(len(table))
-    group_counts = table.groupby(sa)[sa].agg("count")
+    """Obtain t for each equivalence class.
 
-    for value, count in group_counts.to_dict().items():
-        for i in count.keys():
-            p = count[i] / total_count
-            global_freqs[i] = p
+    :param table: dataframe with the data under study.
+    :type table: pandas dataframe
 
-    equiv_sa = {}
-    equiv_sa_tables = {}
-    i = 0
-    for ec in equiv_class:
-        name = "eq" + str(i)
-        tmp = table.iloc[ec]
-        equiv_sa_tables[name] = tmp
-        equiv_sa[name] = tmp[sa].values
-        i += 1
+    :param sa: list with the name of the columns of the dataframe.
+        that are sensitive attributes.
+    :type sa: list of strings
 
-    result = {}
-    class_count = {}
-    for value in equiv_sa.keys():
-        total_count = float(len(equiv_sa[value]))
-        class_count = equiv_sa_tables[value]["crime"].value_counts()
-        d = 0
-        for j in equiv_sa[value]:
-            p = float(re.findall(r"\d+", str(class_count[j]))[0]) / total_count
-            d += abs(p - global_freqs[j[0]])
+    :param qi: list with the name of the columns of the dataframe.
+        that are quasi-identifiers.
+    :type qi: list of strings
 
-            p = float(re.findall(r"\d+", str(class_count[j]))[0]) / total_count
+    :param type_t: "num" to use the distance for numerical attributes, or the one
+        for categorical attributes otherwise.
+    :type type_t: string
 
-            d += abs(p - global_freqs[j[0]])
-        result[value] = d
+    :return: t of each equivalence class.
+    :rtype: dictionary
+    """
+    index = EquivalenceClassIndex(table, qi, sa)
+    numeric = type_t == "num"
+    t_ec = np.max([index.distances(name, numeric) for name in sa], axis=0)
 
-    return result
+    return {"eq" + str(i): t_ec[i] for i in range(index.n_groups)}
 
 
 def t_closeness(
@@ -174,16 +127,11 @@ def t_closeness(
 
     count = 0
     # print(t)
-    # print(pc.t_closeness(table, qi, sa))
+    hierarchies = hie.compile_hierarchies(hierarchies)
 
     k = 0
-    type_t = "num"
-
-    if isinstance(table[sa[0]][0], str):
-        type_t = "cat"
-
-    # TODO Hacer variable global
-    while pc.t_closeness(table, qi, sa) > t and count < 50:
+    t_real = EquivalenceClassIndex(table, qi, sa).t()
+    while t_real > t and count < 50:
         if k_method == "data_fly":
             k = k + 1
             table = data_fly(table, ident, qi, k, supp_threshold, hierarchies)
@@ -191,15 +139,16 @@ def t_closeness(
         else:
             k = k + 1
             table = incognito(table, ident, qi, k, supp_threshold, hierarchies)
+        t_real = EquivalenceClassIndex(table, qi, sa).t()
         count += 1
 
-    if count >= 50 or pc.t_closeness(table, qi, sa, type_t) > 1:
+    if count >= 50 or t_real > 1:
         print("t-closeness not satisfied")
-        return [pc.t_closeness(table, qi, sa), table, False]
+        return [t_real, table, False]
 
     else:
         print("t-closeness satisfied")
-        return [pc.t_closeness(table, qi, sa), table, True]
+        return [t_real, table, True]
 
 
 def t_closeness_supp(
@@ -235,7 +184,8 @@ def t_closeness_supp(
     total_percent = len(table)
     # print(len(table))
     supp_records = round(total_percent * supp_lim)
-    t_real = pc.t_closeness(table, qi, sa)
+    index = EquivalenceClassIndex(table, qi, sa)
+    t_real = index.t()
     if t_real < t:
         print(f"t-closeness is satisfied with t={t_real}")
         return table
@@ -246,35 +196,33 @@ def t_closeness_supp(
     if isinstance(table[sa[0]][0], str):
         type_t = "cat"
 
-    t_eq_c = get_t(table, sa, qi, type_t)
+    numeric = type_t == "num"
+    t_eq_c = np.max([index.distances(name, numeric) for name in sa], axis=0)
+    equiv_class = index.classes()
 
-    if t > max(t_eq_c.values()):
+    if t > max(t_eq_c):
         print("t_closeness cannot be satisfied only with row suppression")
         return table
 
     else:
         supp_rate = 0
         while supp_rate <= supp_records:
-            data_ec = pd.DataFrame({"equiv_class": t_eq_c.keys(), "t": t_eq_c.values()})
+            data_ec = pd.DataFrame({"equiv_class": equiv_class, "t": t_eq_c})
             data_ec_t = data_ec[data_ec.t > t]
             # print(data_ec_t)
-            ec_elim = np.concatenate(
-                [
-                    pc.utils.aux_functions.convert(ec[2])
-                    for ec in data_ec_t.equiv_class.values
-                ]
-            )
+            ec_elim = np.concatenate(list(data_ec_t.equiv_class.values))
 
             # print(ec_elim)
             # print(type(ec_elim[0]))
             table_new = table.drop(int(ec_elim[0])).reset_index()
             supp_rate = (len(table) - len(table_new)) / len(table)
-            if supp_rate > supp_records or pc.t_closeness(table_new, qi, sa) > t:
+            t_new = EquivalenceClassIndex(table_new, qi, sa).t()
+            if supp_rate > supp_records or t_new > t:
                 print(
                     f"t-closeness cannot be satisfied by deleting less than "
                     f"{supp_records}% of the records."
                 )
                 return table
             else:
-                assert pc.t_closeness(table_new, qi, sa) <= t
+                assert t_new <= t
                 return table_new
@@ -16,4 +16,12 @@
 
 __all__ = [
     "utils_k_anonymity",
+    "frequency_set",
+    "encoding",
+    "hierarchy",
+    "equivalence_class",
+    "generalization_cache",
+    "lattice",
+    "parallel",
+    "shared_dataset",
 ]
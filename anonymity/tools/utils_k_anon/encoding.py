@@ -0,0 +1,256 @@
+import math
+import typing
+import numpy as np
+import pandas as pd
+from anonymity.tools.utils_k_anon import generalization_cache as gc
+from anonymity.tools.utils_k_anon import hierarchy as hie
+
+
+def encode_column(column: pd.Series) -> typing.Tuple[np.ndarray, np.ndarray]:
+    """Factorizes a column into integer codes.
+
+    :param column: column from the table under study.
+    :type column: pandas series
+
+    :return: code of each record and the distinct values of the column, so that
+        the value of each record is the one in the position given by its code.
+    :rtype: tuple of numpy arrays
+    """
+
+    codes, labels = pd.factorize(column, sort=False)
+    labels = np.asarray(labels, dtype=object)
+    if (codes == -1).any():
+        codes = np.where(codes == -1, len(labels), codes)
+        labels = np.append(labels, np.nan)
+    return codes.astype(np.int32), labels
+
+
+def level_maps(
+    labels: np.ndarray, hierarchies: dict, name: str
+) -> typing.Tuple[typing.List[np.ndarray], typing.List[np.ndarray]]:
+    """Translates the hierarchy of a column to arrays of codes. For every level, an
+    array maps the codes of the column straight to the codes of that level.
+
+    :param labels: distinct values of the column.
+    :type labels: numpy array
+
+    :param hierarchies: hierarchies for generalization of columns.
+    :type hierarchies: dictionary
+
+    :param name: Name of the column.
+    :type name: string
+
+    :return: list with the array of codes of each level, where the position 0 is
+        the identity, and list with the values of the codes of each level.
+    :rtype: tuple of lists of numpy arrays
+    """
+
+    maps = [np.arange(len(labels), dtype=np.int32)]
+    level_labels = [labels]
+    if name not in hierarchies:
+        return maps, level_labels
+
+    hierarchy = hierarchies[name]
+    if not isinstance(hierarchy, hie.Hierarchy):
+        hierarchy = hie.Hierarchy(hierarchy)
+
+    # Lowest level of the hierarchy where each value appears, since the column can
+    # be already generalized
+    from_level = np.full(len(labels), -1)
+    from_codes = np.full(len(labels), -1)
+    for level in range(hierarchy.height, -1, -1):
+        codes = hierarchy.codes(labels, level)
+        found = codes >= 0
+        from_level[found] = level
+        from_codes[found] = codes[found]
+
+    for level in range(1, hierarchy.height + 1):
+        # The values not covered by the hierarchy are kept
+        values = np.array(labels, dtype=object)
+        for low in range(level + 1):
+            covered = from_level == low
+            mapping = hierarchy.level_map(level, low)
+            values[covered] = hierarchy.labels[level][mapping[from_codes[covered]]]
+        if level in hierarchy.edges:
+            # Numbers and ranges missing from the hierarchy fall in its intervals
+            missing = np.flatnonzero(from_level == -1)
+            codes = hierarchy.interval_codes(labels[missing], level)
+            values[missing[codes >= 0]] = hierarchy.labels[level][codes[codes >= 0]]
+        codes, new_labels = encode_column(pd.Series(values, dtype=object))
+        maps.append(codes)
+        level_labels.append(new_labels)
+
+    return maps, level_labels
+
+
+def map_levels(
+    maps: typing.List[np.ndarray], gen_level: int, from_level: int = 0
+) -> np.ndarray:
+    """Array that maps the codes of a level of a column to a higher level.
+
+    :param maps: array of codes of each level of the hierarchy of the column.
+    :type maps: list of numpy arrays
+
+    :param gen_level: level of generalization.
+    :type gen_level: int
+
+    :param from_level: level of generalization of the codes to map.
+    :type from_level: int
+
+    :return: code at gen_level for each code at from_level, or None if some code
+        of from_level is split between several codes of gen_level.
+    :rtype: numpy array
+    """
+
+    if from_level == 0:
+        return maps[gen_level]
+    if len(maps[from_level]) == 0:
+        # Column without values
+        return np.zeros(0, dtype=np.int32)
+    mapping = np.zeros(int(maps[from_level].max()) + 1, dtype=np.int32)
+    mapping[maps[from_level]] = maps[gen_level]
+    if (mapping[maps[from_level]] != maps[gen_level]).any():
+        # The levels are not nested, so the codes of gen_level cannot be obtained
+        # from the ones of from_level
+        return None
+    return mapping
+
+
+def group_ids(codes: np.ndarray) -> typing.Tuple[np.ndarray, int]:
+    """Identifies the distinct rows of a matrix of codes.
+
+    :param codes: matrix with the codes of one column in each column.
+    :type codes: numpy array
+
+    :return: identifier of the distinct row of each row, numbered in order of
+        appearance, and number of distinct rows.
+    :rtype: tuple
+    """
+
+    n_rows, n_columns = codes.shape
+    if n_columns == 0 or n_rows == 0:
+        return np.zeros(n_rows, dtype=np.int64), min(n_rows, 1)
+
+    key = codes[:, 0].astype(np.int64)
+    for j in range(1, n_columns):
+        radix = int(codes[:, j].max()) + 1
+        if (int(key.max()) + 1) * radix >= 2**62:
+            key = pd.factorize(key)[0]
+        key = key * radix + codes[:, j]
+
+    ids, uniques = pd.factorize(key)
+    return ids.astype(np.int64), len(uniques)
+
+
+def pack_codes(
+    codes: np.ndarray, radices: typing.List[int]
+) -> typing.Optional[np.ndarray]:
+    """Packs each row of a matrix of codes in a single integer, whose digits are
+    the codes of the row. The same row gives the same integer in any matrix with
+    the same radices.
+
+    :param codes: matrix with the codes of one column in each column.
+    :type codes: numpy array
+
+    :param radices: number of codes of each column.
+    :type radices: list of ints
+
+    :return: integer of each row, or None if the combinations of codes do not fit
+        in 63 bits.
+    :rtype: numpy array
+    """
+
+    if math.prod(max(int(radix), 1) for radix in radices) >= 2**63:
+        return None
+    key = np.zeros(len(codes), dtype=np.int64)
+    for j, radix in enumerate(radices):
+        key = key * int(radix) + codes[:, j]
+    return key
+
+
+class EncodedTable:
+    """Columns of a table encoded as integer codes. The codes of each column can be
+    replaced by the codes of a generalization of it, and the values are only
+    recovered when the anonymized table is produced.
+
+    :param table: dataframe with the data under study.
+    :type table: pandas dataframe
+
+    :param columns: list with the name of the columns to encode.
+    :type columns: list of strings
+    """
+
+    def __init__(self, table: pd.DataFrame, columns: typing.List[str]):
+        self.n_records = len(table)
+        self.codes = {}
+        self.labels = {}
+        self._fingerprints = {}
+        for name in columns:
+            self.codes[name], self.labels[name] = encode_column(table[name])
+
+    @classmethod
+    def from_codes(cls, codes: dict, labels: dict, n_records: int) -> "EncodedTable":
+        """Builds the encoded table from the codes of its columns, without copying
+        them.
+
+        :param codes: code of each record of each column.
+        :type codes: dictionary
+
+        :param labels: distinct values of each column.
+        :type labels: dictionary
+
+        :param n_records: number of records of the table.
+        :type n_records: int
+
+        :return: encoded table.
+        :rtype: EncodedTable
+        """
+        encoded = cls.__new__(cls)
+        encoded.n_records = n_records
+        encoded.codes = dict(codes)
+        encoded.labels = dict(labels)
+        encoded._fingerprints = {}
+        return encoded
+
+    def __len__(self) -> int:
+        return self.n_records
+
+    def matrix(self, columns: typing.List[str]) -> np.ndarray:
+        """Matrix with the codes of the given columns.
+
+        :param columns: list with the name of the columns.
+        :type columns: list of strings
+
+        :return: matrix with the codes of one column in each column.
+        :rtype: numpy array
+        """
+        if len(columns) == 0:
+            return np.zeros((len(self), 0), dtype=np.int32)
+        return np.column_stack([self.codes[name] for name in columns])
+
+    def fingerprint(self, name: str) -> str:
+        """Digest of the values of a column, which identifies it in the cache of
+        generalized columns.
+
+        :param name: Name of the column.
+        :type name: string
+
+        :return: hexadecimal digest of the column.
+        :rtype: string
+        """
+        if name not in self._fingerprints:
+            self._fingerprints[name] = gc.fingerprint(
+                self.codes[name], self.labels[name]
+            )
+        return self._fingerprints[name]
+
+    def decode(self, name: str) -> np.ndarray:
+        """Values of a column.
+
+        :param name: Name of the column.
+        :type name: string
+
+        :return: value of each record.
+        :rtype: numpy array
+        """
+        return self.labels[name][self.codes[name]]
@@ -0,0 +1,287 @@
+import typing
+import numpy as np
+import pandas as pd
+from anonymity.tools.utils_k_anon import encoding as enc
+
+
+def class_diversities(
+    group: np.ndarray,
+    counts: np.ndarray,
+    sizes: np.ndarray,
+    variant: str = "distinct",
+    c: float = 1.0,
+) -> np.ndarray:
+    """l-diversity of each equivalence class from the histogram of a sensitive
+    attribute, given as the class and the count of each value present in it.
+
+    :param group: equivalence class of each entry of the histogram.
+    :type group: numpy array
+
+    :param counts: number of records of each entry of the histogram.
+    :type counts: numpy array
+
+    :param sizes: number of records of each equivalence class.
+    :type sizes: numpy array
+
+    :param variant: variant of l-diversity: "distinct", "entropy" or "recursive".
+    :type variant: string
+
+    :param c: constant of recursive (c,l)-diversity.
+    :type c: float
+
+    :return: l of each equivalence class.
+    :rtype: numpy array
+    """
+    if variant == "distinct":
+        return np.bincount(group, minlength=len(sizes))
+
+    if variant == "entropy":
+        p = counts / sizes[group]
+        entropy = -np.bincount(group, weights=p * np.log(p), minlength=len(sizes))
+        return np.exp(entropy)
+
+    if variant == "recursive":
+        # Counts of each class in decreasing order
+        order = np.lexsort((-counts, group))
+        group, counts = group[order], counts[order]
+        cumsum = np.cumsum(counts)
+        start = np.searchsorted(group, group)
+        first = counts[start]
+        # Sum of the counts from the i-th highest one to the lowest one
+        tail = (
+            sizes[group] - (cumsum - counts) + np.where(start > 0, cumsum[start - 1], 0)
+        )
+        satisfied = first < c * tail
+        result = np.bincount(group, weights=satisfied, minlength=len(sizes))
+        return np.maximum(result, 1).astype(np.int64)
+
+    raise ValueError(f"Unknown l-diversity variant: {variant}")
+
+
+class EquivalenceClassIndex:
+    """Equivalence classes of a table, computed with a single grouping of the
+    quasi-identifiers. k-anonymity, l-diversity, t-closeness, the records to
+    suppress and the utility metrics are all derived from it.
+
+    :param table: dataframe with the data under study.
+    :type table: pandas dataframe
+
+    :param qi: list with the name of the columns of the dataframe.
+        that are quasi-identifiers.
+    :type qi: list of strings
+
+    :param sa: list with the name of the columns of the dataframe.
+        that are sensitive attributes.
+    :type sa: list of strings
+    """
+
+    def __init__(
+        self,
+        table: pd.DataFrame,
+        qi: typing.Union[typing.List, np.ndarray],
+        sa: typing.Union[typing.List, np.ndarray] = (),
+    ):
+        codes = [enc.encode_column(table[name])[0] for name in qi]
+        if len(codes) == 0:
+            codes = np.zeros((len(table), 0), dtype=np.int32)
+        else:
+            codes = np.column_stack(codes)
+        self._group_by(codes)
+        for name in sa:
+            self.add_sensitive_attribute(name, table[name])
+
+    @classmethod
+    def from_codes(cls, codes: np.ndarray) -> "EquivalenceClassIndex":
+        """Builds the index from the codes of the quasi-identifiers.
+
+        :param codes: matrix with the codes of one quasi-identifier in each column.
+        :type codes: numpy array
+
+        :return: equivalence classes of the codes.
+        :rtype: EquivalenceClassIndex
+        """
+        index = cls.__new__(cls)
+        index._group_by(codes)
+        return index
+
+    def _group_by(self, codes: np.ndarray):
+        self.group, self.n_groups = enc.group_ids(codes)
+        self.sizes = np.bincount(self.group, minlength=self.n_groups)
+        self.histograms = {}
+        self.values = {}
+        self.numeric = {}
+
+    def __len__(self) -> int:
+        return len(self.group)
+
+    def add_sensitive_attribute(self, name: str, column: pd.Series):
+        """Computes the histogram of a sensitive attribute in each equivalence
+        class. Only the values present in each class are kept.
+
+        :param name: Name of the sensitive attribute.
+        :type name: string
+
+        :param column: values of the sensitive attribute.
+        :type column: pandas series
+        """
+        codes, values = pd.factorize(column, sort=True)
+        values = np.asarray(values)
+        if (codes == -1).any():
+            codes = np.where(codes == -1, len(values), codes)
+            values = np.append(values, np.nan)
+        n_values = max(len(values), 1)
+        pairs, counts = np.unique(
+            self.group * n_values + codes.astype(np.int64), return_counts=True
+        )
+        self.histograms[name] = (pairs // n_values, pairs % n_values, counts)
+        self.values[name] = values
+        self.numeric[name] = pd.api.types.is_numeric_dtype(column)
+
+    def k(self) -> int:
+        """Size of the smallest equivalence class."""
+        return int(self.sizes.min()) if self.n_groups > 0 else 0
+
+    def class_sizes(self) -> np.ndarray:
+        """Size of the equivalence class of each record."""
+        return self.sizes[self.group]
+
+    def suppression_mask(
+        self,
+        k: int,
+        l: typing.Optional[float] = None,
+        variant: str = "distinct",
+        c: float = 1.0,
+    ) -> np.ndarray:
+        """Records that belong to equivalence classes smaller than k or, if l is
+        given, that do not satisfy l-diversity for some sensitive attribute.
+
+        :param k: desired level of k-anonymity.
+        :type k: int
+
+        :param l: desired level of l-diversity.
+        :type l: float
+
+        :param variant: variant of l-diversity: "distinct", "entropy" or
+            "recursive".
+        :type variant: string
+
+        :param c: constant of recursive (c,l)-diversity.
+        :type c: float
+
+        :return: True for the records to suppress.
+        :rtype: numpy array
+        """
+        suppressed = self.sizes < k
+        if l is not None:
+            for name in self.histograms:
+                suppressed |= self.diversities(name, variant, c) < l
+        return suppressed[self.group]
+
+    def classes(self) -> typing.List[np.ndarray]:
+        """Positions of the records of each equivalence class."""
+        order = np.argsort(self.group, kind="stable")
+        return np.split(order, np.cumsum(self.sizes)[:-1])
+
+    def diversities(
+        self, sa: str, variant: str = "distinct", c: float = 1.0
+    ) -> np.ndarray:
+        """l-diversity of each equivalence class for a sensitive attribute, all
+        computed at once from the histograms of the classes:
+
+        - distinct: number of distinct values in the class.
+        - entropy: exponential of the entropy of the values in the class, the
+          highest l for which the class satisfies entropy l-diversity.
+        - recursive: highest l for which the class satisfies recursive
+          (c,l)-diversity, that is, r_1 < c (r_l + ... + r_m), being r_i the
+          i-th highest count of a value in the class.
+
+        :param sa: Name of the sensitive attribute.
+        :type sa: string
+
+        :param variant: variant of l-diversity: "distinct", "entropy" or
+            "recursive".
+        :type variant: string
+
+        :param c: constant of recursive (c,l)-diversity.
+        :type c: float
+
+        :return: l of each equivalence class.
+        :rtype: numpy array
+        """
+        group, _, counts = self.histograms[sa]
+        return class_diversities(group, counts, self.sizes, variant, c)
+
+    def l_value(
+        self,
+        sa: typing.Union[typing.List, np.ndarray, None] = None,
+        variant: str = "distinct",
+        c: float = 1.0,
+    ) -> typing.Union[int, float]:
+        """Value of l for l-diversity.
+
+        :param sa: sensitive attributes to consider, all of them by default.
+        :type sa: list of strings
+
+        :param variant: variant of l-diversity: "distinct", "entropy" or
+            "recursive".
+        :type variant: string
+
+        :param c: constant of recursive (c,l)-diversity.
+        :type c: float
+
+        :return: minimum l of the sensitive attributes in an equivalence class.
+        :rtype: int, or float for entropy l-diversity
+        """
+        sa = list(self.histograms) if sa is None else sa
+        l_min = min(self.diversities(name, variant, c).min() for name in sa)
+        return float(l_min) if variant == "entropy" else int(l_min)
+
+    def distances(self, sa: str, numeric: typing.Optional[bool] = None) -> np.ndarray:
+        """Earth Mover's Distance between the distribution of a sensitive attribute
+        in each equivalence class and in the whole table. The ordered distance is
+        used for numerical attributes and the equal distance for categorical ones.
+
+        :param sa: Name of the sensitive attribute.
+        :type sa: string
+
+        :param numeric: whether the attribute is numerical, taken from its type by
+            default.
+        :type numeric: boolean
+
+        :return: t of each equivalence class.
+        :rtype: numpy array
+        """
+        group, value, counts = self.histograms[sa]
+        n_values = len(self.values[sa])
+        total = np.bincount(value, weights=counts, minlength=n_values) / len(self)
+        q = counts / self.sizes[group]
+
+        if numeric is None:
+            numeric = self.numeric[sa]
+        if not numeric:
+            # Values missing from a class contribute with their global frequency
+            present = np.bincount(group, weights=total[value], minlength=self.n_groups)
+            diff = np.bincount(
+                group, weights=np.abs(q - total[value]), minlength=self.n_groups
+            )
+            return 0.5 * (diff + 1 - present)
+
+        if n_values < 2:
+            return np.zeros(self.n_groups)
+        r = np.zeros((self.n_groups, n_values))
+        r[group, value] = q
+        r -= total
+        return np.abs(np.cumsum(r, axis=1)).sum(axis=1) / (n_values - 1)
+
+    def t(self, sa: typing.Union[typing.List, np.ndarray, None] = None) -> float:
+        """Value of t for t-closeness.
+
+        :param sa: sensitive attributes to consider, all of them by default.
+        :type sa: list of strings
+
+        :return: maximum distance between the distribution of a sensitive attribute
+            in an equivalence class and in the whole table.
+        :rtype: float
+        """
+        sa = list(self.histograms) if sa is None else sa
+        return float(max(self.distances(name).max() for name in sa))
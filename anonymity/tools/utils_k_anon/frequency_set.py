@@ -0,0 +1,312 @@
+import typing
+import numpy as np
+from anonymity.tools.utils_k_anon import encoding as enc
+from anonymity.tools.utils_k_anon import equivalence_class as ec
+
+
+class FrequencySet(typing.NamedTuple):
+    """Number of records of each distinct combination of codes of the
+    quasi-identifiers.
+
+    :param names: name of the quasi-identifier of each column of codes.
+    :type names: list of strings
+
+    :param codes: matrix with one row for each distinct combination of codes.
+    :type codes: numpy array
+
+    :param counts: number of records of each combination.
+    :type counts: numpy array
+
+    :param histograms: for each sensitive attribute, the number of records of each
+        of its codes in each combination, as a frequency set whose columns are the
+        row of the combination and the code of the sensitive attribute.
+    :type histograms: dictionary
+    """
+
+    names: typing.List[str]
+    codes: np.ndarray
+    counts: np.ndarray
+    histograms: typing.Optional[dict] = None
+
+    def __len__(self) -> int:
+        return len(self.counts)
+
+    def min(self) -> int:
+        """Size of the smallest equivalence class."""
+        return int(self.counts.min())
+
+    def max(self) -> int:
+        """Size of the largest equivalence class."""
+        return int(self.counts.max())
+
+
+class Diversity(typing.NamedTuple):
+    """l-diversity that the equivalence classes must satisfy besides k-anonymity.
+    The frequency sets then keep a histogram of each sensitive attribute, so their
+    size does not grow with the combinations of values of the sensitive attributes.
+
+    :param sa: list with the name of the sensitive attributes.
+    :type sa: list of strings
+
+    :param l: desired level of l-diversity.
+    :type l: float
+
+    :param variant: variant of l-diversity: "distinct", "entropy" or "recursive".
+    :type variant: string
+
+    :param c: constant of recursive (c,l)-diversity.
+    :type c: float
+    """
+
+    sa: typing.List[str]
+    l: float
+    variant: str = "distinct"
+    c: float = 1.0
+
+
+def aggregate(
+    names: typing.List[str],
+    codes: np.ndarray,
+    counts: np.ndarray,
+    histograms: typing.Optional[dict] = None,
+) -> FrequencySet:
+    """Adds up the counts of the equal rows of a matrix of codes, and the
+    histograms of the sensitive attributes of the rows that become equal.
+
+    :param names: name of the quasi-identifier of each column of codes.
+    :type names: list of strings
+
+    :param codes: matrix with the codes of one quasi-identifier in each column.
+    :type codes: numpy array
+
+    :param counts: number of records of each row.
+    :type counts: numpy array
+
+    :param histograms: histogram of each sensitive attribute in the rows, see
+        :class:`FrequencySet`.
+    :type histograms: dictionary
+
+    :return: frequency set of the rows.
+    :rtype: FrequencySet
+    """
+
+    ids, n_groups = enc.group_ids(codes)
+    first = np.empty(n_groups, dtype=np.int64)
+    first[ids] = np.arange(len(ids))
+    new_counts = np.bincount(ids, weights=counts, minlength=n_groups)
+    new_histograms = None
+    if histograms is not None:
+        new_histograms = {}
+        for name, histogram in histograms.items():
+            pairs = np.column_stack([ids[histogram.codes[:, 0]], histogram.codes[:, 1]])
+            new_histograms[name] = aggregate(histogram.names, pairs, histogram.counts)
+    return FrequencySet(
+        list(names), codes[first], new_counts.astype(np.int64), new_histograms
+    )
+
+
+def get_frequency_set(
+    encoded: enc.EncodedTable,
+    qi: typing.Union[typing.List, np.ndarray],
+    sa: typing.Optional[typing.List[str]] = None,
+) -> FrequencySet:
+    """Builds the frequency set of a table, that is, the number of records of each
+    distinct combination of values of the quasi-identifiers, with the histogram of
+    each sensitive attribute in each combination if they are given.
+
+    :param encoded: table under study with the quasi-identifiers encoded.
+    :type encoded: EncodedTable
+
+    :param qi: list with the name of the columns of the dataframe.
+        that are quasi-identifiers.
+    :type qi: list of strings
+
+    :param sa: list with the name of the columns of the dataframe.
+        that are sensitive attributes, also encoded.
+    :type sa: list of strings
+
+    :return: frequency set of the quasi-identifiers.
+    :rtype: FrequencySet
+    """
+
+    counts = np.ones(len(encoded), dtype=np.int64)
+    histograms = None
+    if sa:
+        # Each record is a row of its own before aggregating
+        records = np.arange(len(encoded), dtype=np.int64)
+        histograms = {
+            name: FrequencySet(
+                ["class", name],
+                np.column_stack([records, encoded.codes[name]]),
+                counts,
+            )
+            for name in sa
+        }
+    return aggregate(list(qi), encoded.matrix(list(qi)), counts, histograms)
+
+
+def roll_up(freq_set: FrequencySet, name: str, mapping: np.ndarray) -> FrequencySet:
+    """Generalizes one quasi-identifier of a frequency set, adding up the counts
+    of the tuples that become equal. The cost depends on the number of distinct
+    tuples of the frequency set, not on the number of records of the table.
+
+    :param freq_set: frequency set to generalize.
+    :type freq_set: FrequencySet
+
+    :param name: Name of the quasi-identifier that needs to be generalized.
+    :type name: string
+
+    :param mapping: generalized code for each code of the quasi-identifier.
+    :type mapping: numpy array
+
+    :return: frequency set with the quasi-identifier generalized.
+    :rtype: FrequencySet
+    """
+
+    i = freq_set.names.index(name)
+    codes = freq_set.codes.copy()
+    codes[:, i] = np.take(mapping, codes[:, i])
+    return aggregate(freq_set.names, codes, freq_set.counts, freq_set.histograms)
+
+
+def project(
+    freq_set: FrequencySet, qi: typing.Union[typing.List, np.ndarray]
+) -> FrequencySet:
+    """Projects a frequency set over a subset of its quasi-identifiers.
+
+    :param freq_set: frequency set to project.
+    :type freq_set: FrequencySet
+
+    :param qi: list with the name of the quasi-identifiers to keep.
+    :type qi: list of strings
+
+    :return: frequency set of the given quasi-identifiers.
+    :rtype: FrequencySet
+    """
+
+    columns = [freq_set.names.index(name) for name in qi]
+    return aggregate(
+        list(qi), freq_set.codes[:, columns], freq_set.counts, freq_set.histograms
+    )
+
+
+def kept_classes(
+    freq_set: FrequencySet, k: int, diversity: typing.Optional[Diversity] = None
+) -> typing.Tuple[np.ndarray, np.ndarray]:
+    """Sizes of the equivalence classes of a frequency set and whether each one is
+    kept, that is, has at least k records and satisfies l-diversity if required.
+    l-diversity is computed from the histogram of each sensitive attribute in each
+    class, which the frequency set keeps.
+
+    :param freq_set: frequency set under study.
+    :type freq_set: FrequencySet
+
+    :param k: desired level of k-anonymity.
+    :type k: int
+
+    :param diversity: l-diversity required, if any.
+    :type diversity: Diversity
+
+    :return: number of records of each equivalence class, and True for the
+        classes that are kept.
+    :rtype: tuple of numpy arrays
+    """
+
+    sizes = freq_set.counts
+    kept = sizes >= k
+    if diversity is None:
+        return sizes, kept
+
+    for name in diversity.sa:
+        histogram = freq_set.histograms[name]
+        diversities = ec.class_diversities(
+            histogram.codes[:, 0],
+            histogram.counts,
+            sizes,
+            diversity.variant,
+            diversity.c,
+        )
+        kept &= diversities >= diversity.l
+    return sizes, kept
+
+
+def discernibility(
+    freq_set: FrequencySet, k: int, diversity: typing.Optional[Diversity] = None
+) -> int:
+    """Discernibility metric of a frequency set: each record is penalized with the
+    size of its equivalence class, and the records of the classes smaller than k,
+    which are suppressed, with the size of the table.
+
+    :param freq_set: frequency set under study.
+    :type freq_set: FrequencySet
+
+    :param k: desired level of k-anonymity.
+    :type k: int
+
+    :param diversity: l-diversity required, the classes that do not satisfy it
+        are also suppressed.
+    :type diversity: Diversity
+
+    :return: discernibility of the anonymized table.
+    :rtype: int
+    """
+
+    counts, kept = kept_classes(freq_set, k, diversity)
+    kept = counts[kept]
+    return int(np.sum(kept**2) + np.sum(counts) * (np.sum(counts) - np.sum(kept)))
+
+
+def suppressed_records(
+    freq_set: FrequencySet, k: int, diversity: typing.Optional[Diversity] = None
+) -> int:
+    """Number of records that belong to equivalence classes smaller than k or
+    that do not satisfy l-diversity.
+
+    :param freq_set: frequency set under study.
+    :type freq_set: FrequencySet
+
+    :param k: desired level of k-anonymity.
+    :type k: int
+
+    :param diversity: l-diversity required, if any.
+    :type diversity: Diversity
+
+    :return: number of records that need to be suppressed to reach k.
+    :rtype: int
+    """
+
+    counts, kept = kept_classes(freq_set, k, diversity)
+    return int(counts[~kept].sum())
+
+
+def is_k_anonymous(
+    freq_set: FrequencySet,
+    k: int,
+    supp_threshold: int,
+    diversity: typing.Optional[Diversity] = None,
+) -> bool:
+    """Checks if a frequency set satisfies k-anonymity, and l-diversity if
+    required, suppressing at most supp_threshold records. Both generalizing and
+    removing quasi-identifiers preserve this property, since a class made of
+    other classes has at least as many records and values as any of them.
+
+    :param freq_set: frequency set under study.
+    :type freq_set: FrequencySet
+
+    :param k: desired level of k-anonymity.
+    :type k: int
+
+    :param supp_threshold: maximum number of records that can be suppressed.
+    :type supp_threshold: int
+
+    :param diversity: l-diversity required, if any.
+    :type diversity: Diversity
+
+    :return: True if the frequency set satisfies k-anonymity.
+    :rtype: boolean
+    """
+
+    counts, kept = kept_classes(freq_set, k, diversity)
+    if not kept.any():
+        return False
+    return int(counts[~kept].sum()) <= supp_threshold
@@ -0,0 +1,137 @@
+import collections
+import hashlib
+import typing
+import numpy as np
+import pandas as pd
+
+
+def fingerprint(*values) -> str:
+    """Digest of the content of some arrays or strings, used to identify a column
+    of a dataset and its hierarchy.
+
+    :param values: arrays or strings to identify.
+    :type values: numpy arrays or strings
+
+    :return: hexadecimal digest of the values.
+    :rtype: string
+    """
+
+    digest = hashlib.blake2b(digest_size=16)
+    for value in values:
+        if isinstance(value, str):
+            digest.update(value.encode())
+            continue
+        array = np.asarray(value)
+        if array.dtype == object:
+            array = pd.util.hash_pandas_object(
+                pd.Series(array, dtype=object), index=False
+            ).values
+        digest.update(f"{array.dtype.str}{array.shape}".encode())
+        digest.update(np.ascontiguousarray(array).view(np.uint8).reshape(-1))
+    return digest.hexdigest()
+
+
+def nbytes(value) -> int:
+    """Approximate memory used by an array or a tuple of arrays."""
+    if isinstance(value, tuple):
+        return sum(nbytes(item) for item in value)
+    if isinstance(value, pd.Categorical):
+        return value.codes.nbytes + value.categories.nbytes
+    return np.asarray(value).nbytes
+
+
+class GeneralizationCache:
+    """Cache of generalized columns, so that each column is generalized to each
+    level at most once. The entries are kept under a budget of bytes, evicting the
+    least recently used ones. Each search creates its own cache, so the columns are
+    released when it returns.
+
+    :param max_bytes: maximum memory used by the cached columns.
+    :type max_bytes: int
+    """
+
+    def __init__(self, max_bytes: int = 64 * 2**20):
+        self.max_bytes = max_bytes
+        self.nbytes = 0
+        self.hits = 0
+        self.misses = 0
+        self._entries = collections.OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def __contains__(self, key) -> bool:
+        return key in self._entries
+
+    def get(self, key, default=None):
+        """Cached value of a key, which becomes the most recently used.
+
+        :param key: attribute, level and fingerprint of the dataset.
+        :type key: tuple
+
+        :param default: value returned if the key is not cached.
+
+        :return: cached value of the key.
+        """
+        if key not in self._entries:
+            self.misses += 1
+            return default
+        self.hits += 1
+        self._entries.move_to_end(key)
+        return self._entries[key][0]
+
+    def put(self, key, value):
+        """Caches a value, evicting the least recently used entries if the budget
+        of bytes is exceeded. Values larger than the budget are not cached.
+
+        :param key: attribute, level and fingerprint of the dataset.
+        :type key: tuple
+
+        :param value: generalized column.
+        :type value: numpy array or tuple of numpy arrays
+        """
+        size = nbytes(value)
+        if key in self._entries:
+            self.nbytes -= self._entries.pop(key)[1]
+        if size > self.max_bytes:
+            return
+        # The cached arrays are shared, so they cannot be modified
+        for array in value if isinstance(value, tuple) else (value,):
+            if isinstance(array, np.ndarray):
+                array.setflags(write=False)
+        self._entries[key] = (value, size)
+        self.nbytes += size
+        self.resize(self.max_bytes)
+
+    def get_or_compute(self, key, function: typing.Callable):
+        """Cached value of a key, computed and cached if it is not.
+
+        :param key: attribute, level and fingerprint of the dataset.
+        :type key: tuple
+
+        :param function: function without arguments that computes the value.
+        :type function: callable
+
+        :return: value of the key.
+        """
+        value = self.get(key)
+        if value is None:
+            value = function()
+            self.put(key, value)
+        return value
+
+    def resize(self, max_bytes: int):
+        """Changes the budget of bytes, evicting the least recently used entries
+        that do not fit.
+
+        :param max_bytes: maximum memory used by the cached columns.
+        :type max_bytes: int
+        """
+        self.max_bytes = max_bytes
+        while self.nbytes > self.max_bytes:
+            self.nbytes -= self._entries.popitem(last=False)[1][1]
+
+    def clear(self):
+        """Removes all the entries."""
+        self._entries.clear()
+        self.nbytes = 0
@@ -0,0 +1,204 @@
+import collections.abc
+import typing
+import numpy as np
+import pandas as pd
+from anonymity.tools.utils_k_anon import generalization_cache as gc
+
+
+def parse_intervals(
+    values: typing.Union[typing.List, np.ndarray]
+) -> typing.Tuple[np.ndarray, np.ndarray]:
+    """Obtains the bounds of intervals written as strings like "[a, b)". Numbers
+    are taken as intervals containing only themselves.
+
+    :param values: intervals as strings or numbers.
+    :type values: list of values
+
+    :return: left and right bounds of each value, NaN when it is not an interval.
+    :rtype: tuple of numpy arrays
+    """
+    values = pd.Series(np.asarray(values, dtype=object), dtype=object)
+    codes, uniques = pd.factorize(values)
+    uniques = pd.Series(uniques, dtype=object)
+    numbers = pd.to_numeric(uniques, errors="coerce").astype(np.float64).values
+    bounds = uniques.astype(str).str.extract(
+        r"^\[\s*([-+.\deE]+)\s*,\s*([-+.\deE]+)\s*\)$"
+    )
+    is_number = ~np.isnan(numbers)
+    left = np.where(is_number, numbers, pd.to_numeric(bounds[0], errors="coerce"))
+    right = np.where(is_number, numbers, pd.to_numeric(bounds[1], errors="coerce"))
+    left = np.append(left, np.nan)[codes]
+    right = np.append(right, np.nan)[codes]
+    return left, right
+
+
+class Hierarchy(collections.abc.Sequence):
+    """Generalization hierarchy of a column compiled into arrays. Each row of the
+    hierarchy contains a value of the column (leaf) followed by its generalization
+    at every level. For each level, an array maps the code of every leaf straight
+    to the code of its generalization at that level, so generalizing to any level
+    is a single lookup.
+
+    The hierarchy can still be used as the list of rows it was built from, so it is
+    accepted wherever the hierarchies are given as lists.
+
+    :param rows: rows of the hierarchy, all with the same number of levels.
+    :type rows: list of lists
+    """
+
+    def __init__(self, rows: typing.Union[typing.List, np.ndarray]):
+        self.rows = [list(row) for row in rows]
+
+        # Only the first row of each leaf is used
+        leaves = pd.Series([row[0] for row in self.rows], dtype=object)
+        rows = [row for row, dup in zip(self.rows, leaves.duplicated()) if not dup]
+
+        self.levels = []
+        self.labels = []
+        n_levels = len(rows[0]) if len(rows) > 0 else 1
+        for level in range(n_levels):
+            values = pd.Series([row[level] for row in rows], dtype=object)
+            codes, labels = pd.factorize(values, sort=False)
+            self.levels.append(codes.astype(np.int32))
+            self.labels.append(np.asarray(labels, dtype=object))
+        self.cardinalities = np.array([len(labels) for labels in self.labels])
+        self._index = {}
+        self._fingerprint = None
+
+        # Bin edges of the levels made of intervals, sorted by their left bound
+        self.edges = {}
+        for level in range(1, n_levels):
+            left, right = parse_intervals(self.labels[level])
+            if len(left) > 0 and not np.isnan(left).any() and (left < right).all():
+                order = np.argsort(left, kind="stable")
+                self.edges[level] = (left[order], right[order], order.astype(np.int32))
+
+    def __len__(self) -> int:
+        return len(self.rows)
+
+    def __getitem__(self, i):
+        return self.rows[i]
+
+    @property
+    def height(self) -> int:
+        """Highest level of generalization."""
+        return len(self.levels) - 1
+
+    @property
+    def fingerprint(self) -> str:
+        """Digest of the levels of the hierarchy."""
+        if self._fingerprint is None:
+            self._fingerprint = gc.fingerprint(*self.levels, *self.labels)
+        return self._fingerprint
+
+    def codes(
+        self, values: typing.Union[typing.List, np.ndarray], level: int = 0
+    ) -> np.ndarray:
+        """Codes of some values of the given level of the hierarchy.
+
+        :param values: values of the level.
+        :type values: list of values
+
+        :param level: level of the values.
+        :type level: int
+
+        :return: code of each value, -1 for the values not in the hierarchy.
+        :rtype: numpy array
+        """
+        if level not in self._index:
+            self._index[level] = pd.Index(self.labels[level])
+        return self._index[level].get_indexer(np.asarray(values, dtype=object))
+
+    def interval_codes(
+        self, values: typing.Union[typing.List, np.ndarray], level: int
+    ) -> np.ndarray:
+        """Codes of the intervals of a level that contain some values, found with a
+        binary search over the bin edges of the level. Intervals are located by
+        their left bound.
+
+        :param values: numbers or intervals as strings.
+        :type values: list of values
+
+        :param level: level of the hierarchy made of intervals.
+        :type level: int
+
+        :return: code of each value, -1 for the values out of the intervals.
+        :rtype: numpy array
+        """
+        if pd.api.types.is_numeric_dtype(np.asarray(values)):
+            keys = np.asarray(values, dtype=np.float64)
+        else:
+            keys = parse_intervals(values)[0]
+        if level not in self.edges:
+            return np.full(len(keys), -1)
+
+        left, right, order = self.edges[level]
+        position = np.searchsorted(left, keys, side="right") - 1
+        position = np.clip(position, 0, len(left) - 1)
+        found = (keys >= left[position]) & (keys < right[position])
+        return np.where(found, order[position], -1)
+
+    def level_map(self, gen_level: int, from_level: int = 0) -> np.ndarray:
+        """Array that maps the codes of a level to the codes of a higher level.
+
+        :param gen_level: level of generalization.
+        :type gen_level: int
+
+        :param from_level: level of the codes to map.
+        :type from_level: int
+
+        :return: code at gen_level for each code at from_level.
+        :rtype: numpy array
+        """
+        if from_level == 0:
+            return self.levels[gen_level]
+        mapping = np.empty(self.cardinalities[from_level], dtype=np.int32)
+        # The first leaf of each code of from_level is the one that counts
+        mapping[self.levels[from_level][::-1]] = self.levels[gen_level][::-1]
+        return mapping
+
+    def generalize(
+        self,
+        values: typing.Union[typing.List, np.ndarray],
+        gen_level: int,
+        from_level: int = 0,
+    ) -> np.ndarray:
+        """Generalizes some values of a level to a higher level.
+
+        :param values: values of the level from_level.
+        :type values: list of values
+
+        :param gen_level: level of generalization.
+        :type gen_level: int
+
+        :param from_level: level of the values.
+        :type from_level: int
+
+        :return: generalized values, the values not in the hierarchy are kept.
+        :rtype: numpy array
+        """
+        codes = self.codes(values, from_level)
+        result = np.array(values, dtype=object)
+        covered = codes >= 0
+        mapping = self.level_map(gen_level, from_level)
+        codes[covered] = mapping[codes[covered]]
+        if gen_level in self.edges:
+            codes[~covered] = self.interval_codes(result[~covered], gen_level)
+            covered = codes >= 0
+        result[covered] = self.labels[gen_level][codes[covered]]
+        return result
+
+
+def compile_hierarchies(hierarchies: dict) -> dict:
+    """Compiles the hierarchies given as lists of rows.
+
+    :param hierarchies: hierarchies for generalization of columns.
+    :type hierarchies: dictionary
+
+    :return: hierarchy of each column.
+    :rtype: dictionary of Hierarchy
+    """
+    return {
+        name: hie if isinstance(hie, Hierarchy) else Hierarchy(hie)
+        for name, hie in hierarchies.items()
+    }
@@ -0,0 +1,157 @@
+import typing
+import numpy as np
+
+
+class Lattice:
+    """Generalization lattice of some quasi-identifiers. Each node, that is, a level
+    of generalization for every quasi-identifier, is encoded as an integer in a
+    mixed radix numeral system where the digits are the levels and the bases the
+    number of levels of each hierarchy. The first quasi-identifier is the most
+    significant digit, so the integers follow the lexicographic order of the
+    levels. Successors and predecessors are obtained adding and subtracting the
+    place values of the digits, and the visited nodes are kept in a bitmap.
+
+    :param heights: highest level of generalization of each quasi-identifier.
+    :type heights: list of ints
+    """
+
+    def __init__(self, heights: typing.Union[typing.List, np.ndarray]):
+        self.heights = np.asarray(heights, dtype=np.int64).reshape(-1)
+        radix = self.heights + 1
+        self.strides = np.ones(len(radix), dtype=np.int64)
+        if len(radix) > 1:
+            self.strides[:-1] = np.cumprod(radix[::-1])[::-1][1:]
+        self.size = int(np.prod(radix))
+        self._radix = radix
+        self._levels = None
+        self._visited = np.zeros((self.size + 7) // 8, dtype=np.uint8)
+
+    def __len__(self) -> int:
+        return self.size
+
+    @property
+    def bottom(self) -> int:
+        """Node without generalization."""
+        return 0
+
+    @property
+    def top(self) -> int:
+        """Node with every quasi-identifier at its highest level."""
+        return self.size - 1
+
+    @property
+    def levels(self) -> np.ndarray:
+        """Matrix with the levels of every node, one node in each row."""
+        if self._levels is None:
+            self._levels = self.decode(np.arange(self.size))
+        return self._levels
+
+    @property
+    def node_heights(self) -> np.ndarray:
+        """Height of every node, that is, the sum of its levels."""
+        return self.levels.sum(axis=1)
+
+    def encode(self, levels: typing.Union[typing.List, np.ndarray]) -> np.ndarray:
+        """Integers of some nodes.
+
+        :param levels: levels of a node, or matrix with one node in each row.
+        :type levels: list of ints or numpy array
+
+        :return: integer of each node.
+        :rtype: int or numpy array
+        """
+        codes = np.asarray(levels, dtype=np.int64) @ self.strides
+        return int(codes) if np.ndim(codes) == 0 else codes
+
+    def decode(self, nodes: typing.Union[int, np.ndarray]) -> np.ndarray:
+        """Levels of some nodes.
+
+        :param nodes: integer of a node or array of them.
+        :type nodes: int or numpy array
+
+        :return: levels of the node, or matrix with one node in each row.
+        :rtype: numpy array
+        """
+        nodes = np.asarray(nodes, dtype=np.int64)
+        return (nodes[..., np.newaxis] // self.strides) % self._radix
+
+    def node(self, node: int) -> tuple:
+        """Levels of a node as a tuple."""
+        return tuple(int(level) for level in self.decode(node))
+
+    def height(self, node: int) -> int:
+        """Sum of the levels of a node."""
+        return int(self.decode(node).sum())
+
+    def nodes(self, height: typing.Optional[int] = None) -> np.ndarray:
+        """Integers of the nodes of the lattice, in lexicographic order.
+
+        :param height: sum of the levels of the nodes, all of them by default.
+        :type height: int
+
+        :return: integer of each node.
+        :rtype: numpy array
+        """
+        if height is None:
+            return np.arange(self.size, dtype=np.int64)
+        return np.flatnonzero(self.node_heights == height)
+
+    def successors(self, node: int) -> np.ndarray:
+        """Nodes that generalize one more level one quasi-identifier of a node.
+
+        :param node: integer of the node.
+        :type node: int
+
+        :return: integers of the successors.
+        :rtype: numpy array
+        """
+        return node + self.strides[self.decode(node) < self.heights]
+
+    def predecessors(self, node: int) -> np.ndarray:
+        """Nodes that generalize one less level one quasi-identifier of a node.
+
+        :param node: integer of the node.
+        :type node: int
+
+        :return: integers of the predecessors.
+        :rtype: numpy array
+        """
+        return node - self.strides[self.decode(node) > 0]
+
+    def generalizations(
+        self, node: int, nodes: typing.Optional[np.ndarray] = None
+    ) -> np.ndarray:
+        """Nodes whose levels are all greater or equal than the ones of a node.
+
+        :param node: integer of the node.
+        :type node: int
+
+        :param nodes: nodes to consider, all the lattice by default.
+        :type nodes: numpy array
+
+        :return: integers of the generalizations of the node, including itself.
+        :rtype: numpy array
+        """
+        nodes = self.nodes() if nodes is None else np.asarray(nodes, dtype=np.int64)
+        return nodes[(self.decode(nodes) >= self.decode(node)).all(axis=1)]
+
+    def visit(self, nodes: typing.Union[int, np.ndarray]):
+        """Marks some nodes as visited.
+
+        :param nodes: integer of a node or array of them.
+        :type nodes: int or numpy array
+        """
+        nodes = np.asarray(nodes, dtype=np.int64)
+        np.bitwise_or.at(self._visited, nodes >> 3, (1 << (nodes & 7)).astype(np.uint8))
+
+    def visited(self, nodes: typing.Union[int, np.ndarray]) -> np.ndarray:
+        """Checks if some nodes were visited.
+
+        :param nodes: integer of a node or array of them.
+        :type nodes: int or numpy array
+
+        :return: True for the visited nodes.
+        :rtype: boolean or numpy array
+        """
+        nodes = np.asarray(nodes, dtype=np.int64)
+        return (self._visited[nodes >> 3] >> (nodes & 7)) & 1 == 1
@@ -0,0 +1,159 @@
+import concurrent.futures
+import contextlib
+import typing
+import numpy as np
+from anonymity.tools.utils_k_anon import frequency_set as fs
+from anonymity.tools.utils_k_anon.shared_dataset import attach_array, share_array
+
+# State of each worker process, set once when the process starts
+_worker = {}
+
+
+def init_worker(
+    codes, counts, histograms, names, fixed, maps, k, supp_threshold, diversity
+):
+    """Attaches a worker process to the frequency set of the table."""
+    _worker["blocks"] = []
+    for key, spec in (("codes", codes), ("counts", counts)):
+        block, _worker[key] = attach_array(spec)
+        _worker["blocks"].append(block)
+    _worker["histograms"] = None
+    if histograms is not None:
+        _worker["histograms"] = {}
+        for name, (histogram_codes, histogram_counts) in histograms.items():
+            block, histogram_codes = attach_array(histogram_codes)
+            _worker["blocks"].append(block)
+            block, histogram_counts = attach_array(histogram_counts)
+            _worker["blocks"].append(block)
+            _worker["histograms"][name] = fs.FrequencySet(
+                ["class", name], histogram_codes, histogram_counts
+            )
+    _worker.update(
+        names=names,
+        fixed=fixed,
+        maps=maps,
+        k=k,
+        supp_threshold=supp_threshold,
+        diversity=diversity,
+    )
+
+
+def evaluate_node(
+    columns: typing.List[str], levels: tuple
+) -> typing.Tuple[bool, typing.Optional[int]]:
+    """Checks if a node of the lattice of a subset of quasi-identifiers satisfies
+    k-anonymity, and l-diversity if required, generalizing the frequency set of
+    the table shared with the worker.
+
+    :param columns: quasi-identifiers of the subset.
+    :type columns: list of strings
+
+    :param levels: level of generalization of each quasi-identifier.
+    :type levels: tuple of ints
+
+    :return: True if the node satisfies k-anonymity, and its discernibility.
+    :rtype: tuple
+    """
+    names, maps = _worker["names"], _worker["maps"]
+    base = _worker["codes"]
+    k, diversity = _worker["k"], _worker["diversity"]
+    fixed = list(_worker["fixed"])
+    codes = [
+        np.take(maps[name][level], base[:, names.index(name)])
+        for name, level in zip(columns, levels)
+    ]
+    codes += [base[:, names.index(name)] for name in fixed]
+    freq_set = fs.aggregate(
+        list(columns) + fixed,
+        np.column_stack(codes),
+        _worker["counts"],
+        _worker["histograms"],
+    )
+    if fs.is_k_anonymous(freq_set, k, _worker["supp_threshold"], diversity):
+        return True, fs.discernibility(freq_set, k, diversity)
+    return False, None
+
+
+@contextlib.contextmanager
+def node_evaluator(
+    base: fs.FrequencySet,
+    fixed: typing.List[str],
+    maps: dict,
+    k: int,
+    supp_threshold: int,
+    n_jobs: int,
+    diversity: typing.Optional[fs.Diversity] = None,
+):
+    """Pool of processes that evaluate nodes of the lattice. The frequency set of
+    the table is shared with the workers through shared memory, which is released
+    when the pool is closed.
+
+    :param base: frequency set of the table without generalization.
+    :type base: FrequencySet
+
+    :param fixed: quasi-identifiers that cannot be generalized.
+    :type fixed: list of strings
+
+    :param maps: arrays of codes of each level of each quasi-identifier.
+    :type maps: dictionary
+
+    :param k: desired level of k-anonymity.
+    :type k: int
+
+    :param supp_threshold: maximum number of records that can be suppressed.
+    :type supp_threshold: int
+
+    :param n_jobs: number of processes.
+    :type n_jobs: int
+
+    :param diversity: l-diversity required, the frequency set then includes the
+        histograms of the sensitive attributes.
+    :type diversity: Diversity
+
+    :return: function that evaluates a list of nodes, given as the quasi-identifiers
+        of the subset and their levels, returning the results in the same order.
+    :rtype: callable
+    """
+    blocks = []
+    try:
+        block, codes = share_array(base.codes)
+        blocks.append(block)
+        block, counts = share_array(base.counts)
+        blocks.append(block)
+        histograms = None
+        if base.histograms is not None:
+            histograms = {}
+            for name, histogram in base.histograms.items():
+                block, histogram_codes = share_array(histogram.codes)
+                blocks.append(block)
+                block, histogram_counts = share_array(histogram.counts)
+                blocks.append(block)
+                histograms[name] = (histogram_codes, histogram_counts)
+        initargs = (
+            codes,
+            counts,
+            histograms,
+            base.names,
+            fixed,
+            maps,
+            k,
+            supp_threshold,
+            diversity,
+        )
+        with concurrent.futures.ProcessPoolExecutor(
+            max_workers=n_jobs, initializer=init_worker, initargs=initargs
+        ) as pool:
+
+            def evaluate(nodes):
+                if len(nodes) == 0:
+                    return []
+                chunksize = max(1, len(nodes) // (4 * n_jobs))
+                columns, levels = zip(*nodes)
+                return list(
+                    pool.map(evaluate_node, columns, levels, chunksize=chunksize)
+                )
+
+            yield evaluate
+    finally:
+        for block in blocks:
+            block.unlink()
@@ -0,0 +1,310 @@
+import atexit
+import os
+import pickle
+import sys
+import typing
+from multiprocessing import resource_tracker, shared_memory
+import numpy as np
+import pandas as pd
+from anonymity.tools.utils_k_anon import encoding as enc
+from anonymity.tools.utils_k_anon import hierarchy as hie
+
+# Blocks created by this process that have not been unlinked yet
+_owned = {}
+
+
+@atexit.register
+def _unlink_owned():
+    for block in list(_owned.values()):
+        block.unlink()
+
+
+def _attach_shared_memory(name: str) -> shared_memory.SharedMemory:
+    """Attaches to a block of shared memory without tracking it, since only the
+    process that creates it must unlink it."""
+    if sys.version_info >= (3, 13):
+        return shared_memory.SharedMemory(name=name, track=False)
+
+    # Before Python 3.13 the resource tracker of the process would unlink the
+    # block when the process exits
+    register = resource_tracker.register
+    resource_tracker.register = lambda name, rtype: (
+        None if rtype == "shared_memory" else register(name, rtype)
+    )
+    try:
+        return shared_memory.SharedMemory(name=name)
+    finally:
+        resource_tracker.register = register
+
+
+class SharedBlock:
+    """Block of memory that other processes can attach to by its name, either a
+    block of shared memory or, if a path is given, a memory-mapped file. The
+    process that creates the block owns it and unlinks it at exit if it has not
+    done it before.
+
+    :param size: size of the block in bytes, used only when it is created.
+    :type size: int
+
+    :param name: name of the block to attach to, a new one is created if not
+        given.
+    :type name: string
+
+    :param path: path of a file to create and map instead of using shared memory.
+    :type path: string
+
+    :param mapped: whether the name of the block to attach to is the path of a
+        mapped file instead of the name of a block of shared memory.
+    :type mapped: bool
+    """
+
+    def __init__(
+        self,
+        size: int = 0,
+        name: typing.Optional[str] = None,
+        path: typing.Optional[str] = None,
+        mapped: bool = False,
+    ):
+        self.owner = name is None
+        self.mapped = path is not None if self.owner else mapped
+        self._shm = None
+        if self.mapped:
+            self.name = os.path.abspath(path if self.owner else name)
+            mode = "w+" if self.owner else "r+"
+            self.buf = np.memmap(
+                self.name, dtype=np.uint8, mode=mode, shape=size or None
+            )
+        else:
+            if self.owner:
+                self._shm = shared_memory.SharedMemory(create=True, size=max(size, 1))
+            else:
+                self._shm = _attach_shared_memory(name)
+            self.name = self._shm.name
+            self.buf = np.ndarray(self._shm.size, dtype=np.uint8, buffer=self._shm.buf)
+        if self.owner:
+            _owned[self.name] = self
+
+    def close(self):
+        """Detaches the process from the block, the arrays that use it as buffer
+        cannot be used afterwards."""
+        self.buf = None
+        if self._shm is not None:
+            try:
+                self._shm.close()
+            except BufferError:
+                # Some arrays still use the block, it is released with them
+                pass
+
+    def unlink(self):
+        """Destroys the block once every process detaches from it. Only the owner
+        can unlink it."""
+        if not self.owner or _owned.pop(self.name, None) is None:
+            return
+        self.close()
+        try:
+            if self._shm is not None:
+                self._shm.unlink()
+            else:
+                os.remove(self.name)
+        except FileNotFoundError:
+            pass
+
+
+def share_array(
+    array: np.ndarray, path: typing.Optional[str] = None
+) -> typing.Tuple[SharedBlock, tuple]:
+    """Copies an array to a new shared block.
+
+    :param array: array to share.
+    :type array: numpy array
+
+    :param path: path of a file to map instead of using shared memory.
+    :type path: string
+
+    :return: shared block and the name, shape, type and kind of block needed to
+        attach to it.
+    :rtype: tuple
+    """
+    block = SharedBlock(size=array.nbytes, path=path)
+    shared = np.ndarray(array.shape, dtype=array.dtype, buffer=block.buf)
+    shared[...] = array
+    return block, (block.name, array.shape, array.dtype.str, block.mapped)
+
+
+def attach_array(spec: tuple) -> typing.Tuple[SharedBlock, np.ndarray]:
+    """Attaches to a shared array without copying it.
+
+    :param spec: name, shape, type and kind of block of the shared array, as
+        returned by :func:`share_array`.
+    :type spec: tuple
+
+    :return: shared block and the array that uses it as buffer.
+    :rtype: tuple
+    """
+    name, shape, dtype, mapped = spec
+    block = SharedBlock(name=name, mapped=mapped)
+    return block, np.ndarray(shape, dtype=np.dtype(dtype), buffer=block.buf)
+
+
+class SharedDataset:
+    """Quasi-identifiers and sensitive attributes of a table encoded as integer
+    codes, together with their values and the compiled hierarchies, packed in a
+    single shared block. Worker processes attach to it by its name and use the
+    codes without copying them.
+
+    The block starts with the length of the metadata, followed by the pickled
+    metadata (names of the columns, values of the codes and hierarchies) and the
+    matrix of codes, stored column by column.
+
+    Use :meth:`create` to pack a table and :meth:`attach` to open it from another
+    process. Both can be used as context managers: on exit the process detaches
+    from the block and, if it created it, the block is unlinked.
+
+    :param block: shared block with the dataset.
+    :type block: SharedBlock
+    """
+
+    _header = 16
+
+    def __init__(self, block: SharedBlock):
+        self.block = block
+        length = int(block.buf[:8].view(np.int64)[0])
+        metadata = pickle.loads(block.buf[self._header : self._header + length])
+        self.columns = metadata["columns"]
+        self.labels = metadata["labels"]
+        self.hierarchies = metadata["hierarchies"]
+        self.n_records = metadata["n_records"]
+        self.codes = np.ndarray(
+            (self.n_records, len(self.columns)),
+            dtype=np.int32,
+            buffer=block.buf,
+            offset=metadata["offset"],
+            order="F",
+        )
+
+    @classmethod
+    def create(
+        cls,
+        table: pd.DataFrame,
+        qi: typing.Union[typing.List, np.ndarray],
+        sa: typing.Union[typing.List, np.ndarray] = (),
+        hierarchies: typing.Optional[dict] = None,
+        path: typing.Optional[str] = None,
+    ) -> "SharedDataset":
+        """Encodes the quasi-identifiers and sensitive attributes of a table and
+        packs them in a new shared block.
+
+        :param table: dataframe with the data under study.
+        :type table: pandas dataframe
+
+        :param qi: list with the name of the columns of the dataframe.
+            that are quasi-identifiers.
+        :type qi: list of strings
+
+        :param sa: list with the name of the columns of the dataframe.
+            that are sensitive attributes.
+        :type sa: list of strings
+
+        :param hierarchies: hierarchies for generalization of columns.
+        :type hierarchies: dictionary
+
+        :param path: path of a file to map instead of using shared memory.
+        :type path: string
+
+        :return: dataset in the new shared block.
+        :rtype: SharedDataset
+        """
+        columns = list(qi) + [name for name in sa if name not in qi]
+        encoded = enc.EncodedTable(table, columns)
+        metadata = {
+            "columns": columns,
+            "labels": encoded.labels,
+            "hierarchies": hie.compile_hierarchies(hierarchies or {}),
+            "n_records": len(table),
+        }
+        # The offset of the codes depends on the length of the metadata
+        length = len(pickle.dumps(dict(metadata, offset=0)))
+        metadata["offset"] = -(-(cls._header + length + 16) // 8) * 8
+        data = pickle.dumps(metadata)
+        size = metadata["offset"] + 4 * len(table) * len(columns)
+
+        block = SharedBlock(size=size, path=path)
+        try:
+            block.buf[:8].view(np.int64)[0] = len(data)
+            block.buf[cls._header : cls._header + len(data)] = np.frombuffer(
+                data, dtype=np.uint8
+            )
+            dataset = cls(block)
+            for j, name in enumerate(columns):
+                dataset.codes[:, j] = encoded.codes[name]
+        except BaseException:
+            block.unlink()
+            raise
+        return dataset
+
+    @classmethod
+    def attach(cls, name: str, mapped: bool = False) -> "SharedDataset":
+        """Attaches to a dataset packed by another process.
+
+        :param name: name of the shared block, or path of the mapped file.
+        :type name: string
+
+        :param mapped: whether the dataset was packed in a mapped file.
+        :type mapped: bool
+
+        :return: dataset in the shared block.
+        :rtype: SharedDataset
+        """
+        return cls(SharedBlock(name=name, mapped=mapped))
+
+    @property
+    def name(self) -> str:
+        """Name of the shared block."""
+        return self.block.name
+
+    def __len__(self) -> int:
+        return self.n_records
+
+    def __enter__(self) -> "SharedDataset":
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+        self.unlink()
+
+    def column(self, name: str) -> np.ndarray:
+        """Codes of a column, without copying them.
+
+        :param name: Name of the column.
+        :type name: string
+
+        :return: code of each record.
+        :rtype: numpy array
+        """
+        return self.codes[:, self.columns.index(name)]
+
+    def encoded(
+        self, columns: typing.Union[typing.List, np.ndarray, None] = None
+    ) -> enc.EncodedTable:
+        """Encoded table with some columns of the dataset, whose codes are views of
+        the shared block.
+
+        :param columns: list with the name of the columns, all of them by default.
+        :type columns: list of strings
+
+        :return: encoded table.
+        :rtype: EncodedTable
+        """
+        columns = self.columns if columns is None else list(columns)
+        codes = {name: self.column(name) for name in columns}
+        labels = {name: self.labels[name] for name in columns}
+        return enc.EncodedTable.from_codes(codes, labels, self.n_records)
+
+    def close(self):
+        """Detaches the process from the shared block."""
+        self.codes = None
+        self.block.close()
+
+    def unlink(self):
+        """Destroys the shared block if this process created it."""
+        self.block.unlink()
@@ -1,15 +1,20 @@
-import copy
+import concurrent.futures
 import typing
 import numpy as np
 import pandas as pd
+from anonymity.tools.utils_k_anon import hierarchy as hie
 
 
-def clear_white_spaces(table: pd.DataFrame) -> pd.DataFrame:
+def clear_white_spaces(table: pd.DataFrame, copy: bool = True) -> pd.DataFrame:
     """Deletes any white spaces from column names.
 
     :param table:  dataframe with the data under study.
     :type table: pandas dataframe
 
+    :param copy: whether to copy the data or only rename the columns of a new
+        dataframe that shares the data with the original one.
+    :type copy: boolean
+
     :return: table which columns don't contain whitespaces.
     :rtype: pandas dataframe
     """
@@ -20,7 +25,7 @@ def clear_white_spaces(table: pd.DataFrame) -> pd.DataFrame:
     for i in old_column_names:
         new_column_names[i] = i.strip()
 
-    table = table.rename(columns=new_column_names)
+    table = table.rename(columns=new_column_names, copy=copy)
     return table
 
 
@@ -45,8 +50,73 @@ def suppress_identifiers(
     return table
 
 
+def anonymized_table(
+    table: pd.DataFrame,
+    ident: typing.Union[typing.List, np.ndarray],
+    columns: typing.Optional[dict] = None,
+    keep: typing.Optional[np.ndarray] = None,
+) -> pd.DataFrame:
+    """Builds the anonymized table in a single step, without modifying the
+    original one. The identifiers are fully anonymized, the given columns replace
+    the ones of the table and the rest are kept as they are.
+
+    :param table: dataframe with the data under study.
+    :type table: pandas dataframe
+
+    :param ident: list with the name of the columns of the dataframe
+        that are identifiers.
+    :type ident: list of strings
+
+    :param columns: new values of some columns of the table.
+    :type columns: dictionary
+
+    :param keep: True for the records to keep, the rest are suppressed and the
+        index of the table is then moved to a column.
+    :type keep: numpy array
+
+    :return: anonymized table.
+    :rtype: pandas dataframe
+    """
+
+    columns = {} if columns is None else columns
+    if keep is None:
+        data = {}
+        index = table.index
+        n_records = len(table)
+    else:
+        positions = np.flatnonzero(keep)
+        index_columns = pd.DataFrame(index=table.index[positions]).reset_index()
+        data = {name: index_columns[name].values for name in index_columns.columns}
+        index = index_columns.index
+        n_records = len(positions)
+
+    for name in table.columns:
+        if name in ident:
+            data[name] = np.full(n_records, "*", dtype=object)
+            continue
+        column = columns[name] if name in columns else table[name].array
+        data[name] = column if keep is None else column[positions]
+
+    return pd.DataFrame(data, index=index)
+
+
+def count_suppressed(keep: typing.Optional[np.ndarray]) -> int:
+    """Number of records suppressed by the mask given to :func:`anonymized_table`.
+
+    :param keep: True for the records that are kept, None if none is suppressed.
+    :type keep: numpy array
+
+    :return: number of records suppressed.
+    :rtype: int
+    """
+
+    if keep is None:
+        return 0
+    return int(len(keep) - np.count_nonzero(keep))
+
+
 def string_to_interval(
-    column: typing.Union[typing.List, np.ndarray]
+    column: typing.Union[typing.List, np.ndarray],
 ) -> typing.Union[typing.List, np.ndarray]:
     """Converts a string interval to an actual interval type,
     to facilitate the comparison of each data.
@@ -76,115 +146,71 @@ def string_to_interval(
     return column
 
 
-# Devuelve tanto la jerarquia nueva como los rangos creados
-def create_ranges(data, range_step):
-    table = copy.deepcopy(data)
-    new_hie = {}
-    for i in range_step.keys():
-        new_hie[i] = []
-        for j in range(1, len(range_step[i])):
-            aux = range_step[i][j]
-            # Generalization of numbers
-            if (
-                isinstance(table[i][0], int)
-                or isinstance(table[i][0], np.int64)
-                or isinstance(table[i][0], float)
-                or isinstance(table[i][0], complex)
-            ):
-                min_range = np.inf
-                max_range = 0
-
-                for k in set(table[i]):
-                    new_hie[i].append([k])
-
-                for k in table[i]:
-                    if k > max_range:
-                        max_range = k
-
-                    if k < min_range:
-                        min_range = k
-
-                while min_range % aux != 0 or max_range % aux != 0:
-                    if min_range % aux != 0:
-                        min_range = min_range - 1
-
-                    if max_range % aux != 0:
-                        max_range = max_range + 1
-
-                step = int((max_range - min_range) / aux)
-                ranges = []
-
-                for k in range(0, step):
-                    ranges.append(
-                        pd.Interval(
-                            left=(min_range + aux * k),
-                            right=(min_range + aux * (k + 1)),
-                            closed="left",
-                        )
-                    )
-
-                new_col = []
-
-                for m in range(0, len(new_hie[i])):
-                    for n in ranges:
-                        if new_hie[i][m][0] in n:
-                            new_hie[i][m].append(str(n))
-                            break
-
-                for m in range(0, len(table[i])):
-                    for n in ranges:
-                        if table[i][m] in n:
-                            new_col.append(str(n))
-                            break
-
-                table[i] = new_col
-
-            # Generalization of ranges
-            else:
-                min_range = np.inf
-                max_range = 0
-                column = string_to_interval(table[i])
-
-                for m in column:
-                    if m.left > max_range:
-                        max_range = m.right
-
-                    if m.left < min_range:
-                        min_range = m.left
-
-                while min_range % aux != 0 or max_range % aux != 0:
-                    if min_range % aux != 0:
-                        min_range = min_range - 1
-                    if max_range % aux != 0:
-                        max_range = max_range + 1
-
-                step = int((max_range - min_range) / aux)
-                ranges = []
-                for m in range(0, step):
-                    ranges.append(
-                        pd.Interval(
-                            left=(min_range + aux * m),
-                            right=(min_range + aux * (m + 1)),
-                            closed="left",
-                        )
-                    )
-
-                for m in range(0, len(new_hie[i])):
-                    for n in ranges:
-                        if new_hie[i][m][0] in n:
-                            new_hie[i][m].append(str(n))
-                            break
-
-                new_col = []
-                for m in range(0, len(column)):
-                    for n in ranges:
-                        if column[m].left in n:
-                            new_col.append(str(n))
-                            break
-
-                table[i] = new_col
-
-        return new_hie
+def range_hierarchy(
+    column: typing.Union[typing.List, np.ndarray],
+    steps: typing.Union[typing.List, np.ndarray],
+) -> typing.List[typing.List]:
+    """Creates the hierarchy of a numeric column, where each level groups the
+    values in intervals of the given width aligned to its multiples.
+
+    :param column: numeric column, or column of ranges as strings like "[a, b)",
+        which are placed by their left bound.
+    :type column: list of values
+
+    :param steps: width of the intervals of each level, the first one is ignored
+        since the level 0 is the column itself.
+    :type steps: list of numbers
+
+    :return: rows of the hierarchy, one for each distinct value of the column.
+    :rtype: list of lists
+    """
+
+    values = pd.unique(np.asarray(column))
+    values = values[~pd.isna(values)]
+    if pd.api.types.is_numeric_dtype(values):
+        keys = values.astype(np.float64)
+    else:
+        keys = hie.parse_intervals(values)[0]
+    integer = all(float(step).is_integer() for step in steps) and bool(
+        np.all(np.mod(keys, 1) == 0)
+    )
+
+    levels = [values.astype(object)]
+    for step in steps[1:]:
+        left, inverse = np.unique(np.floor(keys / step) * step, return_inverse=True)
+        if integer:
+            labels = [f"[{int(a)}, {int(a + step)})" for a in left]
+        else:
+            labels = [f"[{a}, {a + step})" for a in left]
+        levels.append(np.asarray(labels, dtype=object)[inverse.reshape(-1)])
+
+    return np.column_stack(levels).tolist()
+
+
+def create_ranges(data: pd.DataFrame, range_step: dict, n_jobs: int = 1) -> dict:
+    """Creates the hierarchies of the numeric columns of a table, grouping their
+    values in intervals.
+
+    :param data: dataframe with the data under study.
+    :type data: pandas dataframe
+
+    :param range_step: width of the intervals of each level of each column,
+        starting with the level 0, for example {"age": [0, 5, 10]}.
+    :type range_step: dictionary
+
+    :param n_jobs: number of columns processed in parallel.
+    :type n_jobs: int
+
+    :return: hierarchy of each column.
+    :rtype: dictionary
+    """
+
+    names = list(range_step.keys())
+    with concurrent.futures.ThreadPoolExecutor(max_workers=max(n_jobs, 1)) as pool:
+        hierarchies = pool.map(
+            lambda name: range_hierarchy(data[name].values, range_step[name]), names
+        )
+        return dict(zip(names, hierarchies))
 
 
 def generalization(
@@ -193,7 +219,8 @@ def generalization(
     gen_level: int,
     name: str,
 ) -> typing.Union[typing.List, np.ndarray, None]:
-    """Generalizes a column based on its data type.
+    """Generalizes a column based on its data type, from its values without
+    generalization straight to the given level.
 
     :param column: column from the table under study that needs to be generalized.
     :type column: list of values
@@ -207,7 +234,8 @@ def generalization(
     :param name: Name of the column that needs to be generalized.
     :type name: string
 
-    :return: List of generalized values.
+    :return: List of generalized values, a categorical of the labels of the
+        intervals for numbers and ranges.
     :rtype: list of values
     """
 
@@ -220,49 +248,20 @@ def generalization(
         else:
             return None
 
-    # Generalization of numbers
-    if isinstance(column[0], (int, float, complex, np.int64)):
-        # print("INT")
-        aux_col = []
-        for i in range(0, len(aux)):
-            aux_col.append(aux[i][gen_level])
-
-        ranges = string_to_interval(aux_col)
-        new_col = []
-
-        for i in range(len(column)):
-            for j in ranges:
-                if column[i] in j:
-                    new_col.append(str(j))
-                    break
+    if not isinstance(aux, hie.Hierarchy):
+        aux = hie.Hierarchy(aux)
 
-        column = new_col
+    # Generalization of numbers and ranges, with a binary search over the bin edges
+    # of the level
+    if gen_level in aux.edges and (
+        isinstance(column[0], (int, float, complex, np.integer, np.floating))
+        or "[" in str(column[0])
+    ):
+        codes = aux.interval_codes(column, gen_level)
+        column = pd.Categorical.from_codes(codes, categories=aux.labels[gen_level])
 
     # Generalization of strings
-    elif isinstance(column[0], str) and "[" not in column[0]:
-        # print("STRING")
-        for i in range(len(column)):
-            for j in range(len(aux)):
-                if aux[j][gen_level - 1] == column[i]:
-                    column[i] = aux[j][gen_level]
-                    break
-
-    # Generalization of ranges
     else:
-        column = string_to_interval(column)
-        aux_col = []
-        for i in range(len(aux)):
-            aux_col.append(aux[i][gen_level])
-
-        ranges = string_to_interval(aux_col)
-
-        new_col = []
-        for i in range(len(column)):
-            for j in ranges:
-                if column[i].left in j:
-                    new_col.append(str(j))
-                    break
-
-        column = new_col
+        column[:] = list(aux.generalize(column, gen_level))
 
     return column
@@ -1,12 +1,24 @@
+import concurrent.futures
+import os
+import tempfile
 import unittest
+import numpy as np
 import pandas as pd
-import pycanon
+import pycanon.anonymity
 from anonymity import tools
+from anonymity.tools import Anonymizer, Hierarchy, SharedDataset
+from anonymity.metrics import efficiency_metrics
 from anonymity.metrics.data_utility_metrics import (
     generalized_information_loss,
     discernibility,
     avr_equiv_class_size,
 )
+from anonymity.tools import _k_anonymity, _l_diversity, _partitioned
+from anonymity.tools.utils_k_anon import encoding, frequency_set
+from anonymity.tools.utils_k_anon import generalization_cache
+from anonymity.tools.utils_k_anon.hierarchy import compile_hierarchies
+from anonymity.tools.utils_k_anon.lattice import Lattice
+from anonymity.tools.utils_k_anon.equivalence_class import EquivalenceClassIndex
 from anonymity.tools.utils_k_anon import utils_k_anonymity as utils
 
 
@@ -258,6 +270,906 @@ class UnitTest(unittest.TestCase):
         )
         assert k <= pycanon.anonymity.k_anonymity(new_data, self.QI)
 
+    """ Tests the frequency set roll-up used by incognito. Ensure that rolling up the frequency set of the
+        original table gives the same frequency set as generalizing the whole table.
+    """
+
+    def test_frequency_set_roll_up(self):
+        table = self.data.copy()
+        encoded = encoding.EncodedTable(table, self.QI)
+        freq_set = frequency_set.get_frequency_set(encoded, self.QI)
+        for name in ["marital stat", "age"]:
+            maps, labels = encoding.level_maps(
+                encoded.labels[name], self.mix_hierarchy, name
+            )
+            freq_set = frequency_set.roll_up(freq_set, name, maps[1])
+            table[name] = labels[1][maps[1][encoded.codes[name]]]
+
+        expected = frequency_set.get_frequency_set(
+            encoding.EncodedTable(table, self.QI), self.QI
+        )
+        assert sorted(freq_set.counts) == sorted(expected.counts)
+        assert freq_set.min() == pycanon.anonymity.k_anonymity(table, self.QI)
+
+    """ Tests the frequency set of an empty table. Ensure that rolling it up between levels gives an empty
+        frequency set and that the algorithms return an empty table.
+    """
+
+    def test_empty_frequency_set(self):
+        empty = self.data.iloc[:0]
+        encoded = encoding.EncodedTable(empty, self.QI)
+        freq_set = frequency_set.get_frequency_set(encoded, self.QI)
+        maps, _ = encoding.level_maps(
+            encoded.labels["ZIP code"], self.mix_hierarchy, "ZIP code"
+        )
+        mapping = encoding.map_levels(maps, 2, 1)
+        assert len(mapping) == 0
+        freq_set = frequency_set.roll_up(freq_set, "ZIP code", mapping)
+        assert len(freq_set.counts) == 0
+        for method in (tools.data_fly, tools.incognito):
+            new_data = method(empty, self.ID, self.QI, 2, 0, self.mix_hierarchy)
+            assert len(new_data) == 0 and list(new_data.columns) == list(empty.columns)
+
+    """ Tests the histograms of the sensitive attributes kept in the frequency set. Ensure that, with several
+        sensitive attributes of many values, the size of the frequency set of each node depends on its
+        classes and not on the combinations of sensitive values, and that l-diversity is computed from it.
+    """
+
+    def test_frequency_set_histograms(self):
+        rng = np.random.default_rng(0)
+        n, n_values = 2000, 50
+        sa = ["sa1", "sa2", "sa3"]
+        data = pd.DataFrame({"zip": rng.integers(0, 8, n)})
+        for name in sa:
+            data[name] = rng.integers(0, n_values, n)
+        encoded = encoding.EncodedTable(data, ["zip"] + sa)
+        freq_set = frequency_set.get_frequency_set(encoded, ["zip"], sa)
+        joint = frequency_set.get_frequency_set(encoded, ["zip"] + sa)
+        assert freq_set.names == ["zip"] and len(joint.counts) > n / 2
+        for mapping in (np.arange(8) // 2, np.zeros(4, dtype=np.int32)):
+            freq_set = frequency_set.roll_up(freq_set, "zip", mapping)
+            n_classes = len(freq_set.counts)
+            size = n_classes + sum(
+                len(histogram.counts) for histogram in freq_set.histograms.values()
+            )
+            assert size <= n_classes * (1 + n_values * len(sa))
+            assert all(
+                histogram.counts.sum() == n
+                for histogram in freq_set.histograms.values()
+            )
+        diversity = frequency_set.Diversity(sa, 1)
+        sizes, kept = frequency_set.kept_classes(freq_set, 2, diversity)
+        assert list(sizes) == [n] and kept.all()
+        l_value = min(data[name].nunique() for name in sa)
+        assert frequency_set.is_k_anonymous(
+            freq_set, 2, 0, frequency_set.Diversity(sa, l_value)
+        )
+        assert not frequency_set.is_k_anonymous(
+            freq_set, 2, 0, frequency_set.Diversity(sa, l_value + 1)
+        )
+
+    """ Tests the compiled hierarchies. Ensure that generalizing through the level arrays gives the values
+        of the hierarchy and that they are accepted in place of the hierarchies given as lists.
+    """
+
+    def test_compiled_hierarchy(self):
+        hierarchy = Hierarchy(self.hierarchy["ZIP code"])
+        assert list(hierarchy.cardinalities) == [6, 2, 1]
+        leaves = hierarchy.codes(self.data["ZIP code"])
+        generalized = hierarchy.labels[1][np.take(hierarchy.levels[1], leaves)]
+        assert list(generalized) == [
+            "3204*",
+            "3202*",
+            "3202*",
+            "3204*",
+            "3204*",
+            "3202*",
+        ]
+
+        compiled = {name: Hierarchy(hie) for name, hie in self.mix_hierarchy.items()}
+        for method in ["incognito", "datafly"]:
+            expected = tools.k_anonymity(
+                self.data.copy(), self.ID, self.QI, 2, 0, self.mix_hierarchy, method
+            )
+            new_data = tools.k_anonymity(
+                self.data.copy(), self.ID, self.QI, 2, 0, compiled, method
+            )
+            assert new_data.equals(expected)
+
+    """ Tests the generalization of numeric columns over the bin edges of the hierarchy. Ensure that numbers,
+        also the ones missing from the hierarchy, and ranges fall in the intervals that contain them.
+    """
+
+    def test_numeric_generalization(self):
+        ages = pd.Series([29, 20, 24, 21, 25, 23])
+        new_col = utils.generalization(ages, self.mix_hierarchy, 2, "age")
+        assert isinstance(new_col, pd.Categorical)
+        assert list(new_col) == [
+            "[25, 30)",
+            "[20, 25)",
+            "[20, 25)",
+            "[20, 25)",
+            "[25, 30)",
+            "[20, 25)",
+        ]
+        ranges = pd.Series(["[28, 30)", "[20, 22)"])
+        new_col = utils.generalization(ranges, self.mix_hierarchy, 3, "age")
+        assert list(new_col) == ["[20, 30)", "[20, 30)"]
+
+    """ Tests the generalization of string columns. Ensure that the values without generalization go straight
+        to any level of the hierarchy.
+    """
+
+    def test_string_generalization(self):
+        zips = pd.Series(["32042", "32021"], dtype=object)
+        new_col = utils.generalization(zips.copy(), self.mix_hierarchy, 2, "ZIP code")
+        assert list(new_col) == ["*", "*"]
+        new_data = _k_anonymity.generalize(self.data, [2, 1, 3], self.mix_hierarchy)
+        assert (new_data["marital stat"] == "*").all()
+        assert list(new_data["ZIP code"]) == [
+            "3204*",
+            "3202*",
+            "3202*",
+            "3204*",
+            "3204*",
+            "3202*",
+        ]
+        assert (new_data["age"] == "[20, 30)").all()
+
+    """ Tests the creation of the hierarchies of numeric columns. Ensure that every configured column gets a
+        hierarchy with one row for each distinct value and that the table is not modified.
+    """
+
+    def test_create_ranges(self):
+        table = self.data.copy()
+        table["score"] = [1.5, 2.25, 3.0, 4.0, 5.0, 6.0]
+        hierarchies = utils.create_ranges(
+            table, {"age": [0, 2, 5, 10], "score": [0, 2]}, n_jobs=2
+        )
+        assert sorted(hierarchies.keys()) == ["age", "score"]
+        assert [29, "[28, 30)", "[25, 30)", "[20, 30)"] in hierarchies["age"]
+        assert [1.5, "[0.0, 2.0)"] in hierarchies["score"]
+        assert len(hierarchies["age"]) == 6
+        assert table.equals(self.data.assign(score=table["score"]))
+
+    """ Tests the equivalence class index. Ensure that k, l and t obtained from a single grouping of the
+        quasi-identifiers are equal to the ones computed by pycanon.
+    """
+
+    def test_equivalence_class_index(self):
+        new_data = tools.incognito(
+            self.data, self.ID, self.QI, 2, 0, self.mix_hierarchy
+        )
+        index = EquivalenceClassIndex(new_data, self.QI, self.SA + ["age"])
+        assert index.k() == pycanon.anonymity.k_anonymity(new_data, self.QI)
+        assert index.l_value(self.SA) == pycanon.anonymity.l_diversity(
+            new_data, self.QI, self.SA
+        )
+        assert np.isclose(
+            index.t(self.SA), pycanon.anonymity.t_closeness(new_data, self.QI, self.SA)
+        )
+        assert sum(index.suppression_mask(3)) == sum(
+            len(ec) for ec in index.classes() if len(ec) < 3
+        )
+
+    """ Tests the suppression of records. Ensure that data-fly and incognito return the number of records
+        suppressed within the budget, and that the result verifies k-anonymity.
+    """
+
+    def test_suppress_records(self):
+        k = 2
+        table = pd.DataFrame(
+            {"a": ["x", "x", "y", "y", "z", "w"], "b": [1, 1, 2, 2, 2, 3]}
+        )
+        for method in (tools.data_fly, tools.incognito):
+            new_data, n_suppressed = method(
+                table, [], ["a", "b"], k, 2, {}, return_suppressed=True
+            )
+            assert n_suppressed == len(table) - len(new_data) == 2
+            assert k <= pycanon.anonymity.k_anonymity(new_data, ["a", "b"])
+            new_data, n_suppressed = method(
+                self.data,
+                self.ID,
+                self.QI,
+                3,
+                0,
+                self.mix_hierarchy,
+                return_suppressed=True,
+            )
+            assert n_suppressed == 0 and len(new_data) == len(self.data)
+
+    """ Tests that the k-anonymity algorithms build a new table. Ensure that the input table is not modified.
+    """
+
+    def test_input_not_modified(self):
+        data = self.data.copy()
+        for method in [tools.data_fly, tools.incognito, tools.flash, tools.samarati]:
+            new_data = method(data, self.ID, self.QI, 3, 2, self.mix_hierarchy)
+            assert data.equals(self.data)
+            assert (new_data[self.ID] == "*").all(axis=None)
+        new_data = tools.mondrian(data, self.ID, self.QI, 3, self.hierarchy)
+        assert data.equals(self.data)
+        assert (new_data[self.ID] == "*").all(axis=None)
+        with self.assertRaises(ValueError):
+            tools.k_anonymity(data, self.ID, self.QI, 3, 2, self.hierarchy, "mondrian")
+
+    """ Tests the cache of generalized columns of a search. Ensure that generalizing the same table again reuses
+        the columns, which match the hierarchy, and that the least recently used ones are evicted beyond the
+        budget of bytes.
+    """
+
+    def test_generalization_cache(self):
+        cache = generalization_cache.GeneralizationCache()
+        data = self.data.copy()
+        fingerprints = {}
+        first = _k_anonymity.generalize(
+            data, (2, 1, 2), self.mix_hierarchy, fingerprints, cache
+        )
+        assert data.equals(self.data) and len(fingerprints) == 3
+        misses = cache.misses
+        second = _k_anonymity.generalize(
+            data, (2, 1, 2), self.mix_hierarchy, fingerprints, cache
+        )
+        assert first.equals(second)
+        assert cache.misses == misses and cache.hits == 3
+        hierarchy = Hierarchy(self.hierarchy["marital stat"])
+        assert list(second["marital stat"]) == list(
+            hierarchy.generalize(self.data["marital stat"], 2)
+        )
+        assert (second["marital stat"] == "*").all()
+        first["age"].values[0] = "*"
+        assert not first.equals(second)
+
+        small = generalization_cache.GeneralizationCache(max_bytes=32)
+        small.put("a", np.zeros(2))
+        small.put("b", np.zeros(2))
+        assert small.get("a") is not None
+        small.put("c", np.zeros(2))
+        assert "a" in small and "b" not in small and small.nbytes == 32
+
+    """ Tests the lattice with the nodes encoded as integers. Ensure that the levels, successors, predecessors
+        and visited nodes are consistent with the ones of the nodes as tuples.
+    """
+
+    def test_lattice(self):
+        lattice = Lattice([2, 0, 3])
+        assert len(lattice) == 12 and lattice.top == lattice.encode([2, 0, 3])
+        assert lattice.node(lattice.encode((1, 0, 2))) == (1, 0, 2)
+        successors = lattice.successors(lattice.encode((1, 0, 2)))
+        assert sorted(map(lattice.node, successors)) == [(1, 0, 3), (2, 0, 2)]
+        assert list(map(lattice.node, lattice.predecessors(lattice.bottom))) == []
+        assert len(lattice.nodes(3)) == 3
+        assert len(lattice.generalizations(lattice.encode((1, 0, 1)))) == 6
+        lattice.visit([3, 9])
+        assert list(lattice.visited([3, 4, 9])) == [True, False, True]
+
+    """ Tests the incognito function evaluating the nodes of the lattice in several processes. Ensure that the
+        result and the number of nodes evaluated are the same as with a single process, also with l-diversity.
+    """
+
+    def test_incognito_n_jobs(self):
+        new_data = tools.incognito(
+            self.data, self.ID, self.QI, 2, 0, self.mix_hierarchy
+        )
+        n_nodes = efficiency_metrics.NUM_INCOGNITO
+        parallel_data = tools.k_anonymity(
+            self.data, self.ID, self.QI, 2, 0, self.mix_hierarchy, "incognito", n_jobs=2
+        )
+        assert parallel_data.equals(new_data)
+        assert efficiency_metrics.NUM_INCOGNITO == n_nodes
+        diversity = frequency_set.Diversity(self.SA, 3)
+        new_data = tools.incognito(
+            self.data, self.ID, self.QI, 2, 1, self.mix_hierarchy, diversity=diversity
+        )
+        parallel_data = tools.incognito(
+            self.data,
+            self.ID,
+            self.QI,
+            2,
+            1,
+            self.mix_hierarchy,
+            2,
+            diversity=diversity,
+        )
+        assert parallel_data.equals(new_data)
+
+    """ Tests the partitioned k-anonymity. Ensure that anonymizing the table split in partitions, with a pool
+        of threads as transport, gives the same table as anonymizing the whole one, that the tasks only
+        receive the rows of their partition, that values not seen when the generalization was chosen raise
+        an error, and that the kept classes are found with packed codes and with a hash index.
+    """
+
+    def test_k_anonymity_partitioned(self):
+        n = len(self.data) // 2
+        partitions = [(self.data, 0, n), (self.data, n, None)]
+        sent = []
+
+        class Transport(concurrent.futures.ThreadPoolExecutor):
+            def map(self, fn, *iterables):
+                iterables = [list(iterable) for iterable in iterables]
+                sent.extend(iterables[0])
+                return super().map(fn, *iterables)
+
+        for method, supp_threshold in (("incognito", 0), ("datafly", 2)):
+            new_data = tools.k_anonymity(
+                self.data,
+                self.ID,
+                self.QI,
+                2,
+                supp_threshold,
+                self.mix_hierarchy,
+                method,
+            )
+            with Transport(max_workers=2) as transport:
+                parts = tools.k_anonymity_partitioned(
+                    partitions,
+                    self.ID,
+                    self.QI,
+                    2,
+                    supp_threshold,
+                    self.mix_hierarchy,
+                    method,
+                    transport=transport,
+                )
+            part_data = pd.concat(parts, ignore_index=True)
+            assert part_data.equals(new_data.reset_index(drop=True))
+        assert all(isinstance(partition, pd.DataFrame) for partition in sent)
+        assert [len(partition) for partition in sent] == [n, len(self.data) - n] * 4
+
+        base, values = _partitioned.merge_frequency_sets(
+            [_partitioned.partition_frequency_set(self.data, self.QI)], self.QI
+        )
+        hierarchies = compile_hierarchies(self.mix_hierarchy)
+        _, generalization, suppressed = _partitioned.choose_generalization(
+            base, values, self.QI, 2, 2, hierarchies, "datafly"
+        )
+        kept = _partitioned.KeptClasses.from_frequency_set(
+            suppressed, generalization, 2
+        )
+        unseen = self.data.assign(age=self.data["age"] + 100)
+        with self.assertRaises(ValueError):
+            _partitioned.anonymize_partition(
+                unseen, self.ID, self.QI, generalization, kept
+            )
+
+        # Lookup of the kept classes, with packed codes and with a hash index
+        codes = np.array([[0, 1], [2, 0], [1, 1]], dtype=np.int32)
+        records = np.array([[1, 1], [0, 0], [2, 0], [0, 1], [2, 1]], dtype=np.int32)
+        expected = [True, False, True, True, False]
+        for radices in ([3, 2], [2**40, 2**40]):
+            kept = _partitioned.KeptClasses(codes, radices)
+            assert (kept.keys is None) == (radices[0] > 3)
+            assert list(kept.contains(records)) == expected
+        empty = _partitioned.KeptClasses(codes[:0], [3, 2])
+        assert not empty.contains(records).any()
+
+    """ Tests the chunked k-anonymity of a file. Ensure that reading and writing the file in chunks gives the
+        same table as anonymizing the whole dataframe, and that the frequency sets of the chunks are merged
+        with the same code for the same value, also for the missing ones.
+    """
+
+    def test_k_anonymity_chunked(self):
+        with tempfile.TemporaryDirectory() as path:
+            input_path = os.path.join(path, "data.csv")
+            output_path = os.path.join(path, "anonymized.csv")
+            self.data.to_csv(input_path, index=False)
+            for method, supp_threshold in (("incognito", 1), ("datafly", 2)):
+                new_data = tools.k_anonymity(
+                    self.data,
+                    self.ID,
+                    self.QI,
+                    2,
+                    supp_threshold,
+                    self.mix_hierarchy,
+                    method,
+                )
+                tools.k_anonymity_chunked(
+                    input_path,
+                    output_path,
+                    self.ID,
+                    self.QI,
+                    2,
+                    supp_threshold,
+                    self.mix_hierarchy,
+                    method,
+                    chunksize=4,
+                    dtype={"ZIP code": str},
+                )
+                chunked_data = pd.read_csv(output_path, dtype=str)
+                assert chunked_data.equals(new_data.reset_index(drop=True).astype(str))
+
+        freq_set = _partitioned.ChunkedFrequencySet(self.QI)
+        for start in range(0, len(self.data), 4):
+            freq_set.add(self.data[start : start + 4])
+        freq_set.add(self.data[:2])
+        base, values = freq_set.frequency_set()
+        assert base.counts.sum() == len(self.data) + 2
+        chunked = _partitioned.frequency_values(base, values)["values"]
+        records = pd.concat([self.data, self.data[:2]])[self.QI]
+        for i, count in enumerate(base.counts):
+            values = [chunked[name][i] for name in self.QI]
+            assert records.eq(values).all(axis=1).sum() == count
+
+        # Missing values of different chunks share their code
+        missing = self.data.assign(age=[np.nan, 20, np.nan, 28, np.nan, 23])
+        freq_set = _partitioned.ChunkedFrequencySet(["age"])
+        for start in range(0, len(missing), 2):
+            freq_set.add(missing[start : start + 2])
+        base, values = freq_set.frequency_set()
+        assert len(values["age"]) == 4 and pd.isna(values["age"]).sum() == 1
+        missing_rows = pd.isna(values["age"][base.codes[:, 0]])
+        assert list(base.counts[missing_rows]) == [3] and base.counts.sum() == 6
+
+    """ Tests the diversities of the equivalence classes. Ensure that they are returned as an array whose
+        minimum is the l given by pycanon, and that the values of each class are only built on request.
+    """
+
+    def test_get_diversities(self):
+        new_data = tools.incognito(
+            self.data, self.ID, self.QI, 2, 0, self.mix_hierarchy
+        )
+        diversities = _l_diversity.get_diversities(new_data, self.SA, self.QI)
+        assert isinstance(diversities, np.ndarray)
+        assert diversities.min() == pycanon.anonymity.l_diversity(
+            new_data, self.QI, self.SA
+        )
+        equiv_sa, result = _l_diversity.get_diversities(
+            new_data, self.SA, self.QI, equiv_sa=True
+        )
+        assert list(result) == list(diversities)
+        assert [len(np.unique(values)) for values in equiv_sa] == list(diversities)
+
+    """ Tests the entropy and recursive (c,l)-diversity variants. Ensure that the entropy l matches pycanon,
+        that the recursive l follows its definition and that l_diversity reaches the l of the variant.
+    """
+
+    def test_l_diversity_variants(self):
+        table = pd.DataFrame(
+            {"qi": ["a"] * 6 + ["b"] * 2, "sa": list("xxxyyzxx")},
+        )
+        index = EquivalenceClassIndex(table, ["qi"], ["sa"])
+        assert np.isclose(
+            index.diversities("sa", "entropy")[0],
+            np.exp(-sum(p * np.log(p) for p in (1 / 2, 1 / 3, 1 / 6))),
+        )
+        assert index.diversities("sa", "entropy")[1] == 1
+        assert list(index.diversities("sa", "recursive", 2)) == [2, 1]
+        assert list(index.diversities("sa", "recursive", 4)) == [3, 1]
+        with self.assertRaises(ValueError):
+            index.diversities("sa", "unknown")
+
+        new_data = tools.l_diversity(
+            self.data,
+            self.SA,
+            self.QI,
+            "incognito",
+            2,
+            self.ID,
+            0,
+            self.mix_hierarchy,
+            2,
+            variant="entropy",
+        )
+        assert new_data[2]
+        assert new_data[0] == EquivalenceClassIndex(
+            new_data[1], self.QI, self.SA
+        ).l_value(variant="entropy")
+        assert int(new_data[0]) == pycanon.anonymity.entropy_l_diversity(
+            new_data[1], self.QI, self.SA
+        )
+        new_data = tools.l_diversity(
+            self.data,
+            self.SA,
+            self.QI,
+            "incognito",
+            2,
+            self.ID,
+            0,
+            self.mix_hierarchy,
+            2,
+            variant="recursive",
+            c=2,
+        )
+        assert new_data[2] and new_data[0] >= 2
+
+    """ Tests the l-diversity checked inside the search. Ensure that a single search of incognito and data-fly
+        gives a table that satisfies both k-anonymity and l-diversity, and that l_diversity returns it.
+    """
+
+    def test_search_l_diversity(self):
+        diversity = frequency_set.Diversity(self.SA, 3)
+        for method in ("incognito", "data_fly"):
+            if method == "incognito":
+                new_data = tools.incognito(
+                    self.data,
+                    self.ID,
+                    self.QI,
+                    2,
+                    0,
+                    self.mix_hierarchy,
+                    diversity=diversity,
+                )
+            else:
+                new_data = tools.data_fly(
+                    self.data, self.ID, self.QI, 2, 0, self.mix_hierarchy, diversity
+                )
+            assert pycanon.anonymity.k_anonymity(new_data, self.QI) >= 2
+            assert pycanon.anonymity.l_diversity(new_data, self.QI, self.SA) >= 3
+            result = tools.l_diversity(
+                self.data,
+                self.SA,
+                self.QI,
+                method,
+                3,
+                self.ID,
+                0,
+                self.mix_hierarchy,
+                2,
+            )
+            assert result[2] and result[1].equals(new_data)
+
+    """ Tests the options shared by the searches of k_anonymity. Ensure that every method checks
+        l-diversity and returns the number of records suppressed, and that mondrian rejects l-diversity.
+    """
+
+    def test_k_anonymity_options(self):
+        diversity = frequency_set.Diversity(self.SA, 3)
+        for method in ("incognito", "flash", "samarati", "datafly"):
+            new_data, n = tools.k_anonymity(
+                self.data,
+                self.ID,
+                self.QI,
+                2,
+                0.5,
+                self.mix_hierarchy,
+                method,
+                diversity=diversity,
+                return_suppressed=True,
+            )
+            assert n == len(self.data) - len(new_data)
+            assert pycanon.anonymity.k_anonymity(new_data, self.QI) >= 2
+            assert pycanon.anonymity.l_diversity(new_data, self.QI, self.SA) >= 3
+        new_data, n = tools.k_anonymity(
+            self.data,
+            self.ID,
+            self.QI,
+            2,
+            0,
+            self.mix_hierarchy,
+            "mondrian",
+            return_suppressed=True,
+        )
+        assert n == 0 and len(new_data) == len(self.data)
+        with self.assertRaises(ValueError):
+            tools.k_anonymity(
+                self.data,
+                self.ID,
+                self.QI,
+                2,
+                0,
+                self.mix_hierarchy,
+                "mondrian",
+                diversity=diversity,
+            )
+
+    """ Tests incognito and data-fly with the quasi-identifiers given as an array. Ensure that they give
+        the same table as with a list, also when l-diversity is checked inside the search.
+    """
+
+    def test_search_qi_array(self):
+        qi = np.array(self.QI)
+        for diversity in (None, frequency_set.Diversity(self.SA, 3)):
+            for method in (tools.incognito, tools.data_fly):
+                expected = method(
+                    self.data,
+                    self.ID,
+                    self.QI,
+                    2,
+                    0,
+                    self.mix_hierarchy,
+                    diversity=diversity,
+                )
+                new_data = method(
+                    self.data,
+                    self.ID,
+                    qi,
+                    2,
+                    0,
+                    self.mix_hierarchy,
+                    diversity=diversity,
+                )
+                assert new_data.equals(expected)
+
+    """ Tests the l-diversity of several sensitive attributes in a single search. Ensure that every
+        equivalence class is l-diverse for all of them.
+    """
+
+    def test_l_diversity_joint_sa(self):
+        data = self.data.assign(
+            disease=["Flu", "Cold", "Flu", "Asthma", "Cold", "Asthma"]
+        )
+        sa = self.SA + ["disease"]
+        result = tools.l_diversity(
+            data,
+            sa,
+            self.QI,
+            "incognito",
+            2,
+            self.ID,
+            0,
+            self.mix_hierarchy,
+            2,
+            joint_sa=True,
+        )
+        assert result[2]
+        assert pycanon.anonymity.k_anonymity(result[1], self.QI) >= 2
+        for name in sa:
+            assert pycanon.anonymity.l_diversity(result[1], self.QI, [name]) >= 2
+        assert result[0] == EquivalenceClassIndex(result[1], self.QI, sa).l_value()
+
+    """ Tests l-diversity with suppression. Ensure that the classes that are not l-diverse are suppressed whole,
+        and that the table is returned as it is when they exceed the percentage of records allowed.
+    """
+
+    def test_l_diversity_supp(self):
+        data = pd.DataFrame(
+            {
+                "zip": ["1"] * 4 + ["2"] * 2 + ["3"] * 3,
+                "disease": ["a", "b", "c", "a", "a", "a", "b", "b", "b"],
+            }
+        )
+        new_data, n = _l_diversity.apply_l_diversity_supp(
+            data, ["disease"], ["zip"], 2, 25
+        )
+        assert n == 0 and new_data is data
+        new_data, n = _l_diversity.apply_l_diversity_supp(
+            data, ["disease"], ["zip"], 2, 60
+        )
+        assert n == 5
+        assert pycanon.anonymity.l_diversity(new_data, ["zip"], ["disease"]) >= 2
+        new_data, n = _l_diversity.apply_l_diversity_supp(
+            data, ["disease"], ["zip"], 2, 10
+        )
+        assert n == 0 and new_data is data
+
+    """ Tests the anonymizer. Ensure that the fitted plan gives the same table as the k_anonymity function,
+        also after saving and loading it, and when it is applied to chunks of the table.
+    """
+
+    def test_anonymizer(self):
+        for method, supp_threshold in (("incognito", 2), ("datafly", 0)):
+            new_data = tools.k_anonymity(
+                self.data,
+                self.ID,
+                self.QI,
+                2,
+                supp_threshold,
+                self.mix_hierarchy,
+                method,
+            )
+            anonymizer = Anonymizer(
+                self.ID, self.QI, 2, supp_threshold, self.mix_hierarchy, method
+            )
+            assert anonymizer.fit_transform(self.data).equals(new_data)
+            with tempfile.TemporaryDirectory() as path:
+                anonymizer.save(os.path.join(path, "plan.json"))
+                anonymizer = Anonymizer.load(os.path.join(path, "plan.json"))
+            assert anonymizer.transform(self.data).equals(new_data)
+            chunks = anonymizer.transform([self.data[:3], self.data[3:]])
+            assert pd.concat(chunks, ignore_index=True).equals(
+                new_data.reset_index(drop=True)
+            )
+        with self.assertRaises(ValueError):
+            Anonymizer(self.ID, self.QI, 2, 0, self.mix_hierarchy).transform(self.data)
+
+    """ Tests the anonymizer on a table whose distribution has drifted. Ensure that the number of records
+        suppressed is reported, also beyond the budget of the fitted plan, that a table and its chunks are
+        transformed alike, and that the records with values out of the hierarchies are suppressed.
+    """
+
+    def test_anonymizer_drift(self):
+        anonymizer = Anonymizer(self.ID, self.QI, 2, 2, self.mix_hierarchy)
+        anonymizer.fit(self.data)
+        new_data = anonymizer.transform(self.data)
+        assert anonymizer.n_suppressed == len(self.data) - len(new_data) == 2
+        drifted = self.data.assign(
+            **{
+                "marital stat": [
+                    "Single",
+                    "Separated",
+                    "Widowed",
+                    "Divorce",
+                    "Married",
+                    "Re-married",
+                ]
+            }
+        )
+        new_data = anonymizer.transform(drifted)
+        assert anonymizer.n_suppressed == len(drifted) > anonymizer.supp_threshold
+        assert len(new_data) == 0
+        chunks = list(anonymizer.transform([drifted[:3], drifted[3:]]))
+        assert anonymizer.n_suppressed == len(drifted)
+        assert sum(len(chunk) for chunk in chunks) == 0
+
+        # The whole table and its chunks keep the classes of the fitted table
+        for table in (self.data[:4], self.data[::-1]):
+            new_data = anonymizer.transform(table)
+            chunks = anonymizer.transform([table[:2], table[2:]])
+            assert pd.concat(chunks, ignore_index=True).equals(
+                new_data.reset_index(drop=True)
+            )
+
+        # The values out of the hierarchies are suppressed, not kept as they are
+        unknown = self.data.assign(
+            **{"ZIP code": ["32042", "99999", "32024", "32046", "32045", "32027"]}
+        )
+        anonymizer = Anonymizer(self.ID, self.QI, 2, 0, self.mix_hierarchy, "datafly")
+        new_data = anonymizer.fit(self.data).transform(unknown)
+        assert anonymizer.n_suppressed == 1 and "99999" not in set(new_data["ZIP code"])
+        assert list(new_data["index"]) == [0, 2, 3, 4, 5]
+
+    """ Tests the dataset packed in shared memory. Ensure that attaching to it by its name gives the same codes,
+        values and hierarchies without copying them, and that the block is unlinked on exit.
+    """
+
+    def test_shared_dataset(self):
+        with SharedDataset.create(
+            self.data, self.QI, self.SA, self.mix_hierarchy
+        ) as dataset:
+            attached = SharedDataset.attach(dataset.name)
+            encoded = attached.encoded(self.QI)
+            assert np.shares_memory(encoded.codes["age"], attached.codes)
+            assert list(encoded.decode("age")) == list(self.data["age"])
+            assert list(attached.encoded().decode("crime")) == list(self.data["crime"])
+            assert attached.hierarchies["age"].height == 3
+            attached.close()
+        with self.assertRaises(FileNotFoundError):
+            SharedDataset.attach(dataset.name)
+
+    """ Tests the dataset packed in a mapped file. Ensure that the kind of block is given explicitly, so a file
+        named as a block of shared memory does not change how the block is attached.
+    """
+
+    def test_shared_dataset_mapped(self):
+        cwd = os.getcwd()
+        with tempfile.TemporaryDirectory() as path:
+            os.chdir(path)
+            try:
+                with SharedDataset.create(self.data, self.QI) as dataset:
+                    open(dataset.name, "w").close()
+                    attached = SharedDataset.attach(dataset.name)
+                    assert np.array_equal(attached.codes, dataset.codes)
+                    attached.close()
+            finally:
+                os.chdir(cwd)
+            with SharedDataset.create(
+                self.data, self.QI, path=os.path.join(path, "dataset")
+            ) as dataset:
+                attached = SharedDataset.attach(dataset.name, mapped=True)
+                assert np.array_equal(attached.codes, dataset.codes)
+                attached.close()
+            assert not os.path.exists(os.path.join(path, "dataset"))
+
+    """ Tests the pruning of the incognito function. Ensure that fewer nodes than the ones in the full lattice
+        are evaluated and the k returned is equal or greater than the input k.
+    """
+
+    def test_incognito_pruning(self):
+        k = 2
+        supp_threshold = 0
+        new_data = tools.incognito(
+            self.data,
+            self.ID,
+            self.QI,
+            k,
+            supp_threshold,
+            self.mix_hierarchy,
+        )
+        lattice = _k_anonymity.generate_lattice(self.mix_hierarchy)
+        n_nodes = sum(len(nodes) for nodes in lattice.values())
+        assert efficiency_metrics.NUM_INCOGNITO < n_nodes
+        assert k <= pycanon.anonymity.k_anonymity(new_data, self.QI)
+
+    """ Tests the flash function for a high k value for the given dataset. Uses suppression.
+        Ensure the k returned is lesser than the input k.
+    """
+
+    def test_flash_higher_k_supp(self):
+        k = 10
+        supp_threshold = 2
+        new_data = tools.flash(
+            self.data,
+            self.ID,
+            self.QI,
+            k,
+            supp_threshold,
+            self.mix_hierarchy,
+        )
+        assert k > pycanon.anonymity.k_anonymity(new_data, self.QI)
+
+    """ Tests the flash function for a realistic k value for the given dataset. Doesn't use suppression.
+        Ensure the k returned is equal or greater than the input k, evaluating fewer nodes than the ones
+        in the full lattice.
+    """
+
+    def test_flash_real_k_no_supp(self):
+        k = 3
+        supp_threshold = 0
+        new_data = tools.k_anonymity(
+            self.data,
+            self.ID,
+            self.QI,
+            k,
+            supp_threshold,
+            self.mix_hierarchy,
+            "flash",
+        )
+        lattice = _k_anonymity.generate_lattice(self.mix_hierarchy)
+        n_nodes = sum(len(nodes) for nodes in lattice.values())
+        assert efficiency_metrics.NUM_FLASH < n_nodes
+        assert k <= pycanon.anonymity.k_anonymity(new_data, self.QI)
+
+    """ Tests the samarati function for a realistic k value for the given dataset. Uses suppression.
+        Ensure the k returned is equal or greater than the input k.
+    """
+
+    def test_samarati_real_k_supp(self):
+        k = 3
+        supp_threshold = 2
+        new_data = tools.k_anonymity(
+            self.data,
+            self.ID,
+            self.QI,
+            k,
+            supp_threshold,
+            self.mix_hierarchy,
+            "samarati",
+        )
+        assert k <= pycanon.anonymity.k_anonymity(new_data, self.QI)
+
+    """ Tests the samarati function for a high k value for the given dataset. Doesn't use suppression.
+        Ensure the k returned is lesser than the input k.
+    """
+
+    def test_samarati_higher_k_no_supp(self):
+        k = 10
+        supp_threshold = 0
+        new_data = tools.samarati(
+            self.data,
+            self.ID,
+            self.QI,
+            k,
+            supp_threshold,
+            self.mix_hierarchy,
+        )
+        assert k > pycanon.anonymity.k_anonymity(new_data, self.QI)
+
+    """ Tests the mondrian function for a realistic k value for the given dataset.
+        Ensure the k returned is equal or greater than the input k.
+    """
+
+    def test_mondrian_real_k(self):
+        k = 2
+        new_data = tools.k_anonymity(
+            self.data,
+            self.ID,
+            self.QI,
+            k,
+            0,
+            self.hierarchy,
+            "mondrian",
+        )
+        assert k <= pycanon.anonymity.k_anonymity(new_data, self.QI)
+
+    """ Tests the mondrian function for a high k value for the given dataset.
+        Ensure the k returned is lesser than the input k.
+    """
+
+    def test_mondrian_higher_k(self):
+        k = 10
+        new_data = tools.mondrian(self.data, self.ID, self.QI, k)
+        assert k > pycanon.anonymity.k_anonymity(new_data, self.QI)
+
     ##################################################
 
     """ Tests the l-diversity function for a high l value for the given dataset. Doesn't use suppression.
@@ -412,7 +1324,7 @@ class UnitTest(unittest.TestCase):
             self.mix_hierarchy,
             k,
         )
-        assert l >= pycanon.anonymity.l_diversity(new_data[1], self.QI, self.SA)
+        assert l <= pycanon.anonymity.l_diversity(new_data[1], self.QI, self.SA)
 
     """ Tests the l-diversity function for a realistic l value for the given dataset. Uses suppression.
         Ensure the l returned is equal or greater than the input l. Uses the incognito function for anonymization.